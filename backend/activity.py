@@ -0,0 +1,186 @@
+"""
+Per-student daily activity counters
+
+`student_daily_activity` keeps one row per student per IST day with entry,
+exit and failed-scan counts plus the last successful scan time. Rows are
+bumped with INSERT ... ON CONFLICT DO UPDATE in the same transaction as the
+scan_logs insert, so top-student rankings and parent summaries read a few
+counter rows instead of grouping scan_logs.
+
+Usage (from backend/):
+    python activity.py rebuild    # recount from scan_logs and the archive
+"""
+import argparse
+import heapq
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import ScanLog, ScanLogArchive, StudentDailyActivity, User
+
+# IST timezone (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+REBUILD_BATCH_SIZE = 5000
+
+
+def _ist_day(value: datetime) -> date:
+    # Live scans carry IST-aware times; stored rows are naive IST
+    return value.astimezone(IST).date() if value.tzinfo else value.date()
+
+
+def _aggregate(scans: Iterable[Dict], counters: Optional[Dict] = None) -> Dict:
+    """Fold scan dicts (student_id, scan_time, result, pass_type) into {(student_id, day): counters}"""
+    counters = {} if counters is None else counters
+    for scan in scans:
+        if not scan.get("student_id") or scan.get("scan_time") is None:
+            continue
+        key = (scan["student_id"], _ist_day(scan["scan_time"]))
+        row = counters.setdefault(key, {"entries": 0, "exits": 0, "failures": 0, "last_seen": None})
+        if scan.get("result") != "success":
+            row["failures"] += 1
+            continue
+        row["exits" if scan.get("pass_type") == "exit" else "entries"] += 1
+        scan_time = scan["scan_time"].astimezone(IST).replace(tzinfo=None) if scan["scan_time"].tzinfo else scan["scan_time"]
+        if row["last_seen"] is None or scan_time > row["last_seen"]:
+            row["last_seen"] = scan_time
+    return counters
+
+
+def activity_upsert(dialect_name: str, scans: Iterable[Dict]):
+    """Counter increments for a batch of scans as one upsert; None when nothing applies"""
+    counters = _aggregate(scans)
+    if not counters:
+        return None
+
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = dialect_insert(StudentDailyActivity).values([
+        {"student_id": student_id, "day": day, **row} for (student_id, day), row in counters.items()
+    ])
+    excluded = statement.excluded
+    table = StudentDailyActivity
+    return statement.on_conflict_do_update(
+        index_elements=["student_id", "day"],
+        set_={
+            "entries": table.entries + excluded.entries,
+            "exits": table.exits + excluded.exits,
+            "failures": table.failures + excluded.failures,
+            "last_seen": case(
+                (table.last_seen.is_(None), excluded.last_seen),
+                (excluded.last_seen > table.last_seen, excluded.last_seen),
+                else_=table.last_seen,
+            ),
+        },
+    )
+
+
+def scan_row(scan_log) -> Dict:
+    """Counter input for a ScanLog (or scan_logs insert dict)"""
+    get = scan_log.get if isinstance(scan_log, dict) else lambda key: getattr(scan_log, key)
+    return {
+        "student_id": get("student_id"),
+        "scan_time": get("scan_time"),
+        "result": get("result"),
+        "pass_type": get("pass_type"),
+    }
+
+
+def top_students(db: Session, days: int = 7, limit: int = 10) -> List[Dict]:
+    """Most active students over the last `days` IST days, ranked with a bounded heap"""
+    since = datetime.now(IST).date() - timedelta(days=max(days - 1, 0))
+    totals = db.execute(
+        select(
+            StudentDailyActivity.student_id,
+            func.sum(StudentDailyActivity.entries + StudentDailyActivity.exits
+                     + StudentDailyActivity.failures).label("scan_count"),
+        )
+        .where(StudentDailyActivity.day >= since)
+        .group_by(StudentDailyActivity.student_id)
+    )
+    top = heapq.nlargest(limit, totals, key=lambda row: row.scan_count)
+    if not top:
+        return []
+    users = {row.id: row for row in db.execute(
+        select(User.id, User.student_id, User.name).where(User.id.in_([row.student_id for row in top]))
+    )}
+    return [
+        {
+            "student_id": users[row.student_id].student_id,
+            "name": users[row.student_id].name,
+            "scan_count": row.scan_count,
+        }
+        for row in top
+        if row.student_id in users
+    ]
+
+
+def student_summary(db: Session, student_id: int, days: int = 30) -> Dict:
+    """Entry/exit/failure totals and last-seen time for one student from the counter rows"""
+    since = datetime.now(IST).date() - timedelta(days=max(days - 1, 0))
+    row = db.execute(
+        select(
+            func.coalesce(func.sum(StudentDailyActivity.entries), 0).label("entries"),
+            func.coalesce(func.sum(StudentDailyActivity.exits), 0).label("exits"),
+            func.coalesce(func.sum(StudentDailyActivity.failures), 0).label("failures"),
+            func.max(StudentDailyActivity.last_seen).label("last_seen"),
+            func.count().label("active_days"),
+        )
+        .where(StudentDailyActivity.student_id == student_id, StudentDailyActivity.day >= since)
+    ).one()
+    return {
+        "days": days,
+        "entries": row.entries,
+        "exits": row.exits,
+        "failures": row.failures,
+        "active_days": row.active_days,
+        "last_seen": row.last_seen.isoformat() if row.last_seen else None,
+    }
+
+
+def rebuild_activity(db: Session) -> Dict:
+    """Recount every counter row from scan_logs and scan_logs_archive"""
+    counters: Dict = {}
+    for model in (ScanLog, ScanLogArchive):
+        rows = db.execute(
+            select(model.student_id, model.scan_time, model.result, model.pass_type)
+            .execution_options(stream_results=True, yield_per=REBUILD_BATCH_SIZE)
+        )
+        _aggregate((row._mapping for row in rows), counters)
+
+    db.execute(delete(StudentDailyActivity))
+    items = [{"student_id": student_id, "day": day, **row} for (student_id, day), row in counters.items()]
+    valid_ids = set(db.scalars(select(User.id)))
+    items = [item for item in items if item["student_id"] in valid_ids]
+    for start in range(0, len(items), REBUILD_BATCH_SIZE):
+        db.execute(StudentDailyActivity.__table__.insert(), items[start:start + REBUILD_BATCH_SIZE])
+    db.commit()
+    return {"rows": len(items)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain per-student daily activity counters")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="recount student_daily_activity from scan history")
+    top_command = commands.add_parser("top", help="print the most active students")
+    top_command.add_argument("--days", type=int, default=7)
+    top_command.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            print(json.dumps(rebuild_activity(db), indent=2))
+        else:
+            print(json.dumps(top_students(db, args.days, args.limit), indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Presence index: last successful scan direction per user.
+
+Revision ID: a5c1e9d3f207
+Revises: f4a8c2e6b915
+Create Date: 2026-10-19 16:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5c1e9d3f207'
+down_revision: Union[str, Sequence[str], None] = 'f4a8c2e6b915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create presence; fill it afterwards with `python presence.py rebuild` (the app does this on first start)."""
+    inspector = sa.inspect(op.get_bind())
+    if "presence" in inspector.get_table_names():
+        return
+    op.create_table(
+        "presence",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("direction", sa.String(length=10), nullable=True),
+        sa.Column("last_scan_time", sa.DateTime(), nullable=True),
+        sa.Column("last_pass_id", sa.Integer(), nullable=True),
+        sa.Column("emergency", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_index("ix_presence_direction", "presence", ["direction"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_presence_direction", table_name="presence")
+    op.drop_table("presence")
@@ -0,0 +1,45 @@
+"""Per-student daily activity counters and a (student_id, scan_time) index.
+
+Revision ID: b8d2f6a4c319
+Revises: a5c1e9d3f207
+Create Date: 2026-10-19 18:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d2f6a4c319'
+down_revision: Union[str, Sequence[str], None] = 'a5c1e9d3f207'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create student_daily_activity; fill it with `python activity.py rebuild` (the app does this on first start)."""
+    inspector = sa.inspect(op.get_bind())
+    if "ix_scan_logs_student_time" not in {index["name"] for index in inspector.get_indexes("scan_logs")}:
+        op.create_index("ix_scan_logs_student_time", "scan_logs", ["student_id", "scan_time"])
+    if "student_daily_activity" in inspector.get_table_names():
+        return
+    op.create_table(
+        "student_daily_activity",
+        sa.Column("student_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("entries", sa.Integer(), nullable=False),
+        sa.Column("exits", sa.Integer(), nullable=False),
+        sa.Column("failures", sa.Integer(), nullable=False),
+        sa.Column("last_seen", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["student_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("student_id", "day"),
+    )
+    op.create_index("ix_student_daily_activity_day", "student_daily_activity", ["day"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_student_daily_activity_day", table_name="student_daily_activity")
+    op.drop_table("student_daily_activity")
+    op.drop_index("ix_scan_logs_student_time", table_name="scan_logs")
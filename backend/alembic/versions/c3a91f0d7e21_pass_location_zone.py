@@ -0,0 +1,30 @@
+"""Record which geofence zone a pass request matched.
+
+Revision ID: c3a91f0d7e21
+Revises: b65081be3618
+Create Date: 2026-10-19 10:12:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a91f0d7e21'
+down_revision: Union[str, Sequence[str], None] = 'b65081be3618'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add passes.location_zone if the runtime schema helper has not already done so."""
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("passes")}
+    if "location_zone" not in columns:
+        op.add_column("passes", sa.Column("location_zone", sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("passes", "location_zone")
@@ -0,0 +1,32 @@
+"""Offline scan event ids on scan_logs, unique per scanner.
+
+Revision ID: c7e5a9b2d461
+Revises: b8d2f6a4c319
+Create Date: 2026-10-19 20:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e5a9b2d461'
+down_revision: Union[str, Sequence[str], None] = 'b8d2f6a4c319'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add scan_logs.client_event_id so a resent /verify/batch event is recognised."""
+    inspector = sa.inspect(op.get_bind())
+    if "client_event_id" not in {column["name"] for column in inspector.get_columns("scan_logs")}:
+        op.add_column("scan_logs", sa.Column("client_event_id", sa.String(length=64), nullable=True))
+    if "ix_scan_logs_scanner_event" not in {index["name"] for index in inspector.get_indexes("scan_logs")}:
+        op.create_index("ix_scan_logs_scanner_event", "scan_logs", ["scanner_id", "client_event_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_scan_logs_scanner_event", table_name="scan_logs")
+    op.drop_column("scan_logs", "client_event_id")
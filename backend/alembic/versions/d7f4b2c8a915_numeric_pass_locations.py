@@ -0,0 +1,39 @@
+"""Store pass request coordinates as numbers and index them by geohash cell.
+
+Revision ID: d7f4b2c8a915
+Revises: c3a91f0d7e21
+Create Date: 2026-10-19 11:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f4b2c8a915'
+down_revision: Union[str, Sequence[str], None] = 'c3a91f0d7e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Convert the TEXT lat/lon/distance columns in place and add the indexed location_cell."""
+    from runtime_schema import backfill_location_cells, convert_numeric_columns
+
+    bind = op.get_bind()
+    convert_numeric_columns(bind)
+
+    inspector = sa.inspect(bind)
+    if "location_cell" not in {column["name"] for column in inspector.get_columns("passes")}:
+        op.add_column("passes", sa.Column("location_cell", sa.String(length=12), nullable=True))
+    if "ix_passes_location_cell" not in {index["name"] for index in inspector.get_indexes("passes")}:
+        op.create_index("ix_passes_location_cell", "passes", ["location_cell"])
+    backfill_location_cells(bind)
+
+
+def downgrade() -> None:
+    """Drop the grid-cell index; numeric coordinates are kept (text columns held the same values)."""
+    op.drop_index("ix_passes_location_cell", table_name="passes")
+    op.drop_column("passes", "location_cell")
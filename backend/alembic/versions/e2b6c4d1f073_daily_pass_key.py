@@ -0,0 +1,32 @@
+"""Unique daily_key for self-approved daily passes.
+
+Revision ID: e2b6c4d1f073
+Revises: d7f4b2c8a915
+Create Date: 2026-10-19 13:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6c4d1f073'
+down_revision: Union[str, Sequence[str], None] = 'd7f4b2c8a915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add passes.daily_key ("student:type:ist-date") with a unique index."""
+    inspector = sa.inspect(op.get_bind())
+    if "daily_key" not in {column["name"] for column in inspector.get_columns("passes")}:
+        op.add_column("passes", sa.Column("daily_key", sa.String(length=40), nullable=True))
+    if "ix_passes_daily_key" not in {index["name"] for index in inspector.get_indexes("passes")}:
+        op.create_index("ix_passes_daily_key", "passes", ["daily_key"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_passes_daily_key", table_name="passes")
+    op.drop_column("passes", "daily_key")
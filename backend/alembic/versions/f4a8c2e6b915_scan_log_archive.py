@@ -0,0 +1,66 @@
+"""Cold storage for old scan logs.
+
+Revision ID: f4a8c2e6b915
+Revises: e2b6c4d1f073
+Create Date: 2026-10-19 15:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a8c2e6b915'
+down_revision: Union[str, Sequence[str], None] = 'e2b6c4d1f073'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index scan_logs.scan_time and add scan_logs_archive plus its segment metadata."""
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "ix_scan_logs_scan_time" not in {index["name"] for index in inspector.get_indexes("scan_logs")}:
+        op.create_index("ix_scan_logs_scan_time", "scan_logs", ["scan_time"])
+
+    if "scan_logs_archive" not in tables:
+        op.create_table(
+            "scan_logs_archive",
+            sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column("pass_id", sa.Integer(), nullable=True),
+            sa.Column("student_id", sa.Integer(), nullable=True),
+            sa.Column("scanner_id", sa.Integer(), nullable=True),
+            sa.Column("scan_time", sa.DateTime(), nullable=True),
+            sa.Column("result", sa.String(length=32), nullable=True),
+            sa.Column("pass_type", sa.String(length=10), nullable=True),
+            sa.Column("emergency", sa.Boolean(), nullable=True),
+            sa.Column("details", sa.Text(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_scan_logs_archive_pass_id", "scan_logs_archive", ["pass_id"])
+        op.create_index("ix_scan_logs_archive_scan_time", "scan_logs_archive", ["scan_time"])
+
+    if "scan_log_archive_segments" not in tables:
+        op.create_table(
+            "scan_log_archive_segments",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("min_time", sa.DateTime(), nullable=True),
+            sa.Column("max_time", sa.DateTime(), nullable=True),
+            sa.Column("min_log_id", sa.Integer(), nullable=True),
+            sa.Column("max_log_id", sa.Integer(), nullable=True),
+            sa.Column("row_count", sa.Integer(), nullable=True),
+            sa.Column("archived_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_scan_log_archive_segments_min_time", "scan_log_archive_segments", ["min_time"])
+        op.create_index("ix_scan_log_archive_segments_max_time", "scan_log_archive_segments", ["max_time"])
+
+
+def downgrade() -> None:
+    # Archived rows are lost on downgrade; move them back into scan_logs first if they matter
+    op.drop_table("scan_log_archive_segments")
+    op.drop_table("scan_logs_archive")
+    op.drop_index("ix_scan_logs_scan_time", table_name="scan_logs")
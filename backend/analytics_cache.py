@@ -0,0 +1,109 @@
+"""
+In-process cache for the admin analytics endpoints
+
+The admin logs page requests /api/logs/statistics, /daily, /hourly and
+/top_students together, and every open admin tab repeats them. Each result is
+cached per (endpoint, parameters, IST day) for ANALYTICS_CACHE_SECONDS and
+dropped as soon as this worker commits a new scan. Concurrent requests for a
+key that is being computed wait for that computation instead of starting their
+own (single-flight), so ten admins opening the dashboard cost one query set.
+
+Invalidation is per process; scans written by another worker become visible
+here when the TTL runs out.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from settings import settings
+
+# IST timezone (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+class _Flight:
+    """One in-progress computation that other callers for the same key wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class AnalyticsCache:
+    def __init__(self, ttl_seconds: int = 30, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "invalidations": 0}
+
+    @staticmethod
+    def key(endpoint: str, params: Dict) -> Hashable:
+        # The IST day is part of the key so "today" results roll over at midnight
+        return (endpoint, tuple(sorted(params.items())), datetime.now(IST).date().isoformat())
+
+    def get_or_compute(self, endpoint: str, params: Dict, compute: Callable[[], Any]) -> Any:
+        if self.ttl_seconds <= 0:
+            return compute()
+
+        key = self.key(endpoint, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._stats["hits"] += 1
+                return entry[0]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+                generation = self._generation
+                self._stats["misses"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                # A scan committed while computing makes this result stale; hand it out but do not keep it
+                if flight.error is None and generation == self._generation:
+                    if key not in self._entries and len(self._entries) >= self.max_entries:
+                        self._entries.pop(next(iter(self._entries)))
+                    self._entries[key] = (flight.value, time.monotonic() + self.ttl_seconds)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self):
+        """Drop every cached result; call after committing scan_logs rows"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"] + self._stats["coalesced"]
+            return {
+                **self._stats,
+                "hit_ratio": round((self._stats["hits"] + self._stats["coalesced"]) / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "in_flight": len(self._inflight),
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+analytics_cache = AnalyticsCache(ttl_seconds=settings.ANALYTICS_CACHE_SECONDS)
@@ -1,78 +1,101 @@
 
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Form, Query, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile, Form, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import text
+from sqlalchemy import and_, case, func, insert, or_, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
 from typing import List, Optional
-from database import Base, engine, get_db, SessionLocal
-from models import User, RegistrationRequest, PassRequest, ScanLog
+from database import Base, engine, get_db, get_async_db, AsyncSessionLocal, SessionLocal
+from models import User, RegistrationRequest, PassRequest, Presence, ScanLog, StudentDailyActivity
 from schemas import *
 from schemas import UserRegister
-from runtime_schema import ensure_runtime_schema
+from runtime_schema import ensure_runtime_schema, numeric_sql
 from auth import (
     hash_pwd,
     verify_pwd,
     create_access_token,
     create_parent_access_token,
     get_current_user,
-    get_user_from_token,
+    get_user_from_token_async,
     require_role,
+    require_role_async,
     verify_parent_access_token,
 )
-from crypto import make_qr_token, parse_token
+from crypto import ScanFailureAggregator, check_token, make_qr_token, parse_token, token_digest
 from settings import settings
-from crud import log_scan, mark_used
+from analytics_cache import analytics_cache
+from crud import (
+    consume_pass, consume_pass_row, decode_log_cursor, encode_log_cursor, get_or_create_daily_pass, log_scan,
+    log_scan_failure_summaries, record_scans, scan_index_statements,
+)
+import activity
+import geohash
+import http_cache
+import log_archive
+import metrics
+import personnel_import
+import presence
+import profiling
+from user_search import user_search
 from fastapi.security import OAuth2PasswordRequestForm
-import hmac
-import hashlib
+import asyncio
+import csv
 import importlib
+import io
+import logging
 import os
 
+from logging_setup import RequestIdMiddleware, configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
 # Optional imports - disable if not installed or explicitly turned off via env
 FACE_AUTH_ENABLED = settings.FACE_AUTH_ENABLED
 _face_auth_module = None
 _face_auth_import_error = None
 
 if FACE_AUTH_ENABLED:
-    print(f"✅ Face authentication enabled by configuration (backend={settings.FACE_AUTH_BACKEND}); face stack will load on demand")
+    logger.info("Face authentication enabled by configuration (backend=%s); face stack will load on demand", settings.FACE_AUTH_BACKEND)
 else:
-    print("⚠️  Face authentication disabled by configuration")
+    logger.info("Face authentication disabled by configuration")
 
 if settings.NOTIFICATIONS_ENABLED:
     try:
         import notifications_v2 as notifications
         NOTIFICATIONS_ENABLED = True
-        print("✅ Notifications module loaded successfully")
+        logger.info("Notifications module loaded successfully")
     except Exception as e:
         NOTIFICATIONS_ENABLED = False
-        print(f"⚠️  Notifications disabled: {e}")
+        logger.warning("Notifications disabled: %s", e)
 else:
     NOTIFICATIONS_ENABLED = False
-    print("⚠️  Notifications disabled by configuration")
+    logger.info("Notifications disabled by configuration")
 
 try:
     import realtime_logs
     REALTIME_LOGS_ENABLED = True
-    print("✅ Real-time logs module loaded successfully")
+    logger.info("Real-time logs module loaded successfully")
 except Exception as e:
     REALTIME_LOGS_ENABLED = False
-    print(f"⚠️  Real-time logs disabled: {e}")
+    logger.warning("Real-time logs disabled: %s", e)
 
 if settings.GEOFENCE_ENABLED:
     try:
         import geofence
+        import location_audit
         import location_settings
         GEOFENCE_ENABLED = True
     except ImportError:
         GEOFENCE_ENABLED = False
-        print("⚠️  GPS geofencing disabled - install shapely and geopy to enable")
-        print("    Run: pip install shapely geopy")
+        logger.warning("GPS geofencing disabled - install shapely and geopy to enable (pip install shapely geopy)")
 else:
     GEOFENCE_ENABLED = False
-    print("⚠️  GPS geofencing disabled by configuration")
+    logger.info("GPS geofencing disabled by configuration")
 
 
 def get_face_auth_module():
@@ -92,15 +115,15 @@ def get_face_auth_module():
         backend_name = getattr(_face_auth_module, "get_backend_name", lambda: settings.FACE_AUTH_BACKEND)()
         backend_error = getattr(_face_auth_module, "get_backend_error", lambda: None)()
         if backend_name:
-            print(f"✅ Face authentication module loaded successfully (backend={backend_name})")
+            logger.info("Face authentication module loaded (backend=%s)", backend_name)
         elif backend_error:
             _face_auth_import_error = backend_error
-            print(f"⚠️  Face authentication backend unavailable: {backend_error}")
+            logger.warning("Face authentication backend unavailable: %s", backend_error)
             return None
         return _face_auth_module
     except Exception as e:
         _face_auth_import_error = str(e)
-        print(f"⚠️  Face authentication unavailable: {e}")
+        logger.warning("Face authentication unavailable: %s", e)
         return None
 
 
@@ -111,7 +134,7 @@ def _decode_face_encoding(face_auth_module, encoding_json: Optional[str]):
     try:
         return face_auth_module.json_to_encoding(encoding_json)
     except Exception as e:
-        print(f"⚠️  Failed to decode stored face encoding: {e}")
+        logger.warning("Failed to decode stored face encoding: %s", e)
         return None
 
 
@@ -131,15 +154,16 @@ def _find_duplicate_face_registration(db: Session, user: User, encoding: object,
         if getattr(face_auth_module, "requires_reenrollment", lambda _: False)(candidate_encoding):
             continue
 
-        is_match, distance = face_auth_module.compare_faces(
-            candidate_encoding,
-            encoding,
-            tolerance=duplicate_tolerance,
-        )
+        with metrics.face_timer(face_auth_module, "compare"):
+            is_match, distance = face_auth_module.compare_faces(
+                candidate_encoding,
+                encoding,
+                tolerance=duplicate_tolerance,
+            )
         if is_match:
-            print(
-                f"⚠️  Duplicate face registration blocked for {user.email}; "
-                f"matched existing user #{candidate.id} at distance {distance:.3f}"
+            logger.warning(
+                "Duplicate face registration blocked for %s; matched existing user #%s at distance %.3f",
+                user.email, candidate.id, distance,
             )
             return candidate, distance
 
@@ -192,11 +216,27 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],  # read by the frontend's conditional GET cache
 )
 
+# Sampled stack profiles of slow requests (no-op unless PROFILING_ENABLED)
+profiling.install(app)
+# Request latency / query-count metrics (no-op unless METRICS_ENABLED)
+metrics.install(app)
+# Outermost, so every log line of a request (including metrics/CORS handling) carries its id
+app.add_middleware(RequestIdMiddleware)
+
 # create tables
 Base.metadata.create_all(bind=engine)
 ensure_runtime_schema(engine)
+user_search.setup(engine)
+
+# Databases that predate the presence table and activity counters get them filled once from scan history
+with SessionLocal() as _db:
+    if _db.query(Presence).first() is None and _db.query(ScanLog.id).filter(ScanLog.result == "success").first():
+        logger.info("Presence index rebuilt from scan logs: %s", presence.rebuild_presence(_db))
+    if _db.query(StudentDailyActivity).first() is None and _db.query(ScanLog.id).first():
+        logger.info("Activity counters rebuilt from scan logs: %s", activity.rebuild_activity(_db))
 
 ALLOWED_ACCOUNT_REQUEST_ROLES = {"personnel", "student", "guard"}
 
@@ -269,9 +309,9 @@ def _notify_admins_of_registration_request(db: Session, request: RegistrationReq
                 request.email,
                 _normalize_account_request_role(request.requested_role),
             )
-            print(f"✅ Notified {len(admin_tokens)} admin(s) of registration request #{request.id}")
+            logger.info("Notified %d admin(s) of registration request #%s", len(admin_tokens), request.id)
     except Exception as e:
-        print(f"⚠️  Registration notification error: {e}")
+        logger.warning("Registration notification error: %s", e)
 
 
 def _serialize_registration_request(db: Session, request: RegistrationRequest) -> RegistrationRequestOut:
@@ -419,7 +459,7 @@ def register_user(user_in: UserRegister, db: Session = Depends(get_db)):
     _notify_admins_of_registration_request(db, registration_request)
 
     role_label = _account_request_role_label(requested_role)
-    print(f"✅ New access request submitted: {registration_request.name} ({registration_request.email})")
+    logger.info("New access request submitted: %s (%s)", registration_request.name, registration_request.email)
     return RegistrationRequestAck(
         request_id=registration_request.id,
         status=registration_request.status,
@@ -522,6 +562,33 @@ def reject_registration_request(
     db.refresh(registration_request)
     return _serialize_registration_request(db, registration_request)
 
+
+@app.post("/admin/personnel/import")
+def import_personnel_roster(
+    file: UploadFile = File(...),
+    dry_run: bool = Query(False),
+    chunk_size: int = Query(500, ge=50, le=5000),
+    errors_only: bool = Query(False),
+    update_credentials: bool = Query(False),
+    admin: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db),
+):
+    """Bulk create/update students and guards from a CSV or .xlsx roster (Admin only)"""
+    try:
+        if (file.filename or "").lower().endswith(".xlsx"):
+            rows = personnel_import.read_xlsx_rows(file.file)
+        else:
+            rows = personnel_import.read_csv_rows(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+        result = personnel_import.import_personnel(db, rows, dry_run=dry_run, chunk_size=chunk_size,
+                                                   update_credentials=update_credentials)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid roster: {e}")
+
+    logger.info("Personnel import by %s: %s", admin.email, result["summary"])
+    if errors_only:
+        result["rows"] = [entry for entry in result["rows"] if entry["status"] == "error"]
+    return result
+
 # =====================
 # Notification Endpoints
 # =====================
@@ -615,10 +682,14 @@ def register_parent_fcm(
 @app.get("/api/parent/student_history/{student_id}")
 def get_student_history_for_parent(
     student_id: str,
+    request: Request,
+    response: Response,
     access_token: str = Query(...),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get entry/exit history for a student (for parents)"""
+    """Get entry/exit history for a student (for parents); `cursor` pages to older scans"""
     _require_parent_access(student_id, access_token)
 
     # Find student
@@ -629,16 +700,34 @@ def get_student_history_for_parent(
     
     if not student:
         raise HTTPException(404, f"Student with ID {student_id} not found")
+
+    # The page only changes when this student scans (or the 30-day window moves)
+    latest_id, latest_time = http_cache.student_scans_version(db, student.id)
+    not_modified = http_cache.conditional(
+        request, response, student.id, student.name, student.student_class,
+        latest_id, http_cache.ist_today(), limit, cursor, last_modified=latest_time,
+    )
+    if not_modified is not None:
+        return not_modified
     
-    # Get scan logs for this student (last 30 days)
-    from datetime import datetime, timedelta
-    thirty_days_ago = datetime.now() - timedelta(days=30)
+    # Get scan logs for this student (last 30 days), one (student_id, scan_time) index range per page
+    thirty_days_ago = now_ist().replace(tzinfo=None) - timedelta(days=30)
     
-    scans = db.query(ScanLog).filter(
+    query = db.query(ScanLog.id, ScanLog.scan_time, ScanLog.pass_type).filter(
         ScanLog.student_id == student.id,
         ScanLog.scan_time >= thirty_days_ago,
         ScanLog.result == "success"  # Only show successful scans
-    ).order_by(ScanLog.scan_time.desc()).limit(50).all()
+    )
+    if cursor:
+        try:
+            before_time, before_id = decode_log_cursor(cursor)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+        query = query.filter(or_(
+            ScanLog.scan_time < before_time,
+            and_(ScanLog.scan_time == before_time, ScanLog.id < before_id),
+        ))
+    scans = query.order_by(ScanLog.scan_time.desc(), ScanLog.id.desc()).limit(limit).all()
     
     # Format the response
     history = []
@@ -653,27 +742,33 @@ def get_student_history_for_parent(
             "time": scan.scan_time.strftime("%I:%M %p")
         })
     
+    # Totals come from the daily counters instead of counting 30 days of scans
+    summary = activity.student_summary(db, student.id, days=30)
     return {
         "student_name": student.name,
         "student_id": student.student_id,
         "student_class": student.student_class,
         "history": history,
-        "total_scans": len(history)
+        "summary": summary,
+        "total_scans": summary["entries"] + summary["exits"],
+        "next_cursor": encode_log_cursor(history[-1]) if len(history) == limit else None,
     }
 
 # --- Student: create & list passes ---
 @app.post("/passes", response_model=PassOut)
 def create_pass(p: PassCreate, user: User = Depends(require_role("student")), db: Session = Depends(get_db)):
-    print(f"DEBUG: Creating pass with pass_type={p.pass_type}, reason={p.reason}")
+    logger.debug("Creating pass with pass_type=%s", p.pass_type)
     
     # GPS Geofencing validation (optional but logged)
     location_verified = False
     location_distance = None
+    location_zone = None
     if GEOFENCE_ENABLED and p.latitude is not None and p.longitude is not None:
         is_valid, message, details = geofence.validate_student_location(p.latitude, p.longitude)
         location_verified = is_valid
-        location_distance = str(details.get('distance_km', ''))
-        print(f"GPS: {message} - Lat: {p.latitude}, Lon: {p.longitude}")
+        location_distance = details.get('distance_km')
+        location_zone = details.get('zone')
+        logger.debug("GPS: %s - Lat: %s, Lon: %s", message, p.latitude, p.longitude)
         
         # Optional: Reject if outside campus (uncomment to enforce)
         # if not is_valid:
@@ -684,10 +779,12 @@ def create_pass(p: PassCreate, user: User = Depends(require_role("student")), db
         reason=p.reason, 
         status="pending", 
         pass_type=p.pass_type,
-        request_latitude=str(p.latitude) if p.latitude else None,
-        request_longitude=str(p.longitude) if p.longitude else None,
+        request_latitude=p.latitude,
+        request_longitude=p.longitude,
+        location_cell=geohash.safe_encode(p.latitude, p.longitude),
         location_verified=location_verified,
-        location_distance_km=location_distance
+        location_distance_km=location_distance,
+        location_zone=location_zone
     )
     db.add(pr)
     db.commit()
@@ -700,15 +797,23 @@ def create_pass(p: PassCreate, user: User = Depends(require_role("student")), db
             admin_tokens = [admin.fcm_token for admin in admin_users if admin.fcm_token]
             if admin_tokens:
                 notifications.notify_admin_new_request(admin_tokens, user.name, pr.id)
-                print(f"✅ Notified {len(admin_tokens)} admin(s) of new pass request #{pr.id}")
+                logger.info("Notified %d admin(s) of new pass request #%s", len(admin_tokens), pr.id)
         except Exception as e:
-            print(f"⚠️  Admin notification error: {e}")
+            logger.warning("Admin notification error: %s", e)
     
-    print(f"DEBUG: Created pass ID {pr.id} with pass_type={pr.pass_type}, GPS verified={location_verified}")
+    logger.debug("Created pass ID %s with pass_type=%s, GPS verified=%s", pr.id, pr.pass_type, location_verified)
     return pr
 
 @app.get("/passes", response_model=List[PassOut])
-def list_passes(status: str | None = None, user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def list_passes(request: Request, response: Response, status: str | None = None,
+                user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+    scope = user.id if user.role == "student" else None
+    not_modified = http_cache.conditional(
+        request, response, user.id, status, http_cache.passes_version(db, scope, status),
+    )
+    if not_modified is not None:
+        return not_modified
+
     q = db.query(PassRequest)
     if user.role == "student":
         q = q.filter(PassRequest.student_id == user.id)
@@ -766,9 +871,9 @@ def approve(pass_id: int, user: User = Depends(require_role("admin")), db: Sessi
                 notifications.notify_pass_approved(
                     student.name, pr.id, student.fcm_token, student.phone
                 )
-                print(f"✅ Sent approval notification for pass #{pr.id} to {student.name}")
+                logger.info("Sent approval notification for pass #%s", pr.id)
             except Exception as e:
-                print(f"⚠️ Notification error: {e}")
+                logger.warning("Approval notification error for pass #%s: %s", pr.id, e)
     
     return pr
 
@@ -791,9 +896,9 @@ def reject(pass_id: int, user: User = Depends(require_role("admin")), db: Sessio
                 notifications.notify_pass_rejected(
                     student.name, pr.id, student.fcm_token, student.phone
                 )
-                print(f"✅ Sent rejection notification for pass #{pr.id} to {student.name}")
+                logger.info("Sent rejection notification for pass #%s", pr.id)
             except Exception as e:
-                print(f"⚠️ Notification error: {e}")
+                logger.warning("Rejection notification error for pass #%s: %s", pr.id, e)
     
     return pr
 
@@ -802,39 +907,34 @@ def reject(pass_id: int, user: User = Depends(require_role("admin")), db: Sessio
 async def verify(
     token: str = Form(...),
     face_image: Optional[UploadFile] = File(None),
-    guard: User = Depends(require_role("guard")), 
-    db: Session = Depends(get_db)
+    guard: User = Depends(require_role_async("guard")), 
+    db: AsyncSession = Depends(get_async_db)
 ):
-    parsed = parse_token(token)
-    if not parsed:
-        return _fail(db, None, None, guard.id, "invalid", "malformed")
-    pid, uid, exp, sig_recv = parsed
-
-    pr = db.get(PassRequest, pid)
-    if not pr:
-        return _fail(db, pid, uid, guard.id, "invalid", "no-pass")
-    
-    # recompute HMAC
-    data = f"{pid}.{uid}.{exp}"
-    expected = hmac.new(settings.SECRET_KEY.encode(), data.encode(), hashlib.sha256).hexdigest()[:32]
-
-    now = int(now_ist().timestamp())
-
-    if sig_recv != expected:
-        return _fail(db, pid, uid, guard.id, "invalid", "sig-mismatch")
-    if now > int(exp):
-        return _fail(db, pid, uid, guard.id, "expired", "past-expiry")
-    if pr.status not in ("approved",):  # used/rejected/pending not allowed
-        return _fail(db, pid, uid, guard.id, "not-approved", pr.status)
-
-    # atomic "use" (simple version: check again then update)
-    if pr.used_time:
-        return _fail(db, pid, uid, guard.id, "replay", "already-used")
-    
-    # get student details
-    student = db.get(User, pr.student_id)
-    student_name = student.name if student else "Unknown"
-    student_code = student.student_id if student else f"ID:{pr.student_id}"
+    # Malformed, forged and expired tokens are rejected in memory, before any DB access
+    with metrics.verify_stage("token_parse"):
+        parsed, rejection = check_token(token)
+    if rejection:
+        return await _fail_fast(db, token, parsed, guard.id, *rejection)
+    pid, uid = parsed.pass_id, parsed.user_id
+
+    # Face verification needs the pass holder up front: load pass and holder in one
+    # query and reject unusable passes before spending CPU on the face pipeline.
+    # The conditional UPDATE in consume_pass() below remains the real guard.
+    student = None
+    pass_type = "entry"
+    if FACE_AUTH_ENABLED and face_image:
+        with metrics.verify_stage("db_lookup"):
+            row = (await db.execute(
+                select(PassRequest, User)
+                .outerjoin(User, User.id == PassRequest.student_id)
+                .where(PassRequest.id == pid)
+            )).first()
+        if not row:
+            return await _fail(db, pid, uid, guard.id, "invalid", "no-pass")
+        pr, student = row
+        pass_type = pr.pass_type or "entry"
+        if pr.student_id != uid or pr.status != "approved" or pr.used_time:
+            return await _reject_unconsumable(db, token, pr, pid, uid, guard.id)
     
     # Face verification (optional)
     face_verified = None
@@ -842,51 +942,48 @@ async def verify(
     face_distance = None
     face_message = None
     
-    print(f"DEBUG: Face image received: {face_image is not None}")
-    print(f"DEBUG: Face auth enabled: {FACE_AUTH_ENABLED}")
-    print(f"DEBUG: Student from pass: {student.name if student else 'None'} (ID: {student.student_id if student else 'None'})")
-    print(f"DEBUG: Pass belongs to student_id: {pr.student_id}")
+    logger.debug(
+        "Verifying pass %s for user %s (face image: %s, face auth enabled: %s)",
+        pid, uid, face_image is not None, FACE_AUTH_ENABLED,
+    )
     
     if FACE_AUTH_ENABLED and face_image and student:
         try:
             face_auth_module = get_face_auth_module()
             if face_auth_module is None:
-                return _fail(db, pid, uid, guard.id, "invalid", "face-service-unavailable")
+                return await _fail(db, pid, uid, guard.id, "invalid", "face-service-unavailable", pass_type=pass_type)
 
-            print(f"DEBUG: Verifying face for: {student.name} ({student.student_id})")
-            print(f"DEBUG: Student face registered: {student.face_registered}")
+            logger.debug("Verifying face for student %s (registered: %s)", student.student_id, student.face_registered)
             # Check if student has registered face
             if student.face_registered and student.face_encoding:
-                print("DEBUG: Reading face image bytes...")
                 # Read uploaded face image
-                image_bytes = await face_image.read()
-                print(f"DEBUG: Face image size: {len(image_bytes)} bytes")
-                
-                # Validate image
-                is_valid, error_msg = face_auth_module.validate_image(image_bytes)
-                print(f"DEBUG: Image validation: {is_valid}, {error_msg}")
+                with metrics.verify_stage("image_decode"), metrics.face_timer(face_auth_module, "validate"):
+                    image_bytes = await face_image.read()
+                    
+                    # Validate image
+                    is_valid, error_msg = face_auth_module.validate_image(image_bytes)
+                logger.debug("Face image: %d bytes, valid: %s %s", len(image_bytes), is_valid, error_msg or "")
                 if is_valid:
-                    print("DEBUG: Extracting face encoding from captured image...")
                     # Extract face encoding from uploaded image
-                    check_encoding = face_auth_module.extract_face_encoding(image_bytes)
-                    print(f"DEBUG: Face encoding extracted: {check_encoding is not None}")
+                    with metrics.verify_stage("face_detection"), metrics.face_timer(face_auth_module, "extract"):
+                        check_encoding = face_auth_module.extract_face_encoding(image_bytes)
+                    logger.debug("Face encoding extracted: %s", check_encoding is not None)
                     
                     if check_encoding is not None:
                         # Get stored encoding for THIS specific student
                         stored_encoding = _decode_face_encoding(face_auth_module, student.face_encoding)
                         if stored_encoding is None:
-                            return _fail(db, pid, uid, guard.id, "invalid", "face-registration-outdated")
+                            return await _fail(db, pid, uid, guard.id, "invalid", "face-registration-outdated", pass_type=pass_type)
                         if getattr(face_auth_module, "requires_reenrollment", lambda _: False)(stored_encoding):
-                            return _fail(db, pid, uid, guard.id, "invalid", "face-registration-outdated")
-                        print(f"DEBUG: Comparing captured face with {student.name}'s registered face")
+                            return await _fail(db, pid, uid, guard.id, "invalid", "face-registration-outdated", pass_type=pass_type)
                         
                         tolerance = getattr(face_auth_module, "get_match_tolerance", lambda _=None: 0.5)(stored_encoding)
-                        is_match, distance = face_auth_module.compare_faces(stored_encoding, check_encoding, tolerance=tolerance)
-                        print(f"DEBUG: Face comparison result:")
-                        print(f"       - Student: {student.name} ({student.student_id})")
-                        print(f"       - Match: {is_match}")
-                        print(f"       - Distance: {distance:.4f}")
-                        print(f"       - Tolerance: {tolerance}")
+                        with metrics.verify_stage("face_compare"), metrics.face_timer(face_auth_module, "compare"):
+                            is_match, distance = face_auth_module.compare_faces(stored_encoding, check_encoding, tolerance=tolerance)
+                        logger.debug(
+                            "Face comparison for student %s: match=%s distance=%.4f tolerance=%s",
+                            student.student_id, is_match, distance, tolerance,
+                        )
                         
                         # Get confidence
                         confidence_info = face_auth_module.get_confidence_level(distance, stored_encoding)
@@ -900,51 +997,57 @@ async def verify(
                             face_message = f"Face matches {student.name} - {confidence_info['description']}"
                         else:
                             face_message = f"Face does NOT match {student.name} (distance: {distance:.3f})"
-                        
-                        print(f"DEBUG: Final result - Match: {is_match}, Confidence: {face_confidence}%, Message: {face_message}")
                     else:
-                        return _fail(db, pid, uid, guard.id, "invalid", "face-not-detected")
+                        return await _fail(db, pid, uid, guard.id, "invalid", "face-not-detected", pass_type=pass_type)
                 else:
-                    return _fail(db, pid, uid, guard.id, "invalid", f"face-invalid-image:{error_msg}")
+                    return await _fail(db, pid, uid, guard.id, "invalid", f"face-invalid-image:{error_msg}", pass_type=pass_type)
             else:
                 face_message = f"{student.name} has not registered face"
-                print(f"DEBUG: {face_message}")
-        except Exception as e:
-            print(f"Face verification error: {e}")
-            import traceback
-            traceback.print_exc()
-            return _fail(db, pid, uid, guard.id, "invalid", "face-verification-error")
+                logger.debug("Student %s has not registered a face", student.student_id)
+        except Exception:
+            logger.exception("Face verification error for pass %s", pid)
+            return await _fail(db, pid, uid, guard.id, "invalid", "face-verification-error", pass_type=pass_type)
 
     if face_verified is False:
-        return _fail(db, pid, uid, guard.id, "invalid", "face-mismatch")
+        return await _fail(db, pid, uid, guard.id, "invalid", "face-mismatch", pass_type=pass_type)
+
+    # Consume the pass and record the scan in a single transaction. Replays and
+    # concurrent double-scans are rejected by the database, not by Python checks.
+    with metrics.verify_stage("commit"):
+        scan_log = await consume_pass(db, pid, uid, guard.id, student=student)
+    if scan_log is None:
+        return await _reject_unconsumable(db, token, await db.get(PassRequest, pid), pid, uid, guard.id)
 
-    mark_used(db, pr, guard.id)
-    log_scan(db, pid, pr.student_id, guard.id, "success", "verified", pass_type=pr.pass_type or "entry")
+    if student is None:
+        student = await db.get(User, scan_log.student_id)
+    student_name = student.name if student else "Unknown"
+    student_code = student.student_id if student else f"ID:{scan_log.student_id}"
     
     # Send entry/exit notification to parents
     if NOTIFICATIONS_ENABLED and student:
-        try:
-            timestamp = now_ist().strftime("%I:%M %p")
-            parent_fcm_tokens = [student.parent_fcm_token] if student.parent_fcm_token else []
-            parent_phones = [student.parent_phone] if student.parent_phone else []
+        with metrics.verify_stage("notification"):
+            try:
+                timestamp = now_ist().strftime("%I:%M %p")
+                parent_fcm_tokens = [student.parent_fcm_token] if student.parent_fcm_token else []
+                parent_phones = [student.parent_phone] if student.parent_phone else []
             
-            if pr.pass_type == "entry":
-                notifications.notify_entry_scan(
-                    student.name, student_code, timestamp, parent_fcm_tokens, parent_phones
-                )
-                print(f"✅ Sent entry notification to parents of {student.name}")
-            elif pr.pass_type == "exit":
-                notifications.notify_exit_scan(
-                    student.name, student_code, timestamp, parent_fcm_tokens, parent_phones
-                )
-                print(f"✅ Sent exit notification to parents of {student.name}")
-        except Exception as e:
-            print(f"⚠️  Parent notification error: {e}")
+                if scan_log.pass_type == "entry":
+                    notifications.notify_entry_scan(
+                        student.name, student_code, timestamp, parent_fcm_tokens, parent_phones
+                    )
+                    logger.info("Sent entry notification to parents of student %s", student_code)
+                elif scan_log.pass_type == "exit":
+                    notifications.notify_exit_scan(
+                        student.name, student_code, timestamp, parent_fcm_tokens, parent_phones
+                    )
+                    logger.info("Sent exit notification to parents of student %s", student_code)
+            except Exception as e:
+                logger.warning("Parent notification error: %s", e)
     
     response = {
         "result": "success", 
-        "pass_id": pr.id, 
-        "student_id": pr.student_id,
+        "pass_id": scan_log.pass_id, 
+        "student_id": scan_log.student_id,
         "student_name": student_name,
         "student_code": student_code,
         "message": "GRANTED"
@@ -956,32 +1059,256 @@ async def verify(
         response["face_confidence"] = face_confidence
         response["face_distance"] = face_distance
         response["face_message"] = face_message
-        print(f"DEBUG: Response includes face verification data")
-    else:
-        print(f"DEBUG: No face verification data in response - face_verified is None")
     
-    print(f"DEBUG: Final response: {response}")
+    logger.debug("Scan granted for pass %s (face verified: %s)", scan_log.pass_id, face_verified)
     return response
 
-def _fail(db, pid, uid, gid, result, details):
+async def _fail(db: AsyncSession, pid, uid, gid, result, details, pass_type: str = "entry"):
     try:
-        # For failed scans, try to get pass_type from the pass if it exists
-        pass_type = "entry"  # default
-        if pid:
-            pr = db.get(PassRequest, pid)
-            if pr:
-                pass_type = pr.pass_type or "entry"
-        log_scan(db, pid or 0, uid or 0, gid, result, details, pass_type=pass_type)
+        await log_scan(db, pid or 0, uid or 0, gid, result, details, pass_type=pass_type)
     except Exception:
         pass
     raise HTTPException(status_code=400, detail=f"{result}: {details}")
 
+# Repeated identical rejected tokens are counted and flushed periodically instead of one row per attempt
+scan_failures = ScanFailureAggregator(window_seconds=settings.SCAN_FAILURE_WINDOW_SECONDS)
+
+async def _fail_fast(db: AsyncSession, token: str, parsed, gid, result, details):
+    pid, uid = (parsed.pass_id, parsed.user_id) if parsed else (None, None)
+    if scan_failures.record(token, pid, uid, gid, result, details):
+        return await _fail(db, pid, uid, gid, result, details)
+    raise HTTPException(status_code=400, detail=f"{result}: {details}")
+
+async def _flush_scan_failures(force: bool = False):
+    summaries = scan_failures.drain(force=force)
+    if not summaries:
+        return
+    try:
+        async with AsyncSessionLocal() as db:
+            await log_scan_failure_summaries(db, summaries)
+    except Exception as e:
+        logger.warning("Failed to flush aggregated scan failures: %s", e)
+
+async def _flush_scan_failures_periodically():
+    while True:
+        await asyncio.sleep(scan_failures.window_seconds)
+        await _flush_scan_failures()
+
+@app.on_event("startup")
+async def _start_scan_failure_flusher():
+    asyncio.create_task(_flush_scan_failures_periodically())
+
+@app.on_event("shutdown")
+async def _stop_scan_failure_flusher():
+    await _flush_scan_failures(force=True)
+
+def _archive_scan_logs() -> dict:
+    db = SessionLocal()
+    try:
+        return log_archive.archive_old_logs(db)
+    finally:
+        db.close()
+
+async def _archive_scan_logs_periodically():
+    # Let startup settle first; every worker runs this, and a batch that loses the race just rolls back
+    await asyncio.sleep(60)
+    while True:
+        try:
+            stats = await asyncio.to_thread(_archive_scan_logs)
+            if stats["archived"]:
+                analytics_cache.invalidate()
+                logger.info("Archived %s scan log(s) older than %s", stats["archived"], stats["cutoff"])
+        except Exception:
+            logger.exception("Scan log archival failed")
+        await asyncio.sleep(settings.SCAN_LOG_ARCHIVE_INTERVAL_HOURS * 3600)
+
+@app.on_event("startup")
+async def _start_scan_log_archiver():
+    if settings.SCAN_LOG_RETENTION_DAYS > 0:
+        asyncio.create_task(_archive_scan_logs_periodically())
+
+def _unconsumable_reason(pr: Optional[PassRequest], uid):
+    """Explain why a pass could not be consumed (only runs on the failure path)."""
+    if pr is None or pr.student_id != uid:
+        return "invalid", "no-pass"
+    if pr.status == "used" or pr.used_time:
+        return "replay", "already-used"
+    return "not-approved", pr.status
+
+async def _reject_unconsumable(db: AsyncSession, token: str, pr: Optional[PassRequest], pid, uid, gid):
+    result, details = _unconsumable_reason(pr, uid)
+    pass_type = (pr.pass_type if pr else None) or "entry"
+    if result == "replay":
+        # A guard re-scanning a consumed QR is a storm of identical failures: aggregate it
+        if not scan_failures.record(token, pid, uid, gid, result, details, pass_type=pass_type):
+            raise HTTPException(status_code=400, detail=f"{result}: {details}")
+    return await _fail(db, pid, uid, gid, result, details, pass_type=pass_type)
+
+# --- Guard: offline verification ---
+OFFLINE_BUNDLE_OVERLAP_SECONDS = 5
+
+@app.get("/verify/bundle")
+async def offline_pass_bundle(
+    since: Optional[int] = None,
+    guard: User = Depends(require_role_async("guard")),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Delta of consumable passes for offline verification on guard devices.
+
+    QR tokens are signed with a symmetric server key, so instead of shipping a key
+    the bundle carries a SHA-256 digest of each issued token; the guard client
+    validates a scan by hashing it and looking it up. Pass the returned `cursor`
+    back as `since` to receive only newly approved passes and the IDs consumed since.
+    """
+    now = now_ist()
+    since_dt = datetime.fromtimestamp(since - OFFLINE_BUNDLE_OVERLAP_SECONDS, tz=IST) if since else None
+
+    query = (
+        select(PassRequest.id, PassRequest.student_id, PassRequest.pass_type, PassRequest.qr_token,
+               User.name, User.student_id.label("student_code"))
+        .join(User, User.id == PassRequest.student_id)
+        .where(
+            PassRequest.status == "approved",
+            PassRequest.used_time.is_(None),
+            PassRequest.qr_token.isnot(None),
+            PassRequest.expiry_time > now,
+        )
+    )
+    if since_dt:
+        query = query.where(PassRequest.approved_time >= since_dt)
+
+    passes = []
+    for row in (await db.execute(query)).all():
+        parsed = parse_token(row.qr_token)
+        if not parsed:
+            continue
+        passes.append({
+            "pass_id": row.id,
+            "student_id": row.student_id,
+            "student_name": row.name,
+            "student_code": row.student_code,
+            "pass_type": row.pass_type or "entry",
+            "expires_at": parsed.exp,
+            "token_digest": token_digest(row.qr_token),
+        })
+
+    removed = []
+    if since_dt:
+        removed = list((await db.execute(
+            select(PassRequest.id).where(PassRequest.used_time >= since_dt)
+        )).scalars().all())
+
+    return {
+        "cursor": int(now.timestamp()),
+        "full": since_dt is None,
+        "passes": passes,
+        "removed": removed,
+    }
+
+@app.post("/verify/batch")
+async def verify_batch(
+    batch: OfflineScanBatch,
+    guard: User = Depends(require_role_async("guard")),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Reconcile scans a guard device accepted while offline.
+
+    Each event is consumed with the same conditional UPDATE as /verify, so a pass
+    used at two gates is detected as a replay server-side. Expiry is judged at the
+    device's scan time. All scan_logs rows are written in one bulk insert.
+
+    Events are idempotent per (guard, client_event_id): a resent event gets the
+    result recorded the first time and writes nothing.
+    """
+    now = now_ist()
+    max_age = timedelta(minutes=settings.OFFLINE_SCAN_MAX_AGE_MINUTES)
+    scan_logs = []
+    results = []
+
+    processed = {}
+    event_ids = {event.client_event_id for event in batch.events if event.client_event_id}
+    if event_ids:
+        rows = await db.execute(
+            select(ScanLog.client_event_id, ScanLog.pass_id, ScanLog.result, ScanLog.details)
+            .where(ScanLog.scanner_id == guard.id, ScanLog.client_event_id.in_(event_ids))
+        )
+        for row in rows:
+            processed[row.client_event_id] = {
+                "client_event_id": row.client_event_id,
+                "pass_id": row.pass_id or None,
+                "result": row.result,
+                "details": (row.details or "").removeprefix("offline:"),
+            }
+
+    for event in batch.events:
+        if event.client_event_id in processed:
+            results.append(processed[event.client_event_id])
+            continue
+
+        scanned_at = event.scanned_at if event.scanned_at.tzinfo else event.scanned_at.replace(tzinfo=IST)
+        scanned_at = min(scanned_at.astimezone(IST), now)
+        pid = uid = None
+        pass_type = "entry"
+
+        if now - scanned_at > max_age:
+            result, details = "invalid", "scan-too-old"
+        else:
+            parsed, rejection = check_token(event.token, now=int(scanned_at.timestamp()))
+            if parsed:
+                pid, uid = parsed.pass_id, parsed.user_id
+            if rejection:
+                result, details = rejection
+            else:
+                consumed_type = await consume_pass_row(db, pid, uid, guard.id, scanned_at)
+                if consumed_type:
+                    result, details, pass_type = "success", "verified-offline", consumed_type
+                else:
+                    pr = await db.get(PassRequest, pid)
+                    result, details = _unconsumable_reason(pr, uid)
+                    pass_type = (pr.pass_type if pr else None) or "entry"
+
+        scan_logs.append({
+            "pass_id": pid or 0,
+            "student_id": uid or 0,
+            "scanner_id": guard.id,
+            "scan_time": scanned_at,
+            "result": result,
+            "details": f"offline:{details}" if result != "success" else details,
+            "pass_type": pass_type,
+            "client_event_id": event.client_event_id,
+        })
+        results.append({
+            "client_event_id": event.client_event_id,
+            "pass_id": pid,
+            "result": result,
+            "details": details,
+        })
+        if event.client_event_id:
+            processed[event.client_event_id] = results[-1]
+
+    if scan_logs:
+        try:
+            await db.execute(insert(ScanLog), scan_logs)
+        except IntegrityError:
+            # The same events are being reconciled by a concurrent upload
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Batch is already being processed; retry shortly")
+        await record_scans(db, scan_logs)
+    await db.commit()
+    if scan_logs:
+        analytics_cache.invalidate()
+
+    accepted = sum(1 for item in results if item["result"] == "success")
+    return {"accepted": accepted, "rejected": len(results) - accepted, "results": results}
+
 # --- Auto Daily Entry (No Admin Approval Needed) ---
 @app.post("/passes/daily-entry", response_model=PassOut)
 async def auto_daily_entry(
     data: DailyEntryCreate,
-    user: User = Depends(require_role("student")), 
-    db: Session = Depends(get_db)
+    user: User = Depends(require_role_async("student")), 
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Auto-generate daily entry/exit pass without admin approval"""
     
@@ -989,16 +1316,18 @@ async def auto_daily_entry(
     pass_type = data.pass_type
     pass_label = "Entry" if pass_type == "entry" else "Exit"
     
-    print(f"DEBUG: Received pass_type={pass_type}, data={data}")
+    logger.debug("Daily %s pass requested", pass_type)
     
     # GPS Geofencing validation
     location_verified = False
     location_distance = None
+    location_zone = None
     if GEOFENCE_ENABLED and data.latitude is not None and data.longitude is not None:
         is_valid, message, details = geofence.validate_student_location(data.latitude, data.longitude)
         location_verified = is_valid
-        location_distance = str(details.get('distance_km', ''))
-        print(f"GPS: {message} - Lat: {data.latitude}, Lon: {data.longitude}")
+        location_distance = details.get('distance_km')
+        location_zone = details.get('zone')
+        logger.debug("GPS: %s - Lat: %s, Lon: %s", message, data.latitude, data.longitude)
         
         # Enforce location check for daily passes (stricter than regular passes)
         if not is_valid:
@@ -1017,72 +1346,37 @@ async def auto_daily_entry(
         if now_ist() > valid_until:
             raise HTTPException(status_code=403, detail="Student validity expired. Please contact an Access Control Administrator.")
     
-    # Check if student already has an active pass of this type for today (IST)
-    now_ist_time = now_ist()
-    today_ist = now_ist_time.date()
-    today_start_ist = datetime.combine(today_ist, datetime.min.time()).replace(tzinfo=IST)
-    
-    existing = db.query(PassRequest).filter(
-        PassRequest.student_id == user.id,
-        PassRequest.status.in_(["approved", "pending"]),
-        PassRequest.request_time >= today_start_ist,
-        PassRequest.pass_type == pass_type,
-        PassRequest.reason.like(f"Daily {pass_label}%")
-    ).first()
-    
-    if existing and existing.status == "approved":
-        # Return existing QR if already generated today
-        return existing
-    
-    if existing and existing.status == "pending":
-        # Auto-approve if pending
-        token, exp = make_qr_token(existing.id, user.id)
-        existing.status = "approved"
-        existing.approved_by = user.id  # Self-approved
-        existing.approved_time = now_ist()
-        existing.expiry_time = datetime.fromtimestamp(exp, tz=IST)
-        existing.qr_token = token
-        db.commit()
-        db.refresh(existing)
-        return existing
-    
-    # Create new auto-approved pass (use IST date)
-    today_str = today_ist.strftime("%d/%m/%Y")
-    reason = f"Daily {pass_label} - {today_str}"
-    
-    pr = PassRequest(
+    # One insert-or-return transaction keyed on (student, type, IST date); repeat taps
+    # are answered from the per-worker cache
+    today_ist = now_ist().date()
+    return await get_or_create_daily_pass(
+        db,
         student_id=user.id,
-        reason=reason,
         pass_type=pass_type,
-        status="pending",
-        request_latitude=str(data.latitude) if data.latitude else None,
-        request_longitude=str(data.longitude) if data.longitude else None,
+        reason=f"Daily {pass_label} - {today_ist.strftime('%d/%m/%Y')}",
+        today=today_ist,
+        request_latitude=data.latitude,
+        request_longitude=data.longitude,
+        location_cell=geohash.safe_encode(data.latitude, data.longitude),
         location_verified=location_verified,
-        location_distance_km=location_distance
+        location_distance_km=location_distance,
+        location_zone=location_zone,
     )
-    db.add(pr)
-    db.commit()
-    db.refresh(pr)
-    
-    # Auto-approve and generate QR
-    token, exp = make_qr_token(pr.id, user.id)
-    pr.status = "approved"
-    pr.approved_by = user.id  # Self-approved
-    pr.approved_time = now_ist()
-    pr.expiry_time = datetime.fromtimestamp(exp, tz=IST)
-    pr.qr_token = token
-    db.commit()
-    db.refresh(pr)
-    
-    return pr
 
 # Get recent scans (guards only)
 @app.get("/scans", response_model=List[ScanLogOut])
 def get_recent_scans(
+    request: Request,
+    response: Response,
     limit: int = 50,
     guard: User = Depends(require_role("guard")),
     db: Session = Depends(get_db)
 ):
+    latest_id, latest_time, _ = http_cache.scans_version(db)
+    not_modified = http_cache.conditional(request, response, limit, latest_id, last_modified=latest_time)
+    if not_modified is not None:
+        return not_modified
+
     scans = db.query(ScanLog).order_by(ScanLog.scan_time.desc()).limit(limit).all()
     
     # Enrich with student and scanner names
@@ -1119,9 +1413,19 @@ def get_recent_scans(
 # Get guard statistics
 @app.get("/scans/stats")
 def get_scan_stats(
+    request: Request,
+    response: Response,
     guard: User = Depends(require_role("guard")),
     db: Session = Depends(get_db)
 ):
+    # Today's counts move with new scans and the IST day; the all-time total also drops when logs are archived
+    latest_id, latest_time, segment_id = http_cache.scans_version(db)
+    not_modified = http_cache.conditional(
+        request, response, latest_id, segment_id, http_cache.ist_today(), last_modified=latest_time,
+    )
+    if not_modified is not None:
+        return not_modified
+
     # Get IST timezone info
     now = now_ist()
     today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -1169,6 +1473,55 @@ def get_scan_stats(
         "total_all_time": total_all_time
     }
 
+# === PRESENCE (who is on campus now) ===
+
+@app.get("/api/presence/headcount")
+def get_presence_headcount(
+    user: User = Depends(require_role("admin", "guard")),
+    db: Session = Depends(get_db)
+):
+    """Students whose last successful scan was an entry"""
+    return {"on_campus": presence.headcount(db), "as_of": now_ist().isoformat()}
+
+@app.get("/api/presence/by_class")
+def get_presence_by_class(
+    user: User = Depends(require_role("admin", "guard")),
+    db: Session = Depends(get_db)
+):
+    """On-campus headcount per student_class"""
+    classes = presence.headcount_by_class(db)
+    return {"classes": classes, "on_campus": sum(item["on_campus"] for item in classes)}
+
+@app.get("/api/presence/on_campus")
+def get_presence_list(
+    student_class: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    user: User = Depends(require_role("admin", "guard")),
+    db: Session = Depends(get_db)
+):
+    """Students currently on campus, most recent entry first"""
+    students = presence.on_campus(db, student_class=student_class, limit=limit, offset=offset)
+    return {"students": students, "count": len(students)}
+
+@app.post("/api/admin/presence/rebuild")
+def rebuild_presence_index(
+    admin: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    """Recompute the presence table from scan logs (Admin only)"""
+    return presence.rebuild_presence(db)
+
+@app.post("/api/admin/activity/rebuild")
+def rebuild_activity_counters(
+    admin: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    """Recount per-student daily activity counters from scan logs (Admin only)"""
+    rebuilt = activity.rebuild_activity(db)
+    analytics_cache.invalidate()
+    return rebuilt
+
 # === FACE AUTHENTICATION ENDPOINTS ===
 
 if FACE_AUTH_ENABLED:
@@ -1191,24 +1544,27 @@ if FACE_AUTH_ENABLED:
 
         # Read image bytes
         image_bytes = await file.read()
-        print(f"📷 Face registration attempt by {user.email} with file {file.filename!r} ({len(image_bytes)} bytes)")
+        logger.info("Face registration attempt by %s with file %r (%d bytes)", user.email, file.filename, len(image_bytes))
         
         # Validate image
-        is_valid, error_msg = face_auth_module.validate_image(image_bytes)
+        with metrics.face_timer(face_auth_module, "validate"):
+            is_valid, error_msg = face_auth_module.validate_image(image_bytes)
         if not is_valid:
-            print(f"❌ Face registration validation failed for {user.email}: {error_msg}")
+            logger.info("Face registration validation failed for %s: %s", user.email, error_msg)
             raise HTTPException(status_code=400, detail=error_msg)
         
         # Extract face encoding
-        encoding = face_auth_module.extract_face_encoding(image_bytes)
+        with metrics.face_timer(face_auth_module, "extract"):
+            encoding = face_auth_module.extract_face_encoding(image_bytes)
         if encoding is None:
-            print(f"❌ No face detected for {user.email}")
+            logger.info("No face detected for %s", user.email)
             raise HTTPException(
                 status_code=400,
                 detail="No clear face detected. Use a bright, upright photo with only one face visible and try again."
             )
 
-        duplicate_user, duplicate_distance = _find_duplicate_face_registration(db, user, encoding, face_auth_module)
+        with metrics.face_timer(face_auth_module, "duplicate_scan"):
+            duplicate_user, duplicate_distance = _find_duplicate_face_registration(db, user, encoding, face_auth_module)
         if duplicate_user is not None:
             raise HTTPException(
                 status_code=409,
@@ -1224,7 +1580,7 @@ if FACE_AUTH_ENABLED:
         user.face_registered_at = now_ist()
         db.commit()
         db.refresh(user)
-        print(f"✅ Face registered successfully for {user.email}")
+        logger.info("Face registered for %s", user.email)
         
         return FaceRegistrationResponse(
             status="success",
@@ -1266,12 +1622,14 @@ if FACE_AUTH_ENABLED:
         image_bytes = await file.read()
         
         # Validate image
-        is_valid, error_msg = face_auth_module.validate_image(image_bytes)
+        with metrics.face_timer(face_auth_module, "validate"):
+            is_valid, error_msg = face_auth_module.validate_image(image_bytes)
         if not is_valid:
             raise HTTPException(status_code=400, detail=error_msg)
         
         # Extract face encoding from uploaded image
-        check_encoding = face_auth_module.extract_face_encoding(image_bytes)
+        with metrics.face_timer(face_auth_module, "extract"):
+            check_encoding = face_auth_module.extract_face_encoding(image_bytes)
         if check_encoding is None:
             return FaceVerificationResponse(
                 verified=False,
@@ -1291,7 +1649,8 @@ if FACE_AUTH_ENABLED:
         
         # Compare faces
         tolerance = getattr(face_auth_module, "get_match_tolerance", lambda _=None: 0.6)(stored_encoding)
-        is_match, distance = face_auth_module.compare_faces(stored_encoding, check_encoding, tolerance=tolerance)
+        with metrics.face_timer(face_auth_module, "compare"):
+            is_match, distance = face_auth_module.compare_faces(stored_encoding, check_encoding, tolerance=tolerance)
         
         # Get confidence level
         confidence_info = face_auth_module.get_confidence_level(distance, stored_encoding)
@@ -1374,7 +1733,9 @@ if GEOFENCE_ENABLED:
             "longitude": longitude,
             "inside_campus": details.get("inside", False),
             "distance_km": details.get("distance_km"),
-            "distance_meters": details.get("distance_meters")
+            "distance_meters": details.get("distance_meters"),
+            "zone": details.get("zone"),
+            "zones": details.get("zones", [])
         }
 
     @app.get("/api/geofence_config")
@@ -1384,7 +1745,8 @@ if GEOFENCE_ENABLED:
             "type": "circular" if not geofence.campus_geofence.use_polygon else "polygon",
             "center": geofence.CAMPUS_CENTER if hasattr(geofence, 'CAMPUS_CENTER') else None,
             "radius_km": geofence.CAMPUS_RADIUS_KM if hasattr(geofence, 'CAMPUS_RADIUS_KM') else None,
-            "polygon": geofence.DEFAULT_CAMPUS_POLYGON if hasattr(geofence, 'DEFAULT_CAMPUS_POLYGON') else None
+            "polygon": geofence.DEFAULT_CAMPUS_POLYGON if hasattr(geofence, 'DEFAULT_CAMPUS_POLYGON') else None,
+            "zones": location_settings.get_zones()
         }
 
 # ============================================================================
@@ -1410,7 +1772,9 @@ if REALTIME_LOGS_ENABLED:
         db: Session = Depends(get_db)
     ):
         """Get scan statistics"""
-        return realtime_logs.get_log_statistics(db, days=days)
+        return analytics_cache.get_or_compute(
+            "statistics", {"days": days}, lambda: realtime_logs.get_log_statistics(db, days=days)
+        )
     
     @app.get("/api/logs/hourly")
     def get_hourly_stats_api(
@@ -1420,7 +1784,9 @@ if REALTIME_LOGS_ENABLED:
     ):
         """Get hourly statistics for a specific day"""
         date_obj = datetime.fromisoformat(date) if date else None
-        return realtime_logs.get_hourly_stats(db, date=date_obj)
+        return analytics_cache.get_or_compute(
+            "hourly", {"date": date}, lambda: realtime_logs.get_hourly_stats(db, date=date_obj)
+        )
     
     @app.get("/api/logs/daily")
     def get_daily_stats_api(
@@ -1429,7 +1795,9 @@ if REALTIME_LOGS_ENABLED:
         db: Session = Depends(get_db)
     ):
         """Get daily statistics for last N days"""
-        return realtime_logs.get_daily_stats(db, days=days)
+        return analytics_cache.get_or_compute(
+            "daily", {"days": days}, lambda: realtime_logs.get_daily_stats(db, days=days)
+        )
     
     @app.get("/api/logs/top_students")
     def get_top_active_students_api(
@@ -1439,10 +1807,19 @@ if REALTIME_LOGS_ENABLED:
         db: Session = Depends(get_db)
     ):
         """Get most active students"""
+        students = analytics_cache.get_or_compute(
+            "top_students", {"days": days, "limit": limit},
+            lambda: realtime_logs.get_top_active_students(db, days=days, limit=limit),
+        )
         return {
-            "students": realtime_logs.get_top_active_students(db, days=days, limit=limit),
+            "students": students,
             "period_days": days
         }
+
+    @app.get("/api/logs/cache_stats")
+    def get_analytics_cache_stats(admin: User = Depends(require_role("admin"))):
+        """Hit/miss counters of the admin analytics cache in this worker"""
+        return analytics_cache.stats()
     
     @app.get("/api/logs/search")
     def search_logs_api(
@@ -1452,12 +1829,17 @@ if REALTIME_LOGS_ENABLED:
         scan_type: Optional[str] = None,
         result: Optional[str] = None,
         limit: int = 100,
+        cursor: Optional[str] = None,
         admin: User = Depends(require_role("admin")),
         db: Session = Depends(get_db)
     ):
-        """Search logs with filters"""
+        """Search logs with filters; pass next_cursor back as `cursor` for the following page"""
         date_from_obj = datetime.fromisoformat(date_from) if date_from else None
         date_to_obj = datetime.fromisoformat(date_to) if date_to else None
+        try:
+            before = decode_log_cursor(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
         
         logs = realtime_logs.search_logs(
             db,
@@ -1466,16 +1848,85 @@ if REALTIME_LOGS_ENABLED:
             date_to=date_to_obj,
             scan_type=scan_type,
             result=result,
-            limit=limit
+            limit=limit,
+            before=before
         )
         
-        return {"logs": logs, "count": len(logs)}
+        next_cursor = encode_log_cursor(logs[-1]) if logs and len(logs) == limit else None
+        return {"logs": logs, "count": len(logs), "next_cursor": next_cursor}
+
+    @app.get("/api/users/search")
+    def search_users_api(
+        q: str = Query(..., min_length=1, max_length=100),
+        limit: int = Query(10, ge=1, le=50),
+        admin: User = Depends(require_role("admin")),
+        db: Session = Depends(get_db)
+    ):
+        """Typeahead over student names and IDs (Admin only)"""
+        return {"users": user_search.typeahead(db, q, limit=limit), "backend": user_search.backend}
 
-    def _authenticate_admin_websocket(token: Optional[str], db: Session) -> User:
+    @app.get("/api/logs/export")
+    def export_logs_api(
+        student_id: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        scan_type: Optional[str] = None,
+        result: Optional[str] = None,
+        format: str = Query("csv", pattern="^(csv|ndjson)$"),
+        gzip: bool = False,
+        admin: User = Depends(require_role("admin")),
+    ):
+        """Stream every matching log as CSV or NDJSON, optionally gzipped (Admin only)"""
+        try:
+            filters = {
+                "student_id": student_id,
+                "date_from": datetime.fromisoformat(date_from) if date_from else None,
+                "date_to": datetime.fromisoformat(date_to) if date_to else None,
+                "scan_type": scan_type,
+                "result": result,
+            }
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid date: {e}")
+
+        def stream():
+            # Request-scoped sessions are closed before the body is sent, so the stream owns its own
+            db = SessionLocal()
+            try:
+                yield from realtime_logs.iter_log_export(db, format, compress=gzip, **filters)
+            finally:
+                db.close()
+
+        filename = f"scan_logs_{now_ist().strftime('%Y%m%d_%H%M%S')}.{format}" + (".gz" if gzip else "")
+        media_type = "application/gzip" if gzip else ("text/csv" if format == "csv" else "application/x-ndjson")
+        return StreamingResponse(stream(), media_type=media_type,
+                                 headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+    @app.get("/api/admin/logs/archive")
+    def get_log_archive_status(
+        admin: User = Depends(require_role("admin")),
+        db: Session = Depends(get_db)
+    ):
+        """Hot/cold split of scan logs (Admin only)"""
+        return log_archive.archive_status(db)
+
+    @app.post("/api/admin/logs/archive")
+    def run_log_archive(
+        retention_days: Optional[int] = Query(None, ge=log_archive.MIN_RETENTION_DAYS),
+        dry_run: bool = False,
+        admin: User = Depends(require_role("admin")),
+        db: Session = Depends(get_db)
+    ):
+        """Move scan logs older than the retention horizon into the archive now (Admin only)"""
+        stats = log_archive.archive_old_logs(db, retention_days=retention_days, dry_run=dry_run)
+        if stats.get("archived"):
+            analytics_cache.invalidate()
+        return {**stats, "status": log_archive.archive_status(db)}
+
+    async def _authenticate_admin_websocket(token: Optional[str], db: AsyncSession) -> User:
         if not token:
             raise HTTPException(status_code=401, detail="Missing WebSocket token")
 
-        user = get_user_from_token(token, db)
+        user = await get_user_from_token_async(token, db)
         if user.role != "admin":
             raise HTTPException(status_code=403, detail="Admin access required")
         return user
@@ -1483,15 +1934,16 @@ if REALTIME_LOGS_ENABLED:
     @app.websocket("/ws/logs")
     async def websocket_logs_endpoint(websocket: WebSocket):
         """WebSocket endpoint for real-time log updates (Admin only)"""
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
             token = websocket.query_params.get("token")
-            _authenticate_admin_websocket(token, db)
+            await _authenticate_admin_websocket(token, db)
 
             await realtime_logs.manager.connect(websocket)
 
-            # Send initial recent logs
-            recent = realtime_logs.get_recent_logs(db, limit=10)
+            # Send initial recent logs, then release the connection for the socket's lifetime
+            recent = await db.run_sync(lambda sync_db: realtime_logs.get_recent_logs(sync_db, limit=10))
+            await db.close()
             await websocket.send_json({
                 "type": "initial",
                 "data": recent
@@ -1508,10 +1960,10 @@ if REALTIME_LOGS_ENABLED:
         except HTTPException as e:
             await websocket.close(code=1008, reason=e.detail)
         except Exception as e:
-            print(f"WebSocket error: {e}")
+            logger.warning("WebSocket error: %s", e)
             realtime_logs.manager.disconnect(websocket)
         finally:
-            db.close()
+            await db.close()
 
 # ============================================================================
 # EMERGENCY EXIT FEATURE
@@ -1550,8 +2002,13 @@ def request_emergency_exit(
         "emergency": True,
         "details": f"Emergency Exit: {request_data.reason}"
     })
+    for statement in scan_index_statements(db.bind.dialect.name, [{
+        "student_id": user.id, "pass_id": 0, "scan_time": now, "result": "success", "pass_type": "exit", "emergency": True,
+    }]):
+        db.execute(statement)
     
     db.commit()
+    analytics_cache.invalidate()
     
     # Send notifications
     if NOTIFICATIONS_ENABLED:
@@ -1585,7 +2042,7 @@ def request_emergency_exit(
                         f"Emergency exit alert: {user.name} ({user.student_id}) requested emergency exit",
                     )
         except Exception as e:
-            print(f"Failed to send emergency notifications: {e}")
+            logger.warning("Failed to send emergency notifications: %s", e)
     
     # Broadcast to real-time logs
     if REALTIME_LOGS_ENABLED:
@@ -1616,7 +2073,7 @@ def request_emergency_exit(
                 loop.run_until_complete(realtime_logs.broadcast_new_scan(scan_data))
                 loop.close()
         except Exception as e:
-            print(f"Failed to broadcast emergency exit: {e}")
+            logger.warning("Failed to broadcast emergency exit: %s", e)
     
     return {
         "status": "exit_granted",
@@ -1642,6 +2099,80 @@ def healthz(db: Session = Depends(get_db)):
     db.execute(text("SELECT 1"))
     return {"status": "ok"}
 
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """Prometheus text exposition of this worker's metrics (METRICS_ENABLED)"""
+    if not metrics.enabled:
+        raise HTTPException(404, "Metrics are disabled")
+    if settings.METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {settings.METRICS_TOKEN}":
+        raise HTTPException(401, "Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+if metrics.enabled:
+    metrics.register_callback("smartgate_analytics_cache_hits_total", "Admin analytics cache hits",
+                              lambda: analytics_cache.stats()["hits"], kind="counter")
+    metrics.register_callback("smartgate_analytics_cache_misses_total", "Admin analytics cache misses",
+                              lambda: analytics_cache.stats()["misses"], kind="counter")
+    metrics.register_callback("smartgate_analytics_cache_coalesced_total", "Analytics requests that waited on an in-flight computation",
+                              lambda: analytics_cache.stats()["coalesced"], kind="counter")
+
+
+def _require_profiling():
+    if not profiling.enabled:
+        raise HTTPException(404, "Profiling is disabled")
+
+
+@app.get("/api/admin/profiling")
+def get_profiling_state(admin: User = Depends(require_role("admin"))):
+    """Sampling rates, armed captures and stored profile counts of this worker (Admin only)"""
+    _require_profiling()
+    return profiling.profiler.state()
+
+
+@app.post("/api/admin/profiling")
+def update_profiling(toggle: ProfilingToggle, admin: User = Depends(require_role("admin"))):
+    """Change this worker's sampling rates or profile its next N requests (Admin only)"""
+    _require_profiling()
+    logger.info("Admin %s updated profiling: %s", admin.email, toggle.model_dump(exclude_none=True))
+    return profiling.profiler.configure(**toggle.model_dump())
+
+
+@app.get("/api/admin/profiles")
+def list_profiles(
+    group: Optional[str] = Query(None, pattern="^(gate|other)$"),
+    admin: User = Depends(require_role("admin")),
+):
+    """Slowest profiled requests kept by this worker, slowest first (Admin only)"""
+    _require_profiling()
+    return {"profiles": [profile.summary() for profile in profiling.profiler.store.list(group)]}
+
+
+@app.get("/api/admin/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    admin: User = Depends(require_role("admin")),
+):
+    """One profile: JSON breakdown, or collapsed stacks for speedscope / flamegraph.pl (Admin only)"""
+    _require_profiling()
+    profile = profiling.profiler.store.get(profile_id)
+    if not profile:
+        raise HTTPException(404, "Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(
+            profile.collapsed(),
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile.id}.collapsed.txt"'},
+        )
+    return profile.detail()
+
+
+@app.delete("/api/admin/profiles")
+def clear_profiles(admin: User = Depends(require_role("admin"))):
+    """Drop this worker's stored profiles (Admin only)"""
+    _require_profiling()
+    return {"cleared": profiling.profiler.store.clear()}
+
 # Serve Firebase service worker
 @app.get("/firebase-messaging-sw.js")
 async def firebase_service_worker():
@@ -1659,16 +2190,18 @@ class LocationSettings(BaseModel):
     longitude: float
     radius_km: float
     enabled: bool
+    zones: Optional[List[GeofenceZone]] = None  # replaces the zone registry when given
 
 @app.get("/api/admin/location")
 def get_location_settings_admin(user: User = Depends(require_role("admin"))):
     """Get current location settings (Admin only)"""
-    print(f"📍 Admin {user.name} (role: {user.role}) accessing location settings")
+    logger.debug("Admin %s reading location settings", user.email)
     
     if not GEOFENCE_ENABLED:
         raise HTTPException(503, "Geofencing is not enabled")
     
     settings = location_settings.get_location_settings()
+    settings["zones"] = location_settings.get_zones()
     return settings
 
 @app.post("/api/admin/location")
@@ -1677,12 +2210,17 @@ def update_location_settings(
     user: User = Depends(require_role("admin"))
 ):
     """Update location settings (Admin only)"""
-    print(f"📝 Admin {user.name} (role: {user.role}) updating location settings")
+    logger.info("Admin %s updating location settings", user.email)
     
     if not GEOFENCE_ENABLED:
         raise HTTPException(503, "Geofencing is not enabled")
     
     try:
+        zones = None
+        if settings.zones is not None:
+            # Reject bad zones before anything is written
+            zones = [zone.model_dump() for zone in settings.zones]
+            location_settings.validate_zones(zones)
         updated = location_settings.update_location(
             latitude=settings.latitude,
             longitude=settings.longitude,
@@ -1690,29 +2228,180 @@ def update_location_settings(
             campus_name=settings.campus_name,
             enabled=settings.enabled
         )
-        print(f"✅ Location settings updated successfully by {user.name}")
+        if zones is not None:
+            location_settings.save_zones(zones)
+        updated["zones"] = location_settings.get_zones()
+        logger.info("Location settings updated by %s", user.email)
         return {"message": "Location settings updated successfully", "settings": updated}
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
-        print(f"❌ Error updating location settings: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error updating location settings")
         raise HTTPException(500, f"Failed to update location settings: {str(e)}")
 
+@app.get("/api/admin/location/zones")
+def list_geofence_zones(user: User = Depends(require_role("admin"))):
+    """List extra geofence zones (Admin only)"""
+    if not GEOFENCE_ENABLED:
+        raise HTTPException(503, "Geofencing is not enabled")
+    return location_settings.get_zones_document()
+
+@app.put("/api/admin/location/zones/{name}")
+def upsert_geofence_zone(name: str, zone: GeofenceZone, user: User = Depends(require_role("admin"))):
+    """Create or replace a named geofence zone (Admin only)"""
+    if not GEOFENCE_ENABLED:
+        raise HTTPException(503, "Geofencing is not enabled")
+    if zone.name != name:
+        raise HTTPException(400, "Zone name in body does not match URL")
+
+    document = location_settings.upsert_zone(zone.model_dump())
+    logger.info("Geofence zone %r saved by %s", name, user.email)
+    return {"message": f"Zone '{name}' saved", **document}
+
+@app.delete("/api/admin/location/zones/{name}")
+def delete_geofence_zone(name: str, user: User = Depends(require_role("admin"))):
+    """Delete a named geofence zone (Admin only)"""
+    if not GEOFENCE_ENABLED:
+        raise HTTPException(503, "Geofencing is not enabled")
+    if not location_settings.delete_zone(name):
+        raise HTTPException(404, f"Zone '{name}' not found")
+
+    logger.info("Geofence zone %r deleted by %s", name, user.email)
+    return {"message": f"Zone '{name}' deleted", **location_settings.get_zones_document()}
+
+@app.post("/api/admin/location/validate_batch")
+def validate_location_batch(batch: LocationBatchIn, user: User = Depends(require_role("admin"))):
+    """Validate many coordinates in one vectorized pass (Admin only)"""
+    if not GEOFENCE_ENABLED:
+        raise HTTPException(503, "Geofencing is not enabled")
+    return location_audit.evaluate_points(batch.latitudes, batch.longitudes, batch.ids, batch.buffer_meters)
+
+@app.post("/api/admin/location/validate_batch/csv")
+def validate_location_csv(
+    file: UploadFile = File(...),
+    buffer_meters: int = Query(50, ge=0, le=1000),
+    summary_only: bool = Query(False),
+    user: User = Depends(require_role("admin"))
+):
+    """Validate an uploaded id/latitude/longitude CSV (Admin only)"""
+    if not GEOFENCE_ENABLED:
+        raise HTTPException(503, "Geofencing is not enabled")
+
+    try:
+        # Stream rows straight from the spooled upload instead of reading it into memory
+        points = location_audit.read_points_csv(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(400, f"Invalid CSV: {e}")
+
+    report = location_audit.evaluate_points(points["latitudes"], points["longitudes"], points["ids"], buffer_meters)
+    return report["summary"] if summary_only else report
+
+@app.post("/api/admin/location/revalidate_passes")
+def revalidate_pass_locations(
+    write_back: bool = Query(False),
+    chunk_size: int = Query(1000, ge=100, le=10000),
+    buffer_meters: int = Query(50, ge=0, le=1000),
+    user: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    """Re-check stored pass request locations against the current geofence (Admin only)"""
+    if not GEOFENCE_ENABLED:
+        raise HTTPException(503, "Geofencing is not enabled")
+
+    stats = location_audit.revalidate_passes(db, write_back=write_back, chunk_size=chunk_size,
+                                             buffer_meters=buffer_meters)
+    logger.info("Admin %s re-validated pass locations: %s", user.email, stats)
+    return stats
+
+@app.get("/api/admin/location/heatmap")
+def pass_location_heatmap(
+    precision: int = Query(7, ge=4, le=geohash.STORED_PRECISION),
+    days: Optional[int] = Query(30, ge=1, le=3650),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    user: User = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    """
+    Pass request density per geohash cell (Admin only).
+
+    Aggregated in SQL over the indexed location_cell prefix, so the map gets one
+    row per cell instead of every request.
+    """
+    cell = func.substr(PassRequest.location_cell, 1, precision).label("cell")
+    # Databases not yet converted by bootstrap.py still store these as TEXT
+    latitude = numeric_sql(PassRequest.request_latitude)
+    longitude = numeric_sql(PassRequest.request_longitude)
+    query = (
+        select(
+            cell,
+            func.count().label("count"),
+            func.sum(case((PassRequest.location_verified.is_(True), 1), else_=0)).label("verified"),
+            func.avg(latitude).label("latitude"),
+            func.avg(longitude).label("longitude"),
+        )
+        .where(PassRequest.location_cell.isnot(None), PassRequest.location_cell != "")
+        .group_by(cell)
+    )
+    if days:
+        query = query.where(PassRequest.request_time >= now_ist() - timedelta(days=days))
+
+    bbox = (min_lat, min_lon, max_lat, max_lon)
+    if any(value is not None for value in bbox):
+        if any(value is None for value in bbox) or min_lat > max_lat or min_lon > max_lon:
+            raise HTTPException(400, "Bounding box needs min_lat <= max_lat and min_lon <= max_lon")
+        # Index range scan on the shared geohash prefix, exact box on the float columns
+        prefix = geohash.common_prefix(min_lat, min_lon, max_lat, max_lon)
+        if prefix:
+            query = query.where(PassRequest.location_cell >= prefix, PassRequest.location_cell < prefix + "~")
+        query = query.where(
+            latitude.between(min_lat, max_lat),
+            longitude.between(min_lon, max_lon),
+        )
+
+    cells = []
+    for row in db.execute(query).all():
+        south, west, north, east = geohash.bounds(row.cell)
+        cells.append({
+            "cell": row.cell,
+            "count": row.count,
+            "verified": int(row.verified or 0),
+            "latitude": round(float(row.latitude), 6),
+            "longitude": round(float(row.longitude), 6),
+            "bounds": [[south, west], [north, east]],
+        })
+    cells.sort(key=lambda item: item["count"], reverse=True)
+    return {
+        "precision": precision,
+        "days": days,
+        "total": sum(item["count"] for item in cells),
+        "max_count": cells[0]["count"] if cells else 0,
+        "cells": cells,
+    }
+
 @app.get("/api/location")
-def get_public_location_settings():
+def get_public_location_settings(request: Request, response: Response):
     """Get location settings for students (public endpoint)"""
     if not GEOFENCE_ENABLED:
         return {"enabled": False, "message": "Geofencing disabled"}
     
     settings = location_settings.get_location_settings()
     # Return only necessary info for students
-    return {
+    payload = {
         "enabled": settings.get("enabled", True),
         "campus_name": settings.get("campus_name", "Campus"),
         "latitude": settings.get("latitude"),
         "longitude": settings.get("longitude"),
-        "radius_km": settings.get("radius_km", 2.0)
+        "radius_km": settings.get("radius_km", 2.0),
+        "version": settings.get("version", 0)
     }
+    # The settings live in memory, so the fields themselves are the version
+    not_modified = http_cache.conditional(request, response, sorted(payload.items()))
+    if not_modified is not None:
+        return not_modified
+    return payload
 
 # Mount static files (frontend)
 # Get the parent directory (smart Gate folder)
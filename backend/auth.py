@@ -3,10 +3,11 @@ import jwt
 from passlib.hash import bcrypt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from models import User
 from settings import settings
-from database import get_db
+from database import get_db, get_async_db
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -43,14 +44,21 @@ def verify_parent_access_token(token: str) -> str:
         raise HTTPException(status_code=401, detail="Invalid parent access token")
     return str(student_id)
 
-def get_user_from_token(token: str, db: Session) -> User:
+def _user_id_from_token(token: str) -> int:
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
-        uid: int = int(payload.get("sub"))
+        return int(payload.get("sub"))
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.get(User, uid)
+def get_user_from_token(token: str, db: Session) -> User:
+    user = db.get(User, _user_id_from_token(token))
+    if not user or not user.active:
+        raise HTTPException(status_code=401, detail="User inactive")
+    return user
+
+async def get_user_from_token_async(token: str, db: AsyncSession) -> User:
+    user = await db.get(User, _user_id_from_token(token))
     if not user or not user.active:
         raise HTTPException(status_code=401, detail="User inactive")
     return user
@@ -58,6 +66,9 @@ def get_user_from_token(token: str, db: Session) -> User:
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
     return get_user_from_token(token, db)
 
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> User:
+    return await get_user_from_token_async(token, db)
+
 def require_role(*roles):
     def _dep(user: User = Depends(get_current_user)):
         if user.role not in roles:
@@ -65,3 +76,11 @@ def require_role(*roles):
         return user
     return _dep
 
+def require_role_async(*roles):
+    """Same as require_role, but resolves the user on the async session (no threadpool hop)."""
+    async def _dep(user: User = Depends(get_current_user_async)):
+        if user.role not in roles:
+            raise HTTPException(status_code=403, detail="Forbidden")
+        return user
+    return _dep
+
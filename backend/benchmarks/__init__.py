@@ -0,0 +1,5 @@
+"""
+Offline benchmarks for the gate workflow.
+
+Run from the backend directory, e.g. `python -m benchmarks.qr_tokens`.
+"""
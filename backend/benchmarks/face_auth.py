@@ -0,0 +1,440 @@
+"""
+face_auth benchmark: per-stage timings and FAR/FRR over the match tolerances.
+
+Runs every image of a labelled set through each available backend:
+- opencv: decode, resize (+ grayscale), rotate, detect, crop, lbp, hog and
+  template, plus the end-to-end extract call and per-pair compare;
+- face_recognition: decode, resize, locate, encode and compare.
+Then scores all genuine (same person) and impostor pairs with the backend's
+own comparison, sweeps the tolerance to give FAR/FRR curves and the equal
+error rate, and reports the operating points at the current match and
+duplicate-registration tolerances (OPENCV_MATCH_TOLERANCE /
+OPENCV_DUPLICATE_TOLERANCE for opencv).
+
+The image set is a directory with one sub-directory of photos per person
+(--images DIR), or the deterministic synthetic faces from
+benchmarks/synthetic_faces.py by default. Synthetic faces are fine for timing
+and for catching regressions, but judge absolute accuracy on real photos.
+
+Usage (from backend/):
+    python -m benchmarks.face_auth [--images DIR] [--identities 20] [--variants 5]
+        [--backends opencv,face_recognition] [--repeat 1] [--output run.json]
+        [--compare baseline.json] [--json]
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+    import face_auth
+except ImportError as e:
+    raise SystemExit(f"The face_auth benchmark needs the face auth dependencies (NumPy, Pillow): {e}")
+
+# IST timezone (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+BACKENDS = ("opencv", "face_recognition")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+# Tolerance sweep per backend: (start, stop, step)
+SWEEPS = {"opencv": (0.0, 0.40, 0.005), "face_recognition": (0.20, 0.80, 0.01)}
+
+Sample = Tuple[str, str, bytes]  # (identity, image name, bytes)
+
+
+def load_images(directory: str) -> List[Sample]:
+    samples = []
+    for identity in sorted(os.listdir(directory)):
+        person_dir = os.path.join(directory, identity)
+        if not os.path.isdir(person_dir):
+            continue
+        for name in sorted(os.listdir(person_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(person_dir, name), "rb") as f:
+                    samples.append((identity, name, f.read()))
+    return samples
+
+
+def synthetic_images(identities: int, variants: int) -> List[Sample]:
+    from benchmarks.synthetic_faces import dataset
+
+    return [(f"synthetic-{identity:03d}", f"v{variant}.jpg", data) for identity, variant, data in dataset(identities, variants)]
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    @contextlib.contextmanager
+    def __call__(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[stage].append(time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, dict]:
+        return {stage: _latency_stats(values) for stage, values in self.samples.items()}
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def _latency_stats(values: List[float]) -> dict:
+    ordered = sorted(values)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "count": len(ordered),
+        "mean_ms": ms(sum(ordered) / len(ordered)),
+        "p50_ms": ms(_percentile(ordered, 50)),
+        "p95_ms": ms(_percentile(ordered, 95)),
+        "max_ms": ms(ordered[-1]),
+    }
+
+
+def _same_encoding(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(
+            a[key] == b[key] if isinstance(a[key], str) else np.allclose(a[key], b[key]) for key in a
+        )
+    return bool(np.allclose(a, b))
+
+
+# --- opencv -----------------------------------------------------------------
+
+def opencv_stages(image_bytes: bytes, timer: StageTimer) -> Tuple[Optional[dict], int]:
+    """face_auth._extract_opencv_encoding split into timed stages; returns (encoding, detection attempts)"""
+    cv2 = face_auth._import_cv2()
+    with timer("decode"):
+        image, _ = face_auth._load_normalized_image(image_bytes)
+    with timer("resize"):
+        image = face_auth._resize_for_face_processing(image)
+        gray_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+    with timer("rotate"):
+        candidates = face_auth._rotated_gray_candidates(gray_image)
+
+    face_box, attempts = None, 0
+    with timer("detect"):
+        for candidate in candidates:
+            attempts += 1
+            face_box = face_auth._detect_largest_face(candidate)
+            if face_box is not None:
+                break
+    if face_box is None:
+        return None, attempts
+
+    with timer("crop"):
+        face_region = face_auth._crop_face(candidate, face_box)
+    with timer("lbp"):
+        grid_lbp = face_auth._grid_lbp_descriptor(face_region)
+    with timer("hog"):
+        hog = face_auth._hog_descriptor(face_region)
+    with timer("template"):
+        template = face_auth._template_vector(face_region)
+    return {
+        "backend": face_auth.CURRENT_OPENCV_ENCODING_BACKEND,
+        "grid_lbp": grid_lbp.tolist(),
+        "hog": hog.tolist(),
+        "template": template.tolist(),
+    }, attempts
+
+
+@contextlib.contextmanager
+def _uncapped_opencv_tolerance():
+    # compare caps the tolerance at OPENCV_MATCH_TOLERANCE; lift the cap so one call yields
+    # (component gates passed, combined distance) and any tolerance can be applied afterwards
+    saved = face_auth.OPENCV_MATCH_TOLERANCE
+    face_auth.OPENCV_MATCH_TOLERANCE = 1.0
+    try:
+        yield
+    finally:
+        face_auth.OPENCV_MATCH_TOLERANCE = saved
+
+
+def opencv_score(known: dict, check: dict) -> Tuple[bool, float]:
+    return face_auth._compare_opencv_strict_encodings(known, check, tolerance=1.0)
+
+
+# --- face_recognition -------------------------------------------------------
+
+def face_recognition_stages(image_bytes: bytes, timer: StageTimer) -> Tuple[Optional[list], int]:
+    """face_auth._extract_face_recognition_encoding split into timed stages"""
+    face_recognition = face_auth._import_face_recognition()
+    with timer("decode"):
+        image, _ = face_auth._load_normalized_image(image_bytes)
+    with timer("resize"):
+        img_array = np.array(face_auth._resize_for_face_processing(image))
+    attempts = 1
+    with timer("locate"):
+        locations = face_recognition.face_locations(img_array, number_of_times_to_upsample=0, model="hog")
+        if not locations:
+            attempts = 2
+            locations = face_recognition.face_locations(img_array, number_of_times_to_upsample=1, model="hog")
+    if not locations:
+        return None, attempts
+    largest = max(locations, key=lambda box: (box[2] - box[0]) * (box[1] - box[3]))
+    with timer("encode"):
+        encodings = face_recognition.face_encodings(img_array, [largest])
+    return (encodings[0].tolist() if encodings else None), attempts
+
+
+def face_recognition_score(known: list, check: list) -> Tuple[bool, float]:
+    _, distance = face_auth._compare_face_recognition_encodings(known, check, tolerance=float("inf"))
+    return True, distance
+
+
+PIPELINES: Dict[str, Tuple[Callable, Callable, Callable, Callable]] = {
+    # backend: (import check, staged extract, production extract, pair score)
+    "opencv": (face_auth._import_cv2, opencv_stages, face_auth._extract_opencv_encoding, opencv_score),
+    "face_recognition": (
+        face_auth._import_face_recognition, face_recognition_stages,
+        face_auth._extract_face_recognition_encoding, face_recognition_score,
+    ),
+}
+
+
+def tolerances(backend: str) -> Dict[str, float]:
+    if backend == "opencv":
+        return {"match": face_auth.OPENCV_MATCH_TOLERANCE, "duplicate": face_auth.OPENCV_DUPLICATE_TOLERANCE}
+    # face_auth keys tolerances on the encoding format; a list is a face_recognition encoding
+    return {"match": face_auth.get_match_tolerance([]), "duplicate": face_auth.get_duplicate_tolerance([])}
+
+
+# --- accuracy ---------------------------------------------------------------
+
+def pair_scores(encodings: List[Tuple[str, object]], score: Callable, max_impostor_pairs: int,
+                timer: StageTimer, rng: random.Random) -> Tuple[List[Tuple[bool, float]], List[Tuple[bool, float]]]:
+    """(gates passed, distance) for every genuine pair and up to `max_impostor_pairs` impostor pairs"""
+    genuine_pairs, impostor_pairs = [], []
+    for (id_a, enc_a), (id_b, enc_b) in itertools.combinations(encodings, 2):
+        (genuine_pairs if id_a == id_b else impostor_pairs).append((enc_a, enc_b))
+    if len(impostor_pairs) > max_impostor_pairs:
+        impostor_pairs = rng.sample(impostor_pairs, max_impostor_pairs)
+
+    def run(pairs):
+        results = []
+        for known, check in pairs:
+            with timer("compare"):
+                results.append(score(known, check))
+        return results
+
+    return run(genuine_pairs), run(impostor_pairs)
+
+
+def rates(genuine: List[Tuple[bool, float]], impostor: List[Tuple[bool, float]], tolerance: float) -> dict:
+    accepted = lambda result: result[0] and result[1] <= tolerance
+    far = sum(map(accepted, impostor)) / len(impostor) if impostor else None
+    frr = sum(not accepted(result) for result in genuine) / len(genuine) if genuine else None
+    return {"tolerance": round(tolerance, 4), "far": _round(far), "frr": _round(frr)}
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 5)
+
+
+def sweep(genuine, impostor, start: float, stop: float, step: float) -> List[dict]:
+    steps = int(round((stop - start) / step))
+    return [rates(genuine, impostor, start + i * step) for i in range(steps + 1)]
+
+
+def equal_error_rate(curve: List[dict]) -> Optional[dict]:
+    points = [point for point in curve if point["far"] is not None and point["frr"] is not None]
+    if not points:
+        return None
+    best = min(points, key=lambda point: abs(point["far"] - point["frr"]))
+    return {"tolerance": best["tolerance"], "rate": round((best["far"] + best["frr"]) / 2, 5)}
+
+
+def _distance_stats(results: List[Tuple[bool, float]]) -> Optional[dict]:
+    if not results:
+        return None
+    ordered = sorted(distance for _, distance in results)
+    return {
+        "min": round(ordered[0], 4),
+        "p50": round(_percentile(ordered, 50), 4),
+        "p95": round(_percentile(ordered, 95), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+
+# --- runner -----------------------------------------------------------------
+
+def evaluate_backend(backend: str, samples: List[Sample], repeat: int, max_impostor_pairs: int, seed: int) -> dict:
+    check_import, staged, production, score = PIPELINES[backend]
+    try:
+        check_import()
+    except Exception as e:
+        return {"available": False, "error": f"{type(e).__name__}: {e}"}
+
+    timer = StageTimer()
+    staged(samples[0][2], StageTimer())  # warm-up: loads cascades / models outside the timings
+
+    encodings, attempts, mismatches = [], Counter(), 0
+    for identity, _, image_bytes in samples:
+        encoding = None
+        for _ in range(max(1, repeat)):
+            try:
+                encoding, tries = staged(image_bytes, timer)
+            except Exception:  # unreadable image: production logs it and returns None
+                encoding, tries = None, 0
+        attempts[tries] += 1
+        for _ in range(max(1, repeat)):
+            with timer("extract_total"):
+                reference = production(image_bytes)
+        # The staged copy must stay in step with face_auth, or its timings describe a different pipeline
+        mismatches += not _same_encoding(encoding, reference)
+        if encoding is not None:
+            encodings.append((identity, encoding))
+
+    compare_timer = StageTimer()
+    guard = _uncapped_opencv_tolerance() if backend == "opencv" else contextlib.nullcontext()
+    with guard:
+        genuine, impostor = pair_scores(encodings, score, max_impostor_pairs, compare_timer, random.Random(seed))
+    if compare_timer.samples:
+        timer.samples["compare"] = compare_timer.samples["compare"]
+
+    curve = sweep(genuine, impostor, *SWEEPS[backend])
+    failures = len(samples) - len(encodings)
+    return {
+        "available": True,
+        "stages": timer.stats(),
+        "failure_to_extract": failures,
+        "fte_rate": round(failures / len(samples), 5),
+        "detect_attempts": {str(tries): count for tries, count in sorted(attempts.items())},
+        "pipeline_mismatches": mismatches,
+        "pairs": {"genuine": len(genuine), "impostor": len(impostor)},
+        "distances": {"genuine": _distance_stats(genuine), "impostor": _distance_stats(impostor)},
+        "operating_points": {name: rates(genuine, impostor, value) for name, value in tolerances(backend).items()},
+        "eer": equal_error_rate(curve),
+        "curve": curve,
+    }
+
+
+def compare(report: dict, baseline: dict, max_slowdown: float, max_far_increase: float,
+            max_frr_increase: float) -> List[dict]:
+    """Per backend: extract p50 slowdown and FAR/FRR changes at each operating point against the baseline"""
+    rows = []
+    for backend, current in report["backends"].items():
+        before = baseline.get("backends", {}).get(backend)
+        if not current.get("available") or not before or not before.get("available"):
+            continue
+        old_ms, new_ms = before["stages"]["extract_total"]["p50_ms"], current["stages"]["extract_total"]["p50_ms"]
+        slowdown = new_ms / old_ms - 1 if old_ms else 0.0
+        rows.append({
+            "backend": backend, "check": "extract_total p50 ms", "before": old_ms, "after": new_ms,
+            "regressed": slowdown > max_slowdown,
+        })
+        for point, values in current["operating_points"].items():
+            old = before["operating_points"].get(point)
+            if not old:
+                continue
+            for metric, limit in (("far", max_far_increase), ("frr", max_frr_increase)):
+                if values[metric] is None or old[metric] is None:
+                    continue
+                rows.append({
+                    "backend": backend, "check": f"{metric} at {point} tolerance",
+                    "before": old[metric], "after": values[metric],
+                    "regressed": values[metric] - old[metric] > limit,
+                })
+    return rows
+
+
+def _print_report(report: dict):
+    meta = report["meta"]
+    print(f"{meta['images']} images of {meta['identities']} people ({meta['source']})")
+    for backend, result in report["backends"].items():
+        if not result["available"]:
+            print(f"\n{backend}: unavailable ({result['error']})")
+            continue
+        print(f"\n{backend}: failed to extract {result['failure_to_extract']} "
+              f"({result['fte_rate']:.1%}), pipeline mismatches {result['pipeline_mismatches']}")
+        print(f"  {'stage':<14} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'count':>7}")
+        for stage, stats in result["stages"].items():
+            print(f"  {stage:<14} {stats['mean_ms']:>9} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['count']:>7}")
+        print(f"  pairs: {result['pairs']['genuine']} genuine, {result['pairs']['impostor']} impostor")
+        for name, point in result["operating_points"].items():
+            print(f"  {name:<10} tolerance {point['tolerance']:<6} FAR {point['far']}  FRR {point['frr']}")
+        if result["eer"]:
+            print(f"  EER {result['eer']['rate']} at tolerance {result['eer']['tolerance']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", help="directory with one sub-directory of photos per person")
+    parser.add_argument("--identities", type=int, default=20, help="synthetic people when --images is not given")
+    parser.add_argument("--variants", type=int, default=5, help="synthetic captures per person")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per image")
+    parser.add_argument("--max-impostor-pairs", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--max-slowdown", type=float, default=0.2, help="allowed extract_total p50 growth")
+    parser.add_argument("--max-far-increase", type=float, default=0.005)
+    parser.add_argument("--max-frr-increase", type=float, default=0.02)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    backends = [name.strip() for name in args.backends.split(",") if name.strip()]
+    unknown = set(backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(sorted(unknown))}")
+
+    samples = load_images(args.images) if args.images else synthetic_images(args.identities, args.variants)
+    if not samples:
+        parser.error("no images found")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(IST).isoformat(timespec="seconds"),
+            "source": os.path.abspath(args.images) if args.images else "synthetic",
+            "images": len(samples),
+            "identities": len({identity for identity, _, _ in samples}),
+            "repeat": args.repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv_encoding": face_auth.CURRENT_OPENCV_ENCODING_BACKEND,
+        },
+        "backends": {
+            backend: evaluate_backend(backend, samples, args.repeat, args.max_impostor_pairs, args.seed)
+            for backend in backends
+        },
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f), args.max_slowdown,
+                                           args.max_far_increase, args.max_frr_increase)
+        regressions = [row for row in report["comparison"] if row["regressed"]]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+        for row in report.get("comparison", []):
+            flag = "REGRESSED" if row["regressed"] else "ok"
+            print(f"  {row['backend']:<16} {row['check']:<28} {row['before']} -> {row['after']}  {flag}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
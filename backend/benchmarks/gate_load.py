@@ -0,0 +1,508 @@
+"""
+Load test for the gate workflow: bulk-seeds a database, drives concurrent
+traffic at the app in-process and reports latency percentiles and throughput
+per endpoint.
+
+Scenarios run one after another, each with --concurrency clients:
+    login        POST /auth/login (one bcrypt check per request)
+    daily_entry  POST /passes/daily-entry
+    verify       POST /verify with a QR token only
+    verify_face  POST /verify with a synthetic face image (--face; needs OpenCV and Pillow)
+    scans        GET /scans and /scans/stats
+    logs         GET /api/logs/statistics, /daily, /hourly, /top_students, /search and /recent
+
+Requests go through httpx's ASGI transport, so the numbers cover the backend
+and its database but not uvicorn or the network. Lifespan events are not run,
+so the log archiver and scan-failure flusher stay off.
+
+Without --db-url a fresh SQLite file in a temp directory is used. Point
+--db-url at a throwaway local Postgres database to compare backends; bench
+users found there are reused, and fresh passes are seeded on every run.
+
+Usage (from backend/):
+    python -m benchmarks.gate_load [--db-url URL] [--students 500] [--requests 500]
+        [--login-requests 100] [--concurrency 20] [--scenarios login,verify,...] [--face]
+        [--output results.json] [--compare baseline.json] [--threshold 0.2] [--json]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+# IST timezone (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+SCENARIOS = ("login", "daily_entry", "verify", "verify_face", "scans", "logs")
+BENCH_DOMAIN = "bench.local"
+BENCH_PASSWORD = "bench-pass-123"
+FACE_VARIANTS = 4  # captures per enrolled identity sent to /verify
+SEED_BATCH = 5000
+
+
+def _configure_environment(args) -> str:
+    # settings are read once at import, so this must run before any backend module is imported
+    db_url = args.db_url or f"sqlite:///{tempfile.mkdtemp(prefix='smartgate-bench-')}/bench.db"
+    os.environ["DB_URL"] = db_url
+    os.environ["FACE_AUTH_ENABLED"] = "true" if args.face else "false"
+    os.environ["NOTIFICATIONS_ENABLED"] = "false"
+    if args.no_analytics_cache:
+        os.environ["ANALYTICS_CACHE_SECONDS"] = "0"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    return db_url
+
+
+def _now_ist() -> datetime:
+    return datetime.now(IST).replace(tzinfo=None)
+
+
+def _bulk_insert(db, table, rows: List[dict]):
+    from sqlalchemy import insert
+
+    for start in range(0, len(rows), SEED_BATCH):
+        db.execute(insert(table), rows[start:start + SEED_BATCH])
+
+
+def seed_users(db, students: int, guards: int) -> Dict[str, List[Tuple[int, str]]]:
+    """Create missing bench users (one shared bcrypt hash) and return (id, email) per role"""
+    from sqlalchemy import select
+    from auth import hash_pwd
+    from models import User
+
+    wanted = [("admin", f"bench-admin@{BENCH_DOMAIN}", "Bench Admin", None)]
+    wanted += [("guard", f"bench-guard-{i}@{BENCH_DOMAIN}", f"Bench Guard {i}", None) for i in range(guards)]
+    wanted += [
+        ("student", f"bench-student-{i}@{BENCH_DOMAIN}", f"Bench Student {i}", f"BENCH{i:05d}")
+        for i in range(students)
+    ]
+    existing = set(db.scalars(select(User.email).where(User.email.like(f"%@{BENCH_DOMAIN}"))))
+    pwd_hash = hash_pwd(BENCH_PASSWORD)
+    _bulk_insert(db, User, [
+        {
+            "name": name, "email": email, "pwd_hash": pwd_hash, "role": role, "active": True,
+            "student_id": student_code, "student_class": f"BENCH-{index % 8}" if student_code else None,
+            "face_registered": False,
+        }
+        for index, (role, email, name, student_code) in enumerate(wanted)
+        if email not in existing
+    ])
+    db.commit()
+
+    ids = dict(db.execute(select(User.email, User.id).where(User.email.like(f"%@{BENCH_DOMAIN}"))).all())
+    users = defaultdict(list)
+    for role, email, _, _ in wanted:
+        users[role].append((ids[email], email))
+    return users
+
+
+def seed_scan_history(db, student_ids: List[int], guard_ids: List[int], per_student: int, days: int, rng) -> int:
+    """Backfill scan_logs so /scans and the analytics have realistic volume; skipped if already present"""
+    from sqlalchemy import func, select
+    from models import ScanLog
+
+    if not per_student or db.scalar(select(func.count(ScanLog.id)).where(ScanLog.details == "bench-history")):
+        return 0
+    today = _now_ist().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows = []
+    for student_id in student_ids:
+        for n in range(per_student):
+            failed = rng.random() < 0.08
+            rows.append({
+                "pass_id": None,
+                "student_id": student_id,
+                "scanner_id": rng.choice(guard_ids),
+                "scan_time": today - timedelta(days=rng.randrange(days)) + timedelta(minutes=rng.randrange(7 * 60, 21 * 60)),
+                "result": rng.choice(("expired", "invalid", "replay")) if failed else "success",
+                "pass_type": "entry" if n % 2 == 0 else "exit",
+                "emergency": False,
+                "details": "bench-history",
+            })
+    _bulk_insert(db, ScanLog, rows)
+    db.commit()
+    return len(rows)
+
+
+def seed_passes(db, holders: List[int], admin_id: int, count: int, rng) -> List[Tuple[int, int, str]]:
+    """Approved, unused passes with signed QR tokens: (pass id, student id, token)"""
+    from sqlalchemy import insert, update
+    from crypto import make_qr_token
+    from models import PassRequest
+
+    if not count or not holders:
+        return []
+    now = _now_ist()
+    rows = [
+        {
+            "student_id": rng.choice(holders), "reason": "Benchmark pass",
+            "pass_type": "entry" if n % 2 == 0 else "exit", "status": "approved",
+            "request_time": now, "approved_by": admin_id, "approved_time": now,
+            "expiry_time": now + timedelta(days=1),
+        }
+        for n in range(count)
+    ]
+    ids = list(db.scalars(insert(PassRequest).returning(PassRequest.id, sort_by_parameter_order=True), rows))
+    passes = [
+        (pass_id, row["student_id"], make_qr_token(pass_id, row["student_id"], ttl_minutes=24 * 60)[0])
+        for pass_id, row in zip(ids, rows)
+    ]
+    db.execute(update(PassRequest), [{"id": pass_id, "qr_token": token} for pass_id, _, token in passes])
+    db.commit()
+    return passes
+
+
+def enroll_faces(db, students: List[Tuple[int, str]], count: int) -> Dict[int, int]:
+    """Register synthetic faces for the first `count` students; returns user id -> face identity"""
+    from sqlalchemy import update
+    import face_auth
+    from benchmarks.synthetic_faces import render_face
+    from models import User
+
+    enrolled, updates = {}, []
+    for identity, (user_id, _) in enumerate(students[:count]):
+        encoding = face_auth.extract_face_encoding(render_face(identity, 0))
+        if encoding is None:
+            continue
+        enrolled[user_id] = identity
+        updates.append({
+            "id": user_id, "face_encoding": face_auth.encoding_to_json(encoding),
+            "face_registered": True, "face_registered_at": _now_ist(),
+        })
+    if updates:
+        db.execute(update(User), updates)
+        db.commit()
+    return enrolled
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+        self.phase_of: Dict[str, str] = {}
+
+    def record(self, endpoint: str, phase: str, seconds: float, outcome: str):
+        self.latencies[endpoint].append(seconds)
+        self.outcomes[endpoint][outcome] += 1
+        self.phase_of[endpoint] = phase
+
+
+def _outcome(response) -> str:
+    if response.status_code < 400:
+        return str(response.status_code)
+    try:
+        detail = response.json().get("detail")
+    except Exception:
+        detail = None
+    # "/verify" failures read "<result>: <details>"; keep the result so outcomes stay groupable
+    return f"{response.status_code} {str(detail).split(':')[0][:40]}" if isinstance(detail, str) else str(response.status_code)
+
+
+async def _drive(client, phase: str, requests: List[Tuple[str, str, str, dict]], concurrency: int,
+                 recorder: Recorder) -> float:
+    pending = iter(requests)  # shared by the workers; safe because they all run on this event loop
+
+    async def worker():
+        for endpoint, method, url, kwargs in pending:
+            started = time.perf_counter()
+            try:
+                outcome = _outcome(await client.request(method, url, **kwargs))
+            except Exception as e:
+                outcome = f"error {type(e).__name__}"
+            recorder.record(endpoint, phase, time.perf_counter() - started, outcome)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return time.perf_counter() - started
+
+
+def _bearer(user_id: int, role: str) -> dict:
+    from auth import create_access_token
+
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id), 'role': role})}"}
+
+
+def build_requests(scenario: str, n: int, ctx: dict, rng) -> List[Tuple[str, str, str, dict]]:
+    students, guards, admin = ctx["users"]["student"], ctx["users"]["guard"], ctx["users"]["admin"][0]
+    guard_headers = [_bearer(user_id, "guard") for user_id, _ in guards]
+    if scenario == "login":
+        n = ctx["login_requests"]
+        return [
+            ("POST /auth/login", "POST", "/auth/login",
+             {"data": {"username": students[i % len(students)][1], "password": BENCH_PASSWORD}})
+            for i in range(n)
+        ]
+    if scenario == "daily_entry":
+        latitude, longitude = ctx["campus"]
+        requests = []
+        for i in range(n):
+            user_id = students[i % len(students)][0]
+            body = {"pass_type": "entry" if (i // len(students)) % 2 == 0 else "exit",
+                    "latitude": latitude, "longitude": longitude}
+            requests.append(("POST /passes/daily-entry", "POST", "/passes/daily-entry",
+                             {"json": body, "headers": _bearer(user_id, "student")}))
+        return requests
+    if scenario == "verify":
+        return [
+            ("POST /verify", "POST", "/verify", {"data": {"token": token}, "headers": guard_headers[i % len(guard_headers)]})
+            for i, (_, _, token) in enumerate(ctx["passes"])
+        ]
+    if scenario == "verify_face":
+        images = ctx["face_images"]
+        return [
+            ("POST /verify (face)", "POST", "/verify", {
+                "data": {"token": token},
+                "files": {"face_image": ("face.jpg", images[(ctx["enrolled"][student_id], 1 + i % FACE_VARIANTS)], "image/jpeg")},
+                "headers": guard_headers[i % len(guard_headers)],
+            })
+            for i, (_, student_id, token) in enumerate(ctx["face_passes"])
+        ]
+    if scenario == "scans":
+        urls = ("/scans?limit=50", "/scans/stats")
+        return [
+            (f"GET {urls[i % 2].split('?')[0]}", "GET", urls[i % 2], {"headers": guard_headers[i % len(guard_headers)]})
+            for i in range(n)
+        ]
+    if scenario == "logs":
+        admin_headers = _bearer(admin[0], "admin")
+        urls = (
+            "/api/logs/statistics?days=7", "/api/logs/daily?days=7", "/api/logs/hourly",
+            "/api/logs/top_students?days=7&limit=10", "/api/logs/search?result=success&limit=100",
+            "/api/logs/recent?limit=100",
+        )
+        return [
+            (f"GET {urls[i % len(urls)].split('?')[0]}", "GET", urls[i % len(urls)], {"headers": admin_headers})
+            for i in range(n)
+        ]
+    raise ValueError(f"unknown scenario {scenario}")
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def summarize(latencies: List[float], outcomes: Counter, wall_seconds: float) -> dict:
+    ordered = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 2)
+    return {
+        "requests": len(ordered),
+        "rps": round(len(ordered) / wall_seconds, 1) if wall_seconds else None,
+        "mean_ms": ms(sum(ordered) / len(ordered)),
+        "p50_ms": ms(_percentile(ordered, 50)),
+        "p95_ms": ms(_percentile(ordered, 95)),
+        "p99_ms": ms(_percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]),
+        "errors": sum(count for outcome, count in outcomes.items() if not outcome.startswith(("2", "304"))),
+        "outcomes": dict(outcomes.most_common()),
+    }
+
+
+async def run_load(args, ctx: dict) -> dict:
+    import httpx
+    from app import app
+
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    phases = {}
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for scenario in args.scenarios:
+            requests = build_requests(scenario, args.requests, ctx, rng)
+            if not requests:
+                continue
+            wall = await _drive(client, scenario, requests, args.concurrency, recorder)
+            phases[scenario] = {"requests": len(requests), "seconds": round(wall, 3), "rps": round(len(requests) / wall, 1)}
+            if not args.json:
+                print(f"  {scenario:<12} {len(requests):>6} requests in {wall:7.2f}s", file=sys.stderr)
+
+    endpoints = {
+        endpoint: {"scenario": recorder.phase_of[endpoint],
+                   **summarize(latencies, recorder.outcomes[endpoint], phases[recorder.phase_of[endpoint]]["seconds"])}
+        for endpoint, latencies in recorder.latencies.items()
+    }
+    return {"phases": phases, "endpoints": endpoints}
+
+
+def prepare(args) -> dict:
+    from sqlalchemy import func, select
+    from database import Base, SessionLocal, engine
+    from models import ScanLog
+    from runtime_schema import ensure_runtime_schema
+    import location_settings
+
+    rng = random.Random(args.seed)
+    Base.metadata.create_all(bind=engine)
+    ensure_runtime_schema(engine)
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        users = seed_users(db, args.students, args.guards)
+        student_ids = [user_id for user_id, _ in users["student"]]
+        history = seed_scan_history(db, student_ids, [user_id for user_id, _ in users["guard"]],
+                                    args.history_per_student, args.history_days, rng)
+        admin_id = users["admin"][0][0]
+        verify_count = args.requests if "verify" in args.scenarios else 0
+        passes = seed_passes(db, student_ids, admin_id, verify_count, rng)
+
+        enrolled, face_passes, face_images = {}, [], {}
+        if "verify_face" in args.scenarios:
+            from benchmarks.synthetic_faces import render_face
+
+            enrolled = enroll_faces(db, users["student"], args.face_students)
+            face_passes = seed_passes(db, list(enrolled), admin_id, args.requests, rng)
+            face_images = {
+                (identity, variant): render_face(identity, variant)
+                for identity in enrolled.values() for variant in range(1, FACE_VARIANTS + 1)
+            }
+        scan_rows = db.scalar(select(func.count(ScanLog.id)))
+
+    campus = location_settings.get_location_settings()
+    return {
+        "users": users,
+        "login_requests": args.login_requests,
+        "passes": passes,
+        "enrolled": enrolled,
+        "face_passes": face_passes,
+        "face_images": face_images,
+        "campus": (campus.get("latitude"), campus.get("longitude")),
+        "seed": {
+            "students": len(users["student"]),
+            "guards": len(users["guard"]),
+            "history_rows_added": history,
+            "scan_rows": scan_rows,
+            "passes": len(passes),
+            "face_enrolled": len(enrolled),
+            "face_passes": len(face_passes),
+            "seconds": round(time.perf_counter() - started, 2),
+        },
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[dict]:
+    """Endpoints whose p95 grew or throughput fell by more than `threshold` against the baseline"""
+    rows = []
+    for endpoint, current in report["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(endpoint)
+        if not before:
+            continue
+        p95_change = current["p95_ms"] / before["p95_ms"] - 1 if before["p95_ms"] else 0.0
+        rps_change = current["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        rows.append({
+            "endpoint": endpoint,
+            "p95_ms": (before["p95_ms"], current["p95_ms"]),
+            "rps": (before["rps"], current["rps"]),
+            "p95_change": round(p95_change, 3),
+            "rps_change": round(rps_change, 3),
+            "regressed": p95_change > threshold or rps_change < -threshold,
+        })
+    return rows
+
+
+def _print_report(report: dict):
+    meta = report["meta"]
+    print(f"{meta['db_dialect']} | {meta['seed']['students']} students, {meta['seed']['scan_rows']} scan rows | "
+          f"concurrency {meta['concurrency']}")
+    print(f"{'endpoint':<30} {'reqs':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'errors':>6}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<30} {stats['requests']:>6} {stats['rps']:>8} {stats['p50_ms']:>8} {stats['p95_ms']:>8} "
+              f"{stats['p99_ms']:>8} {stats['max_ms']:>8} {stats['errors']:>6}")
+        if stats["errors"]:
+            print(f"{'':<30} outcomes: {stats['outcomes']}")
+    if "verify_face" in meta["scenarios"]:
+        print(f"synthetic faces enrolled: {meta['seed']['face_enrolled']} of {meta['face_students']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db-url", help="database to seed and test (default: fresh SQLite file)")
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--guards", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=100, help="login requests (each costs one bcrypt check)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenarios", default="login,daily_entry,verify,scans,logs",
+                        help=f"comma-separated, from {','.join(SCENARIOS)}")
+    parser.add_argument("--face", action="store_true", help="enable face auth and add the verify_face scenario")
+    parser.add_argument("--face-students", type=int, default=50, help="students enrolled with a synthetic face")
+    parser.add_argument("--history-per-student", type=int, default=30, help="backfilled scan_logs rows per student")
+    parser.add_argument("--history-days", type=int, default=30)
+    parser.add_argument("--no-analytics-cache", action="store_true", help="measure /api/logs/* without the per-worker cache")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95 growth / rps drop before failing")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    if args.face and "verify_face" not in args.scenarios:
+        args.scenarios.insert(args.scenarios.index("verify") + 1 if "verify" in args.scenarios else len(args.scenarios),
+                              "verify_face")
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    if "verify_face" in args.scenarios and not args.face:
+        parser.error("verify_face needs --face")
+
+    db_url = _configure_environment(args)
+    # Fail before seeding rather than halfway through
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        raise SystemExit("The load test needs httpx (pip install httpx)")
+    if args.face:
+        try:
+            import face_auth  # noqa: F401
+        except ImportError as e:
+            raise SystemExit(f"--face needs the face auth dependencies (OpenCV, Pillow): {e}")
+    from sqlalchemy.engine import make_url
+
+    ctx = prepare(args)
+    if not args.json:
+        print(f"seeded in {ctx['seed']['seconds']}s: {ctx['seed']}", file=sys.stderr)
+    report = {
+        "meta": {
+            "timestamp": datetime.now(IST).isoformat(timespec="seconds"),
+            "db_dialect": make_url(db_url).get_backend_name(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "scenarios": args.scenarios,
+            "face_students": args.face_students if args.face else 0,
+            "analytics_cache": not args.no_analytics_cache,
+            "seed": ctx["seed"],
+        },
+        **asyncio.run(run_load(args, ctx)),
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f), args.threshold)
+        regressions = [row for row in report["comparison"] if row["regressed"]]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+        for row in report.get("comparison", []):
+            flag = "REGRESSED" if row["regressed"] else "ok"
+            print(f"  {row['endpoint']:<30} p95 {row['p95_ms'][0]} -> {row['p95_ms'][1]} ms ({row['p95_change']:+.0%}), "
+                  f"rps {row['rps'][0]} -> {row['rps'][1]} ({row['rps_change']:+.0%})  {flag}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Geofence benchmark: exact geodesic vs fast local-projection circle checks.
+
+Samples points uniformly out to 2x the radius around the campus centre (so a
+good share land near the boundary), then reports time per validate_location
+call for both modes, decision mismatches and the worst distance error of the
+fast mode.
+
+Usage (from backend/):
+    python -m benchmarks.geofence [--points 20000] [--radius-km 2.0] [--json]
+"""
+import argparse
+import json
+import math
+import random
+import time
+
+import geofence
+
+
+class _FixedSettingsGeofence(geofence.Geofence):
+    """Circle geofence with a fixed centre, so the benchmark never touches location_settings.json."""
+
+    def __init__(self, center, radius_km, fast):
+        super().__init__(use_polygon=False, fast=fast)
+        self._fixed = (center, radius_km)
+
+    def _refresh_settings(self):
+        center, radius_km = self._fixed
+        if self.projection is None:
+            self.projection = geofence.LocalProjection(*center)
+        self.center, self.radius_km = center, radius_km
+
+
+def sample_points(center, radius_km, count, seed=7):
+    rng = random.Random(seed)
+    lat0, lon0 = center
+    points = []
+    for _ in range(count):
+        distance_km = 2 * radius_km * math.sqrt(rng.random())
+        bearing = rng.uniform(0, 2 * math.pi)
+        points.append((
+            lat0 + distance_km * math.cos(bearing) / 111.2,
+            lon0 + distance_km * math.sin(bearing) / (111.2 * math.cos(math.radians(lat0))),
+        ))
+    return points
+
+
+def _time_mode(fence, points):
+    start = time.perf_counter()
+    results = [fence.validate_location(lat, lon) for lat, lon in points]
+    return (time.perf_counter() - start) / len(points) * 1e6, results
+
+
+def run(points: int, radius_km: float, center=geofence.CAMPUS_CENTER):
+    sample = sample_points(center, radius_km, points)
+    exact = _FixedSettingsGeofence(center, radius_km, fast=False)
+    fast = _FixedSettingsGeofence(center, radius_km, fast=True)
+
+    exact_us, exact_results = _time_mode(exact, sample)
+    fast_us, fast_results = _time_mode(fast, sample)
+
+    mismatches = sum(
+        (a[0], a[2]["inside"]) != (b[0], b[2]["inside"])
+        for a, b in zip(exact_results, fast_results)
+    )
+    max_error_m = max(
+        abs(a[2]["distance_km"] - b[2]["distance_km"]) * 1000
+        for a, b in zip(exact_results, fast_results)
+    )
+    projection = geofence.LocalProjection(*center)
+    band_hits = sum(
+        abs(math.sqrt(projection.distance_sq_km(lat, lon)) - t) <= geofence.boundary_band_km(t)
+        for lat, lon in sample
+        for t in (radius_km, radius_km + 0.05)
+    )
+
+    return {
+        "points": points,
+        "radius_km": radius_km,
+        "center": list(center),
+        "geodesic_us_per_check": round(exact_us, 3),
+        "fast_us_per_check": round(fast_us, 3),
+        "speedup": round(exact_us / fast_us, 1) if fast_us else None,
+        "decision_mismatches": mismatches,
+        "max_distance_error_m": round(max_error_m, 3),
+        "geodesic_fallbacks": band_hits,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--radius-km", type=float, default=geofence.CAMPUS_RADIUS_KM)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    report = run(args.points, args.radius_km)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['points']} points, radius {report['radius_km']} km around {tuple(report['center'])}")
+    print(f"  geodesic : {report['geodesic_us_per_check']:>8} µs/check")
+    print(f"  fast     : {report['fast_us_per_check']:>8} µs/check  ({report['speedup']}x)")
+    print(f"  decision mismatches : {report['decision_mismatches']}")
+    print(f"  max distance error  : {report['max_distance_error_m']} m")
+    print(f"  geodesic fallbacks  : {report['geodesic_fallbacks']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+QR token benchmark: legacy `pid.uid.exp.sig` vs compact base32 tokens.
+
+Reports encode / parse / full check time per token and the QR symbol size each
+format needs (version and modules per side) at the error-correction levels the
+portals use.
+
+Usage (from backend/):
+    python -m benchmarks.qr_tokens [--iterations 20000] [--json]
+"""
+import argparse
+import json
+import timeit
+
+import crypto
+
+# Data codewords for QR versions 1-10 per error-correction level (ISO/IEC 18004, table 7)
+DATA_CODEWORDS = {
+    "L": [19, 34, 55, 80, 108, 136, 156, 194, 232, 274],
+    "M": [16, 28, 44, 64, 86, 108, 124, 154, 182, 216],
+    "Q": [13, 22, 34, 48, 62, 76, 88, 110, 132, 154],
+    "H": [9, 16, 26, 36, 46, 60, 66, 86, 100, 122],
+}
+ALPHANUMERIC_CHARSET = set("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:")
+
+
+def _segment_bits(text: str, mode: str) -> int:
+    # mode indicator + character count indicator (versions 1-9) + data
+    if mode == "alphanumeric":
+        return 4 + 9 + 11 * (len(text) // 2) + 6 * (len(text) % 2)
+    return 4 + 8 + 8 * len(text.encode())
+
+
+def qr_symbol(text: str, level: str, mode: str = "auto"):
+    """Smallest QR version holding `text` in a single segment -> (version, modules per side, mode)."""
+    if mode == "auto":
+        mode = "alphanumeric" if set(text) <= ALPHANUMERIC_CHARSET else "byte"
+    needed_bytes = -(-_segment_bits(text, mode) // 8)
+    for index, capacity in enumerate(DATA_CODEWORDS[level]):
+        if needed_bytes <= capacity:
+            version = index + 1
+            return version, 17 + 4 * version, mode
+    return None, None, mode
+
+
+def run(iterations: int):
+    pass_id, user_id = 48213, 1734
+    exp = crypto.TOKEN_EPOCH + 90_000_000
+    formats = {
+        "legacy": lambda: crypto.make_legacy_qr_token(pass_id, user_id, exp),
+        "compact": lambda: crypto.make_compact_qr_token(pass_id, user_id, exp),
+    }
+
+    results = {}
+    for name, encode in formats.items():
+        token = encode()
+        timings = {
+            "encode_us": timeit.timeit(encode, number=iterations),
+            "parse_us": timeit.timeit(lambda: crypto.parse_token(token), number=iterations),
+            "check_us": timeit.timeit(lambda: crypto.check_token(token, now=exp - 1), number=iterations),
+        }
+        symbols = {}
+        for level in ("M", "H"):
+            for mode in ("auto", "byte"):
+                version, modules, used_mode = qr_symbol(token, level, mode)
+                symbols[f"{level}/{used_mode}"] = {"version": version, "modules": modules}
+        results[name] = {
+            "token": token,
+            "length": len(token),
+            **{key: round(value / iterations * 1e6, 3) for key, value in timings.items()},
+            "qr": symbols,
+        }
+    return {"iterations": iterations, "formats": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    report = run(args.iterations)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'format':<8} {'len':>4} {'encode µs':>10} {'parse µs':>9} {'check µs':>9}  QR (version / modules)")
+    for name, row in report["formats"].items():
+        qr = ", ".join(f"{key} v{val['version']}/{val['modules']}" for key, val in row["qr"].items())
+        print(f"{name:<8} {row['length']:>4} {row['encode_us']:>10} {row['parse_us']:>9} {row['check_us']:>9}  {qr}")
+
+
+if __name__ == "__main__":
+    main()
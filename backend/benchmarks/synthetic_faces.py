@@ -0,0 +1,125 @@
+"""
+Deterministic synthetic face images for the benchmarks.
+
+No photos are shipped with the repo; instead each identity gets a drawn
+frontal face whose geometry (face shape, eye spacing and size, brow, nose and
+mouth placement, skin tone) is fixed by its number, and each variant of that
+identity changes only capture conditions (brightness, contrast, small tilt and
+offset, scale, sensor noise). The same (identity, variant) always renders the
+same JPEG bytes, so benchmark runs are comparable.
+
+They are cartoon faces: good for load tests and relative timing, not a
+substitute for a real photo set when judging accuracy.
+"""
+import io
+import random
+from typing import Iterator, Tuple
+
+import numpy as np
+
+IMAGE_SIZE = 320
+
+
+def _require_pil():
+    try:
+        from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+    except ImportError as e:
+        raise SystemExit("Synthetic face images need Pillow (pip install Pillow)") from e
+    return Image, ImageDraw, ImageEnhance, ImageFilter
+
+
+def _geometry(identity: int) -> dict:
+    rng = random.Random(f"identity:{identity}")
+    return {
+        "face_w": rng.uniform(0.30, 0.38),
+        "face_h": rng.uniform(0.40, 0.48),
+        "eye_dx": rng.uniform(0.085, 0.12),
+        "eye_y": rng.uniform(-0.08, -0.03),
+        "eye_r": rng.uniform(0.022, 0.034),
+        "brow_gap": rng.uniform(0.035, 0.055),
+        "brow_tilt": rng.uniform(-0.012, 0.012),
+        "nose_len": rng.uniform(0.07, 0.11),
+        "nose_w": rng.uniform(0.02, 0.035),
+        "mouth_y": rng.uniform(0.15, 0.20),
+        "mouth_w": rng.uniform(0.07, 0.11),
+        "mouth_curve": rng.uniform(0.005, 0.03),
+        "skin": tuple(int(rng.uniform(lo, hi)) for lo, hi in ((150, 235), (110, 195), (85, 165))),
+        "hair": tuple(int(rng.uniform(15, 90)) for _ in range(3)),
+        "hair_h": rng.uniform(0.06, 0.14),
+    }
+
+
+def render_face(identity: int, variant: int = 0, size: int = IMAGE_SIZE, quality: int = 90) -> bytes:
+    """JPEG bytes of one capture of `identity`; variant 0 is the clean enrollment shot"""
+    Image, ImageDraw, ImageEnhance, ImageFilter = _require_pil()
+    g = _geometry(identity)
+    rng = random.Random(f"variant:{identity}:{variant}")
+    clean = variant == 0
+
+    canvas = size * 2  # draw large and downsample for smooth edges
+    image = Image.new("RGB", (canvas, canvas), tuple(int(rng.uniform(170, 230)) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+
+    def px(value: float) -> int:
+        return int(value * canvas)
+
+    cx = 0.5 + (0 if clean else rng.uniform(-0.04, 0.04))
+    cy = 0.5 + (0 if clean else rng.uniform(-0.04, 0.04))
+    scale = 1.0 if clean else rng.uniform(0.9, 1.1)
+
+    def box(x: float, y: float, rx: float, ry: float):
+        return [px(cx + (x - rx) * scale), px(cy + (y - ry) * scale), px(cx + (x + rx) * scale), px(cy + (y + ry) * scale)]
+
+    # Hair, head, neck
+    draw.ellipse(box(0, -g["hair_h"] / 2, g["face_w"] + 0.02, g["face_h"] + g["hair_h"] / 2), fill=g["hair"])
+    draw.rectangle(box(0, g["face_h"] + 0.05, g["face_w"] * 0.45, 0.08), fill=g["skin"])
+    draw.ellipse(box(0, 0.02, g["face_w"], g["face_h"]), fill=g["skin"])
+
+    shade = tuple(max(0, channel - 45) for channel in g["skin"])
+    for side in (-1, 1):
+        ex = side * g["eye_dx"]
+        ey = g["eye_y"]
+        draw.ellipse(box(ex, ey, g["eye_r"] * 1.8, g["eye_r"]), fill=(245, 245, 245))
+        draw.ellipse(box(ex, ey, g["eye_r"] * 0.8, g["eye_r"] * 0.8), fill=(40, 30, 25))
+        by = ey - g["brow_gap"]
+        tilt = side * g["brow_tilt"]
+        draw.line(
+            [px(cx + (ex - g["eye_r"] * 2) * scale), px(cy + (by + tilt) * scale),
+             px(cx + (ex + g["eye_r"] * 2) * scale), px(cy + (by - tilt) * scale)],
+            fill=g["hair"], width=max(2, px(0.012)),
+        )
+
+    # Nose: shaded wedge; mouth: dark arc
+    nose_top, nose_bottom = g["eye_y"] + 0.02, g["eye_y"] + 0.02 + g["nose_len"]
+    draw.polygon(
+        [(px(cx), px(cy + nose_top * scale)),
+         (px(cx - g["nose_w"] * scale), px(cy + nose_bottom * scale)),
+         (px(cx + g["nose_w"] * scale), px(cy + nose_bottom * scale))],
+        fill=shade,
+    )
+    my = g["mouth_y"]
+    draw.chord(box(0, my, g["mouth_w"], g["mouth_curve"] + 0.015), 0, 180, fill=(120, 40, 45))
+
+    if not clean:
+        image = image.rotate(rng.uniform(-8, 8), resample=Image.BICUBIC, fillcolor=image.getpixel((0, 0)))
+    image = image.resize((size, size), Image.LANCZOS)
+
+    if not clean:
+        image = ImageEnhance.Brightness(image).enhance(rng.uniform(0.75, 1.25))
+        image = ImageEnhance.Contrast(image).enhance(rng.uniform(0.8, 1.2))
+        if rng.random() < 0.3:
+            image = image.filter(ImageFilter.GaussianBlur(rng.uniform(0.4, 1.2)))
+        noise = np.random.default_rng(rng.getrandbits(32)).normal(0, rng.uniform(3, 9), (size, size, 1))
+        image = Image.fromarray(np.clip(np.asarray(image, dtype=np.float32) + noise, 0, 255).astype(np.uint8))
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def dataset(identities: int, variants: int) -> Iterator[Tuple[int, int, bytes]]:
+    """(identity, variant, jpeg) for variants 0..variants-1 of each identity"""
+    for identity in range(identities):
+        for variant in range(variants):
+            yield identity, variant, render_face(identity, variant)
+
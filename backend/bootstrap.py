@@ -2,7 +2,7 @@ import os
 
 from database import Base, SessionLocal, engine
 from models import User
-from runtime_schema import ensure_runtime_schema
+from runtime_schema import convert_numeric_columns, ensure_runtime_schema
 from seed import seed_demo_users
 
 
@@ -23,6 +23,15 @@ def bootstrap():
 
     Base.metadata.create_all(bind=engine)
     ensure_runtime_schema(engine)
+    # Runs before any worker starts, so the column rewrite does not race live requests
+    try:
+        with engine.begin() as connection:
+            converted = convert_numeric_columns(connection)
+        if converted:
+            print(f"🔢 Converted {', '.join(converted)} to numeric")
+    except Exception as e:
+        # e.g. SQLite < 3.35 without DROP COLUMN; reads and the heatmap still work on TEXT
+        print(f"⚠️  Could not convert location columns to numeric: {e}")
     db = SessionLocal()
     try:
         user_count = db.query(User).count()
@@ -1,7 +1,21 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import User, PassRequest, ScanLog
-from datetime import datetime, timezone, timedelta
+from crypto import make_qr_token
+from schemas import PassOut
+from settings import settings
+from analytics_cache import analytics_cache
+import activity
+import presence
+from datetime import date, datetime, timezone, timedelta
+from typing import Dict, List, Optional, Tuple
 import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 # IST timezone (UTC+5:30)
 IST = timezone(timedelta(hours=5, minutes=30))
@@ -10,17 +24,11 @@ def now_ist():
     """Get current time in IST timezone"""
     return datetime.now(IST)
 
-def log_scan(db: Session, pass_id: int, student_id: int, scanner_id: int, result: str, details: str="", pass_type: str="entry"):
-    scan_log = ScanLog(pass_id=pass_id, student_id=student_id, scanner_id=scanner_id, result=result, details=details, pass_type=pass_type)
-    db.add(scan_log)
-    db.commit()
-    db.refresh(scan_log)
-    
+def _broadcast_scan(scan_log: ScanLog, student: Optional[User]):
     # Broadcast to real-time monitoring (if enabled)
     try:
         import realtime_logs
-        student = db.query(User).filter(User.id == student_id).first()
-        
+
         scan_data = {
             "id": scan_log.id,
             "student_id": student.student_id if student else "Unknown",
@@ -33,30 +41,219 @@ def log_scan(db: Session, pass_id: int, student_id: int, scanner_id: int, result
             "gate": "Main Gate",
             "details": scan_log.details
         }
-        
-        # Create a new event loop if needed and broadcast
-        try:
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                asyncio.create_task(realtime_logs.broadcast_new_scan(scan_data))
-            else:
-                loop.run_until_complete(realtime_logs.broadcast_new_scan(scan_data))
-        except RuntimeError:
-            # No event loop, create one
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(realtime_logs.broadcast_new_scan(scan_data))
-            loop.close()
+
+        # Fire-and-forget so slow WebSocket clients never delay the scan response
+        asyncio.create_task(realtime_logs.broadcast_new_scan(scan_data, queued_at=time.perf_counter()))
     except Exception as e:
-        print(f"Failed to broadcast scan: {e}")
-    
+        logger.warning("Failed to broadcast scan: %s", e)
+
+def scan_index_statements(dialect_name: str, scans: List) -> list:
+    """Presence (successful scans only) and daily activity counter upserts for new scan_logs rows"""
+    statements = [
+        presence.presence_upsert(dialect_name, [presence.scan_event(scan) for scan in scans if _get(scan, "result") == "success"]),
+        activity.activity_upsert(dialect_name, [activity.scan_row(scan) for scan in scans]),
+    ]
+    return [statement for statement in statements if statement is not None]
+
+def _get(scan, key):
+    return scan.get(key) if isinstance(scan, dict) else getattr(scan, key)
+
+async def record_scans(db: AsyncSession, scans: List):
+    """Keep presence and activity counters in step with ScanLog objects / insert dicts; the caller commits"""
+    for statement in scan_index_statements(db.bind.dialect.name, scans):
+        await db.execute(statement)
+
+async def log_scan(db: AsyncSession, pass_id: int, student_id: int, scanner_id: int, result: str, details: str="", pass_type: str="entry"):
+    scan_log = ScanLog(pass_id=pass_id, student_id=student_id, scanner_id=scanner_id, result=result, details=details, pass_type=pass_type,
+                       scan_time=now_ist())
+    db.add(scan_log)
+    await record_scans(db, [scan_log])
+    await db.commit()
+    analytics_cache.invalidate()
+    await db.refresh(scan_log)
+
+    _broadcast_scan(scan_log, await db.get(User, student_id))
+    return scan_log
+
+async def consume_pass_row(db: AsyncSession, pass_id: int, student_id: int, scanner_id: int, used_time: datetime) -> Optional[str]:
+    """
+    Conditional UPDATE ... RETURNING that flips an approved, unused pass to used.
+
+    Does not commit. Returns the pass_type, or None when the pass was not
+    consumable (missing, not approved, or already used).
+    """
+    consumed = (await db.execute(
+        update(PassRequest)
+        .where(
+            PassRequest.id == pass_id,
+            PassRequest.student_id == student_id,
+            PassRequest.status == "approved",
+            PassRequest.used_time.is_(None),
+        )
+        # Releasing daily_key lets the student create a fresh daily pass after this one is used
+        .values(status="used", used_time=used_time, used_by=scanner_id, daily_key=None)
+        .returning(PassRequest.pass_type)
+        .execution_options(synchronize_session=False)
+    )).first()
+    if consumed is None:
+        return None
+    daily_pass_cache.discard(student_id)
+    return consumed.pass_type or "entry"
+
+async def consume_pass(db: AsyncSession, pass_id: int, student_id: int, scanner_id: int, student: Optional[User] = None) -> Optional[ScanLog]:
+    """
+    Atomically mark an approved, unused pass as used and log the successful scan.
+
+    Runs the conditional UPDATE plus the scan_logs insert in one transaction, so
+    two guards scanning the same QR cannot both succeed. Returns the new ScanLog,
+    or None when the pass was not consumable; the caller decides which failure to report.
+    """
+    used_time = now_ist()
+    pass_type = await consume_pass_row(db, pass_id, student_id, scanner_id, used_time)
+    if pass_type is None:
+        return None
+
+    scan_log = ScanLog(
+        pass_id=pass_id,
+        student_id=student_id,
+        scanner_id=scanner_id,
+        scan_time=used_time,
+        result="success",
+        details="verified",
+        pass_type=pass_type,
+    )
+    db.add(scan_log)
+    await record_scans(db, [scan_log])
+    await db.commit()
+    analytics_cache.invalidate()
+
+    _broadcast_scan(scan_log, student if student is not None else await db.get(User, student_id))
     return scan_log
 
-def mark_used(db: Session, pass_obj: PassRequest, scanner_id: int):
-    pass_obj.status = "used"
-    pass_obj.used_time = now_ist()
-    pass_obj.used_by = scanner_id
-    db.commit()
-    db.refresh(pass_obj)
-    return pass_obj
+async def log_scan_failure_summaries(db: AsyncSession, summaries: List[dict]):
+    """Write one scan_logs row per aggregated burst of identical rejected scans."""
+    scan_time = now_ist()
+    scan_logs = [
+        ScanLog(
+            pass_id=entry["pass_id"] or 0,
+            student_id=entry["student_id"] or 0,
+            scanner_id=entry["scanner_id"],
+            scan_time=scan_time,
+            result=entry["result"],
+            details=f"{entry['details']} (repeated {entry['suppressed']}x)",
+            pass_type=entry["pass_type"],
+        )
+        for entry in summaries
+    ]
+    db.add_all(scan_logs)
+    await record_scans(db, scan_logs)
+    await db.commit()
+    analytics_cache.invalidate()
+
+def encode_log_cursor(log: Dict) -> str:
+    """Keyset cursor for scan log pages ordered by (scan_time, id) descending"""
+    return f"{log['timestamp']}|{log['id']}"
+
+def decode_log_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(scan_time, id) of the last row of the previous page; raises ValueError when malformed"""
+    timestamp, _, log_id = cursor.rpartition("|")
+    return datetime.fromisoformat(timestamp), int(log_id)
+
+def daily_key(student_id: int, pass_type: str, ist_date: date) -> str:
+    """Identity of a student's active daily pass; unique-indexed on passes.daily_key"""
+    return f"{student_id}:{pass_type}:{ist_date.isoformat()}"
+
+class DailyPassCache:
+    """
+    Per-student copy of today's daily passes, so repeated taps on the daily
+    entry/exit button are answered without a DB round trip.
+
+    Entries end with the QR token's expiry, on local consumption, or after
+    ttl_seconds - the bound on staleness when another worker consumes the pass.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, max_students: int = 20000):
+        self.ttl_seconds = ttl_seconds
+        self.max_students = max_students
+        self._entries: Dict[int, Dict[str, Tuple[str, PassOut, float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, student_id: int, pass_type: str, key: str) -> Optional[PassOut]:
+        with self._lock:
+            entry = self._entries.get(student_id, {}).get(pass_type)
+        if entry is None:
+            return None
+        cached_key, pass_out, valid_until = entry
+        if cached_key != key or time.time() >= valid_until:
+            return None
+        return pass_out
+
+    def put(self, student_id: int, pass_type: str, key: str, pass_out: PassOut, token_exp: float):
+        valid_until = min(time.time() + self.ttl_seconds, token_exp)
+        with self._lock:
+            if student_id not in self._entries and len(self._entries) >= self.max_students:
+                self._entries.clear()  # crude bound; entries are cheap to rebuild
+            self._entries.setdefault(student_id, {})[pass_type] = (key, pass_out, valid_until)
+
+    def discard(self, student_id: int):
+        with self._lock:
+            self._entries.pop(student_id, None)
+
+daily_pass_cache = DailyPassCache(ttl_seconds=settings.DAILY_PASS_CACHE_SECONDS)
+
+def _aware_ist(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive IST wall-clock times
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=IST)
+    return value
+
+def _sign_pass(pr: PassRequest):
+    token, exp = make_qr_token(pr.id, pr.student_id)
+    pr.qr_token = token
+    pr.expiry_time = datetime.fromtimestamp(exp, tz=IST)
+
+async def get_or_create_daily_pass(db: AsyncSession, student_id: int, pass_type: str, reason: str,
+                                   today: date, **location_fields) -> PassOut:
+    """
+    Insert-or-return today's self-approved daily pass in a single transaction.
+
+    INSERT ... ON CONFLICT (daily_key) DO NOTHING RETURNING creates the pass
+    already approved; the token is signed in the same transaction. A conflict
+    means the pass exists, so it is returned (re-signed if its QR expired).
+    Concurrent taps therefore converge on one pass without a read-then-write race.
+    """
+    key = daily_key(student_id, pass_type, today)
+    cached = daily_pass_cache.get(student_id, pass_type, key)
+    if cached is not None:
+        return cached
+
+    now = now_ist()
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    pr = (await db.scalars(
+        dialect_insert(PassRequest)
+        .values(
+            student_id=student_id,
+            reason=reason,
+            pass_type=pass_type,
+            status="approved",
+            request_time=now,
+            approved_by=student_id,  # Self-approved
+            approved_time=now,
+            daily_key=key,
+            **location_fields,
+        )
+        .on_conflict_do_nothing(index_elements=["daily_key"])
+        .returning(PassRequest)
+    )).first()
+
+    if pr is None:
+        pr = (await db.scalars(select(PassRequest).where(PassRequest.daily_key == key))).one()
+        if pr.qr_token is None or _aware_ist(pr.expiry_time) <= now:
+            _sign_pass(pr)
+    else:
+        _sign_pass(pr)
+    await db.commit()
 
+    pass_out = PassOut.model_validate(pr)
+    daily_pass_cache.put(student_id, pass_type, key, pass_out, _aware_ist(pr.expiry_time).timestamp())
+    return pass_out
@@ -1,22 +1,223 @@
+import base64
+import binascii
 import hmac
 import hashlib
+import threading
 import time
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
 from settings import settings
 
+# Compact token layout (before base32):
+#   version byte | varint key_id | varint pass_id | varint user_id | varint (exp - TOKEN_EPOCH) | truncated HMAC
+# base32 keeps the token inside the QR alphanumeric charset (A-Z, 2-7) without the
+# space, '+' and '%' of base45, which get mangled by trims and form encoding.
+TOKEN_VERSION_LEGACY = 0
+TOKEN_VERSION_COMPACT = 1
+TOKEN_EPOCH = 1_700_000_000
+COMPACT_TAG_BYTES = 10
+
+class ParsedToken(NamedTuple):
+    pass_id: int
+    user_id: int
+    exp: int
+    sig: bytes
+    signed_data: bytes
+    version: int = TOKEN_VERSION_LEGACY
+    key_id: Optional[int] = None  # legacy tokens carry no key id
+
+@lru_cache(maxsize=4)
+def _parse_signing_keys(current_key_id: int, secret_key: str, retired_keys: str) -> Dict[int, bytes]:
+    keys = {}
+    for item in retired_keys.split(","):
+        key_id, sep, secret = item.strip().partition(":")
+        if not sep or not key_id.isdigit() or not secret:
+            continue
+        keys[int(key_id)] = secret.encode()
+    keys[current_key_id] = secret_key.encode()
+    return keys
+
+def _signing_keys() -> Dict[int, bytes]:
+    """Current key (SECRET_KEY under QR_KEY_ID) plus retired keys still accepted for verification."""
+    return _parse_signing_keys(settings.QR_KEY_ID, settings.SECRET_KEY, settings.QR_RETIRED_KEYS)
+
+def _legacy_sig(key: bytes, data: bytes) -> bytes:
+    return hmac.new(key, data, hashlib.sha256).hexdigest()[:32].encode()
+
+def _compact_tag(key: bytes, data: bytes) -> bytes:
+    return hmac.new(key, data, hashlib.sha256).digest()[:COMPACT_TAG_BYTES]
+
+def _encode_varint(value: int) -> bytes:
+    if value < 0:
+        raise ValueError("varint values must be non-negative")
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+def _decode_varint(data: bytes, offset: int):
+    value = 0
+    shift = 0
+    while offset < len(data) and shift <= 63:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+    raise ValueError("truncated varint")
+
+def make_legacy_qr_token(pass_id: int, user_id: int, exp: int) -> str:
+    data = f"{pass_id}.{user_id}.{exp}"
+    sig = _legacy_sig(settings.SECRET_KEY.encode(), data.encode()).decode()
+    return f"{data}.{sig}"
+
+def make_compact_qr_token(pass_id: int, user_id: int, exp: int) -> str:
+    payload = bytes([TOKEN_VERSION_COMPACT]) + b"".join(
+        _encode_varint(value)
+        for value in (settings.QR_KEY_ID, pass_id, user_id, max(exp - TOKEN_EPOCH, 0))
+    )
+    raw = payload + _compact_tag(settings.SECRET_KEY.encode(), payload)
+    return base64.b32encode(raw).decode().rstrip("=")
+
 def make_qr_token(pass_id: int, user_id: int, ttl_minutes: int = None) -> tuple[str, int]:
     ttl = ttl_minutes or settings.QR_TTL_MINUTES
     exp = int(time.time()) + ttl*60
-    data = f"{pass_id}.{user_id}.{exp}"
-    sig = hmac.new(settings.SECRET_KEY.encode(), data.encode(), hashlib.sha256).hexdigest()[:32]
-    return f"{data}.{sig}", exp
+    if settings.QR_TOKEN_FORMAT == "legacy":
+        return make_legacy_qr_token(pass_id, user_id, exp), exp
+    return make_compact_qr_token(pass_id, user_id, exp), exp
 
-def parse_token(token: str):
+def _parse_legacy_token(token: str) -> Optional[ParsedToken]:
     try:
         parts = token.split(".")
         if len(parts) != 4:
             return None
         pid, uid, exp, sig = parts
-        return int(pid), int(uid), int(exp), sig
+        return ParsedToken(int(pid), int(uid), int(exp), sig.encode(), f"{pid}.{uid}.{exp}".encode())
     except Exception:
         return None
 
+def _parse_compact_token(token: str) -> Optional[ParsedToken]:
+    try:
+        raw = base64.b32decode(token + "=" * (-len(token) % 8))
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) <= COMPACT_TAG_BYTES or raw[0] != TOKEN_VERSION_COMPACT:
+        return None
+
+    payload, tag = raw[:-COMPACT_TAG_BYTES], raw[-COMPACT_TAG_BYTES:]
+    try:
+        offset = 1
+        values = []
+        for _ in range(4):
+            value, offset = _decode_varint(payload, offset)
+            values.append(value)
+    except ValueError:
+        return None
+    if offset != len(payload):
+        return None
+
+    key_id, pid, uid, exp_offset = values
+    return ParsedToken(pid, uid, exp_offset + TOKEN_EPOCH, tag, payload, TOKEN_VERSION_COMPACT, key_id)
+
+def parse_token(token: str) -> Optional[ParsedToken]:
+    """Parse either a legacy `pid.uid.exp.sig` token or a compact base32 token."""
+    if not token:
+        return None
+    if "." in token:
+        return _parse_legacy_token(token)
+    return _parse_compact_token(token.strip().upper())
+
+def token_digest(token: str) -> str:
+    """SHA-256 of an issued token; lets guard devices match scans offline without any signing key."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _signature_valid(parsed: ParsedToken) -> bool:
+    keys = _signing_keys()
+    if parsed.version == TOKEN_VERSION_COMPACT:
+        key = keys.get(parsed.key_id)
+        return key is not None and hmac.compare_digest(parsed.sig, _compact_tag(key, parsed.signed_data))
+    # Legacy tokens carry no key id, so any still-accepted key may have signed them
+    return any(hmac.compare_digest(parsed.sig, _legacy_sig(key, parsed.signed_data)) for key in keys.values())
+
+def check_token(token: str, now: Optional[int] = None):
+    """
+    Stateless fast-reject pre-check, run before any DB access.
+
+    Verifies structure, HMAC signature (constant-time) and expiry in memory.
+    Returns (parsed, None) for a usable token, otherwise (parsed_or_None, (result, details))
+    using the scan_logs result vocabulary.
+    """
+    parsed = parse_token(token)
+    if not parsed:
+        return None, ("invalid", "malformed")
+
+    if not _signature_valid(parsed):
+        return parsed, ("invalid", "sig-mismatch")
+    if (int(time.time()) if now is None else now) > parsed.exp:
+        return parsed, ("expired", "past-expiry")
+    return parsed, None
+
+
+class ScanFailureAggregator:
+    """
+    Rate-limited, aggregated logger for rejected scans.
+
+    The first occurrence of a (scanner, result, details, token) key within a window
+    is logged immediately; identical repeats inside the window are only counted and
+    handed back by drain() as one summary, so replay storms and scanner misread
+    loops do not produce one scan_logs row per attempt.
+    """
+
+    OVERFLOW_KEY = "*"
+
+    def __init__(self, window_seconds: int = 60, max_keys: int = 1024):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._entries: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, token: str, pass_id: Optional[int], student_id: Optional[int], scanner_id: int,
+               result: str, details: str, pass_type: str = "entry", now: Optional[float] = None) -> bool:
+        """Count a failure. Returns True when the caller should write it to scan_logs now."""
+        now = time.monotonic() if now is None else now
+        token_key = hashlib.sha256(token.encode()).hexdigest()[:16]
+        key = (scanner_id, result, details, token_key)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and len(self._entries) >= self.max_keys:
+                # Too many distinct tokens: fold the rest into one bucket per failure kind
+                key = (scanner_id, result, details, self.OVERFLOW_KEY)
+                entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = {
+                    "first_seen": now,
+                    "suppressed": 0,
+                    "pass_id": pass_id,
+                    "student_id": student_id,
+                    "scanner_id": scanner_id,
+                    "result": result,
+                    "details": details,
+                    "pass_type": pass_type,
+                }
+                return True
+            entry["suppressed"] += 1
+            return False
+
+    def drain(self, now: Optional[float] = None, force: bool = False) -> List[dict]:
+        """Close finished windows; returns the entries that had suppressed repeats."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            closed = [
+                key for key, entry in self._entries.items()
+                if force or now - entry["first_seen"] >= self.window_seconds
+            ]
+            summaries = [self._entries.pop(key) for key in closed]
+        return [entry for entry in summaries if entry["suppressed"]]
+
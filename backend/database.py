@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from settings import settings
 
@@ -14,3 +16,25 @@ def get_db():
     finally:
         db.close()
 
+
+def _async_db_url(sync_url: str) -> str:
+    """Map the sync DB_URL onto its asyncio driver (aiosqlite / asyncpg)."""
+    url = make_url(sync_url)
+    if url.drivername in ("sqlite", "sqlite+pysqlite"):
+        return url.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if url.drivername in ("postgresql", "postgresql+psycopg2"):
+        query = dict(url.query)
+        # asyncpg takes `ssl` instead of libpq's `sslmode`
+        sslmode = query.pop("sslmode", None)
+        if sslmode:
+            query["ssl"] = sslmode
+        return url.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+    return sync_url
+
+
+async_engine = create_async_engine(_async_db_url(settings.DB_URL), pool_pre_ping=True)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -13,12 +13,15 @@ from datetime import datetime, timezone, timedelta
 import importlib
 import io
 import json
+import logging
 import os
 from typing import Optional, Tuple
 
 import numpy as np
 from PIL import Image, ImageOps
 
+logger = logging.getLogger(__name__)
+
 # IST timezone (UTC+5:30)
 IST = timezone(timedelta(hours=5, minutes=30))
 
@@ -331,7 +334,7 @@ def _extract_opencv_encoding(image_bytes: bytes) -> Optional[dict]:
 
         return None
     except Exception as e:
-        print(f"Error extracting OpenCV face encoding: {e}")
+        logger.warning("Error extracting OpenCV face encoding: %s", e)
         return None
 
 
@@ -368,7 +371,7 @@ def _extract_face_recognition_encoding(image_bytes: bytes) -> Optional[list]:
 
         return encodings[0].tolist()
     except Exception as e:
-        print(f"Error extracting face_recognition encoding: {e}")
+        logger.warning("Error extracting face_recognition encoding: %s", e)
         return None
 
 
@@ -381,7 +384,7 @@ def extract_face_encoding(image_bytes: bytes) -> Optional[object]:
     """
     backend, error = _resolve_backend()
     if backend is None:
-        print(f"Face backend unavailable: {error}")
+        logger.warning("Face backend unavailable: %s", error)
         return None
 
     if backend == "face_recognition":
@@ -432,7 +435,7 @@ def _compare_face_recognition_encodings(known_encoding: list, check_encoding: li
         distance = float(face_recognition.face_distance([known], check)[0])
         return distance <= tolerance, distance
     except Exception as e:
-        print(f"Error comparing face_recognition encodings: {e}")
+        logger.warning("Error comparing face_recognition encodings: %s", e)
         return False, 1.0
 
 
@@ -458,7 +461,7 @@ def compare_faces(known_encoding: object, check_encoding: object, tolerance: flo
 
         return False, 1.0
     except Exception as e:
-        print(f"Error comparing faces: {e}")
+        logger.warning("Error comparing faces: %s", e)
         return False, 1.0
 
 
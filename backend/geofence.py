@@ -2,10 +2,15 @@
 GPS Geofencing Module
 Validates student location against campus boundaries
 """
-from shapely.geometry import Point, Polygon
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Point, Polygon, box
+from shapely.prepared import prep
 from geopy.distance import geodesic
-from typing import Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 import json
+import math
 
 # Campus Geofence
 # Format: List of [latitude, longitude] points defining campus boundary
@@ -22,6 +27,42 @@ DEFAULT_CAMPUS_POLYGON = [
 CAMPUS_CENTER = (31.7768, 77.0144)  # Latitude, Longitude of campus center
 CAMPUS_RADIUS_KM = 2.0  # 2 km radius to cover entire campus area
 
+# WGS84 ellipsoid, used for the local projection scale factors
+WGS84_A_KM = 6378.137
+WGS84_E2 = 6.69437999014e-3
+
+# Fast mode falls back to exact geodesic within this band around a threshold.
+# The local projection is off by well under 0.1% at campus scale, so 0.5% of the
+# threshold (at least 5 m) keeps every decision identical to geodesic.
+BOUNDARY_BAND_FRACTION = 0.005
+BOUNDARY_BAND_MIN_KM = 0.005
+
+# GPS inaccuracy allowance used by validate_location; its polygon buffer is built at load
+DEFAULT_BUFFER_METERS = 50
+
+def _circle_contains(projection: "LocalProjection", radius_km: float, latitude: float, longitude: float) -> bool:
+    """Projected squared-distance test, exact geodesic only inside the boundary band"""
+    band = boundary_band_km(radius_km)
+    distance_sq = projection.distance_sq_km(latitude, longitude)
+    if distance_sq <= max(radius_km - band, 0) ** 2:
+        return True
+    if distance_sq > (radius_km + band) ** 2:
+        return False
+    center = (projection.center_lat, projection.center_lon)
+    return geodesic(center, (latitude, longitude)).kilometers <= radius_km
+
+def _circle_contains_many(projection: "LocalProjection", radius_km: float, latitudes: np.ndarray,
+                          longitudes: np.ndarray) -> np.ndarray:
+    """Vectorized _circle_contains; only the few points inside the band go through geodesic"""
+    band = boundary_band_km(radius_km)
+    distance_sq = projection.distance_sq_km(latitudes, longitudes)
+    inside = distance_sq <= max(radius_km - band, 0) ** 2
+    undecided = np.flatnonzero(~inside & (distance_sq <= (radius_km + band) ** 2))
+    center = (projection.center_lat, projection.center_lon)
+    for i in undecided:
+        inside[i] = geodesic(center, (latitudes[i], longitudes[i])).kilometers <= radius_km
+    return inside
+
 def get_campus_settings():
     """Get campus location from settings file or use defaults"""
     try:
@@ -33,20 +74,198 @@ def get_campus_settings():
     except:
         return CAMPUS_CENTER, CAMPUS_RADIUS_KM
 
+class LocalProjection:
+    """
+    Equirectangular projection around a fixed centre.
+
+    Scale factors come from the WGS84 radii of curvature at the centre latitude,
+    so a distance is two multiplies and a sqrt instead of an iterative geodesic.
+    """
+
+    def __init__(self, center_lat: float, center_lon: float):
+        self.center_lat = center_lat
+        self.center_lon = center_lon
+        phi = math.radians(center_lat)
+        w = 1 - WGS84_E2 * math.sin(phi) ** 2
+        meridional = WGS84_A_KM * (1 - WGS84_E2) / w ** 1.5
+        prime_vertical = WGS84_A_KM / math.sqrt(w)
+        self.km_per_deg_lat = math.radians(meridional)
+        self.km_per_deg_lon = math.radians(prime_vertical * math.cos(phi))
+
+    def project(self, latitude, longitude):
+        """(x, y) in km east/north of the centre; accepts scalars or numpy arrays"""
+        # Wrap longitude so campuses near the antimeridian still work
+        x = ((longitude - self.center_lon + 180) % 360 - 180) * self.km_per_deg_lon
+        y = (latitude - self.center_lat) * self.km_per_deg_lat
+        return x, y
+
+    def distance_sq_km(self, latitude: float, longitude: float) -> float:
+        dx, dy = self.project(latitude, longitude)
+        return dx * dx + dy * dy
+
+class ProjectedPolygon:
+    """
+    A [lat, lon] polygon projected once into a local metric plane (km) around its centroid.
+
+    The metric polygon and its GPS-buffered variants are prepared at load, so each
+    check is a projection, a bounding-box reject and one prepared point-in-polygon
+    test, and batches go through shapely.contains_xy. Buffers are true metric
+    offsets of the boundary.
+    """
+
+    def __init__(self, coordinates: list, buffer_meters: int = DEFAULT_BUFFER_METERS):
+        lats = np.array([lat for lat, lon in coordinates], dtype=float)
+        lons = np.array([lon for lat, lon in coordinates], dtype=float)
+        self.center = (float(lats.mean()), float(lons.mean()))
+        self.projection = LocalProjection(*self.center)
+        xs, ys = self.projection.project(lats, lons)
+        self.shape = Polygon(np.column_stack([xs, ys]))
+        if not self.shape.is_valid:
+            self.shape = shapely.make_valid(self.shape)
+        # buffer_meters -> (shape prepared for contains_xy, prep() wrapper, bounds)
+        self._variants = {}
+        self._variant(0)
+        self._variant(buffer_meters)
+
+    def _variant(self, buffer_meters: int):
+        variant = self._variants.get(buffer_meters)
+        if variant is None:
+            shape = self.shape if buffer_meters <= 0 else self.shape.buffer(buffer_meters / 1000.0)
+            shapely.prepare(shape)
+            variant = (shape, prep(shape), shape.bounds)
+            self._variants[buffer_meters] = variant
+        return variant
+
+    def buffered(self, buffer_meters: int):
+        """Polygon grown by buffer_meters in the metric plane (cached, prepared)"""
+        return self._variant(buffer_meters)[0]
+
+    def contains(self, latitude: float, longitude: float, buffer_meters: int = 0) -> bool:
+        _, prepared, (min_x, min_y, max_x, max_y) = self._variant(buffer_meters)
+        x, y = self.projection.project(latitude, longitude)
+        if not (min_x <= x <= max_x and min_y <= y <= max_y):
+            return False
+        return prepared.contains(Point(x, y))
+
+    def contains_many(self, latitudes, longitudes, buffer_meters: int = 0) -> np.ndarray:
+        xs, ys = self.projection.project(np.asarray(latitudes, dtype=float), np.asarray(longitudes, dtype=float))
+        return shapely.contains_xy(self.buffered(buffer_meters), xs, ys)
+
+    def distance_to_center_km(self, latitude: float, longitude: float) -> float:
+        return math.sqrt(self.projection.distance_sq_km(latitude, longitude))
+
+def boundary_band_km(threshold_km: float) -> float:
+    return max(threshold_km * BOUNDARY_BAND_FRACTION, BOUNDARY_BAND_MIN_KM)
+
+class ZoneRegistry:
+    """
+    Named geofence zones (annexes, hostels, gates) from geofence_zones.json.
+
+    Zones are either circles ({"kind": "circle", "latitude", "longitude", "radius_km"})
+    or polygons ({"kind": "polygon", "polygon": [[lat, lon], ...]}). Their envelopes
+    live in an STRtree (x=lon, y=lat), so a lookup only runs the exact test on the
+    few zones whose bounding box holds the point. Rebuilt when the file changes.
+    """
+
+    def __init__(self, loader=None):
+        if loader is None:
+            import location_settings
+            loader = location_settings.get_zones_document
+        self._loader = loader
+        self._source = None
+        self._zones: List[Dict] = []
+        self._tests = []
+        self._batch_tests = []
+        self._tree = None
+
+    def _build(self, zones: List[Dict]):
+        active, envelopes, tests, batch_tests = [], [], [], []
+        for zone in zones:
+            if not zone.get("enabled", True):
+                continue
+            if zone.get("kind") == "polygon":
+                envelopes.append(Polygon([(lon, lat) for lat, lon in zone["polygon"]]).envelope)
+                projected = ProjectedPolygon(zone["polygon"], buffer_meters=0)
+                tests.append(lambda lat, lon, projected=projected: projected.contains(lat, lon))
+                batch_tests.append(projected.contains_many)
+            else:
+                projection = LocalProjection(zone["latitude"], zone["longitude"])
+                radius_km = zone["radius_km"]
+                dlat = radius_km * 1.01 / projection.km_per_deg_lat
+                dlon = radius_km * 1.01 / projection.km_per_deg_lon
+                envelopes.append(box(zone["longitude"] - dlon, zone["latitude"] - dlat,
+                                     zone["longitude"] + dlon, zone["latitude"] + dlat))
+                tests.append(lambda lat, lon, projection=projection, radius_km=radius_km:
+                             _circle_contains(projection, radius_km, lat, lon))
+                batch_tests.append(lambda lats, lons, projection=projection, radius_km=radius_km:
+                                   _circle_contains_many(projection, radius_km, lats, lons))
+            active.append(zone)
+        self._zones, self._tests, self._batch_tests = active, tests, batch_tests
+        self._tree = STRtree(envelopes) if envelopes else None
+
+    def _refresh(self):
+        document = self._loader()
+        zones = document.get("zones", [])
+        # The settings store hands out the same list object until the file changes
+        if zones is not self._source:
+            self._build(zones)
+            self._source = zones
+
+    def match(self, latitude: float, longitude: float) -> List[Dict]:
+        """Zones containing the point, in registry order"""
+        self._refresh()
+        if self._tree is None:
+            return []
+        candidates = sorted(self._tree.query(Point(longitude, latitude)).tolist())
+        return [self._zones[i] for i in candidates if self._tests[i](latitude, longitude)]
+
+    def match_many(self, latitudes: np.ndarray, longitudes: np.ndarray) -> List[Optional[str]]:
+        """Name of the first matching zone per point (None if none); coordinates must be valid"""
+        self._refresh()
+        names: List[Optional[str]] = [None] * len(latitudes)
+        if self._tree is None or len(latitudes) == 0:
+            return names
+
+        # One bulk tree query, then one vectorized exact test per candidate zone
+        point_index, zone_index = self._tree.query(shapely.points(longitudes, latitudes))
+        matched = np.full(len(latitudes), -1)
+        for zone in np.unique(zone_index):
+            points = point_index[zone_index == zone]
+            points = points[matched[points] < 0]
+            if len(points):
+                hits = self._batch_tests[zone](latitudes[points], longitudes[points])
+                matched[points[hits]] = zone
+        for i in np.flatnonzero(matched >= 0):
+            names[i] = self._zones[matched[i]]["name"]
+        return names
+
 class Geofence:
     """GPS Geofencing handler"""
     
-    def __init__(self, use_polygon: bool = False):
+    def __init__(self, use_polygon: bool = False, fast: Optional[bool] = None,
+                 polygon: Optional[list] = None):
         """
         Initialize geofence
         
         Args:
             use_polygon: If True, use polygon boundary. If False, use circular boundary (default)
+            fast: Use the local projection for circular checks (defaults to GEOFENCE_FAST_MODE)
+            polygon: [lat, lon] boundary for polygon mode (defaults to DEFAULT_CAMPUS_POLYGON)
         """
         self.use_polygon = use_polygon
+        if fast is None:
+            try:
+                from settings import settings
+                fast = settings.GEOFENCE_FAST_MODE
+            except Exception:
+                fast = True
+        self.fast = fast
+        self.center = None
+        self.radius_km = None
+        self.projection = None
         if use_polygon:
-            # Create Shapely polygon from coordinates
-            self.polygon = Polygon([(lat, lon) for lat, lon in DEFAULT_CAMPUS_POLYGON])
+            # Project and prepare the boundary (plus default GPS buffer) once
+            self.polygon = ProjectedPolygon(polygon or DEFAULT_CAMPUS_POLYGON)
         else:
             # Use configured location settings or defaults
             pass # Settings loaded dynamically on check
@@ -54,7 +273,24 @@ class Geofence:
     def _refresh_settings(self):
         """Reload settings from file"""
         if not self.use_polygon:
-            self.center, self.radius_km = get_campus_settings()
+            center, radius_km = get_campus_settings()
+            if center != self.center or self.projection is None:
+                # Projection is only rebuilt when the campus centre moves
+                self.projection = LocalProjection(*center)
+            self.center, self.radius_km = center, radius_km
+
+    def _circle_distance_km(self, latitude: float, longitude: float, *thresholds_km: float) -> float:
+        """
+        Distance to the campus centre (settings must be fresh).
+
+        In fast mode the projected distance is returned unless it falls inside the
+        boundary band of one of `thresholds_km`, where exact geodesic decides.
+        """
+        if self.fast:
+            distance_km = math.sqrt(self.projection.distance_sq_km(latitude, longitude))
+            if all(abs(distance_km - t) > boundary_band_km(t) for t in thresholds_km):
+                return distance_km
+        return geodesic(self.center, (latitude, longitude)).kilometers
     
     def is_inside(self, latitude: float, longitude: float) -> bool:
         """
@@ -69,14 +305,14 @@ class Geofence:
         """
         if self.use_polygon:
             # Check polygon containment
-            point = Point(latitude, longitude)
-            return self.polygon.contains(point)
+            return self.polygon.contains(latitude, longitude)
         else:
             # Check circular boundary
             self._refresh_settings()
-            student_location = (latitude, longitude)
-            distance_km = geodesic(self.center, student_location).kilometers
-            return distance_km <= self.radius_km
+            if self.fast:
+                # Squared-distance compare; no sqrt unless the point is near the edge
+                return _circle_contains(self.projection, self.radius_km, latitude, longitude)
+            return self._circle_distance_km(latitude, longitude) <= self.radius_km
     
     def get_distance_to_campus(self, latitude: float, longitude: float) -> float:
         """
@@ -90,13 +326,74 @@ class Geofence:
             Distance in kilometers
         """
         self._refresh_settings()
-        student_location = (latitude, longitude)
-        campus_center = self.center if not self.use_polygon else (
-            sum(p[0] for p in DEFAULT_CAMPUS_POLYGON) / len(DEFAULT_CAMPUS_POLYGON),
-            sum(p[1] for p in DEFAULT_CAMPUS_POLYGON) / len(DEFAULT_CAMPUS_POLYGON)
-        )
-        return geodesic(campus_center, student_location).kilometers
+        if not self.use_polygon:
+            return self._circle_distance_km(latitude, longitude)
+        if self.fast:
+            return self.polygon.distance_to_center_km(latitude, longitude)
+        return geodesic(self.polygon.center, (latitude, longitude)).kilometers
+
+    def contains_many(self, latitudes, longitudes, buffer_meters: int = 0) -> np.ndarray:
+        """
+        Vectorized containment for many points (admin batch checks).
+
+        Polygon mode uses shapely.contains_xy on the prepared metric polygon; circle
+        mode compares projected squared distances against the (buffered) radius.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        if self.use_polygon:
+            return self.polygon.contains_many(latitudes, longitudes, buffer_meters)
+        self._refresh_settings()
+        limit_km = self.radius_km + buffer_meters / 1000.0
+        return self.projection.distance_sq_km(latitudes, longitudes) <= limit_km ** 2
     
+    def validate_many(self, latitudes, longitudes,
+                      buffer_meters: int = DEFAULT_BUFFER_METERS) -> Dict[str, np.ndarray]:
+        """
+        Vectorized validate_location for audits and replays.
+
+        Returns arrays keyed valid / inside / inside_with_buffer / distance_km, plus a
+        `zone` list. Distances come from the local projection (NaN for invalid
+        coordinates); circle decisions near the edge still fall back to geodesic.
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        count = len(latitudes)
+        ok = (np.isfinite(latitudes) & np.isfinite(longitudes)
+              & (np.abs(latitudes) <= 90) & (np.abs(longitudes) <= 180))
+        lats, lons = latitudes[ok], longitudes[ok]
+
+        inside = np.zeros(count, dtype=bool)
+        inside_with_buffer = np.zeros(count, dtype=bool)
+        distance_km = np.full(count, np.nan)
+        if self.use_polygon:
+            projection = self.polygon.projection
+            inside[ok] = self.polygon.contains_many(lats, lons)
+            inside_with_buffer[ok] = inside[ok] | self.polygon.contains_many(lats, lons, buffer_meters)
+        else:
+            self._refresh_settings()
+            projection = self.projection
+            inside[ok] = _circle_contains_many(projection, self.radius_km, lats, lons)
+            inside_with_buffer[ok] = _circle_contains_many(
+                projection, self.radius_km + buffer_meters / 1000.0, lats, lons
+            )
+        distance_km[ok] = np.sqrt(projection.distance_sq_km(lats, lons))
+
+        campus_name = self._campus_name()
+        zone = [campus_name if hit else None for hit in inside_with_buffer]
+        pending = np.flatnonzero(ok & ~inside_with_buffer)
+        if zone_registry is not None and len(pending):
+            for i, name in zip(pending, zone_registry.match_many(latitudes[pending], longitudes[pending])):
+                zone[i] = name
+
+        return {
+            "valid": inside_with_buffer | np.array([name is not None for name in zone], dtype=bool),
+            "inside": inside,
+            "inside_with_buffer": inside_with_buffer,
+            "distance_km": distance_km,
+            "zone": zone,
+        }
+
     def validate_location(self, latitude: float, longitude: float, 
                          buffer_meters: int = 50) -> Tuple[bool, str, dict]:
         """
@@ -119,13 +416,23 @@ class Geofence:
                 "distance_km": None
             }
         
-        # Check geofence
-        is_inside = self.is_inside(latitude, longitude)
-        distance_km = self.get_distance_to_campus(latitude, longitude)
-        
         # Apply buffer for GPS inaccuracy
         buffer_km = buffer_meters / 1000.0
-        inside_with_buffer = is_inside or distance_km <= (self.radius_km + buffer_km if not self.use_polygon else buffer_km)
+
+        # Check geofence
+        if self.use_polygon:
+            # Metric buffer of the boundary itself (precomputed for the default allowance)
+            is_inside = self.is_inside(latitude, longitude)
+            distance_km = self.get_distance_to_campus(latitude, longitude)
+            inside_with_buffer = is_inside or self.polygon.contains(latitude, longitude, buffer_meters)
+        else:
+            # One distance serves both the strict and the buffered decision
+            self._refresh_settings()
+            distance_km = self._circle_distance_km(
+                latitude, longitude, self.radius_km, self.radius_km + buffer_km
+            )
+            is_inside = distance_km <= self.radius_km
+            inside_with_buffer = distance_km <= self.radius_km + buffer_km
         
         details = {
             "latitude": latitude,
@@ -136,16 +443,32 @@ class Geofence:
             "distance_meters": round(distance_km * 1000, 1)
         }
         
+        details["zone"] = self._campus_name() if inside_with_buffer else None
+        details["zones"] = []
+        if zone_registry is not None:
+            details["zones"] = [zone["name"] for zone in zone_registry.match(latitude, longitude)]
+            if details["zone"] is None and details["zones"]:
+                details["zone"] = details["zones"][0]
+
         if inside_with_buffer:
             if is_inside:
                 message = "Location verified: Inside campus"
             else:
                 message = f"Location verified: Near campus ({details['distance_meters']}m from center)"
             return True, message, details
+        elif details["zone"]:
+            return True, f"Location verified: Inside {details['zone']}", details
         else:
             message = f"Location denied: Outside campus ({details['distance_km']:.2f} km away)"
             return False, message, details
     
+    def _campus_name(self) -> str:
+        try:
+            import location_settings
+            return location_settings.get_location_settings().get("campus_name", "Campus")
+        except Exception:
+            return "Campus"
+
     @staticmethod
     def _is_valid_coordinate(latitude: float, longitude: float) -> bool:
         """Validate coordinate ranges"""
@@ -163,7 +486,7 @@ def create_custom_geofence(coordinates: list) -> Geofence:
     """
     global DEFAULT_CAMPUS_POLYGON
     DEFAULT_CAMPUS_POLYGON = coordinates
-    return Geofence(use_polygon=True)
+    return Geofence(use_polygon=True, polygon=coordinates)
 
 def create_circular_geofence(center_lat: float, center_lon: float, radius_km: float) -> Geofence:
     """
@@ -184,6 +507,7 @@ def create_circular_geofence(center_lat: float, center_lon: float, radius_km: fl
 
 # Global geofence instance (can be reconfigured)
 campus_geofence = Geofence(use_polygon=False)  # Default to circular
+zone_registry = ZoneRegistry()
 
 def validate_student_location(latitude: float, longitude: float) -> Tuple[bool, str, dict]:
     """
@@ -0,0 +1,75 @@
+"""
+Geohash helpers for grid-cell indexing of GPS points
+
+A geohash is a base32 string where every extra character narrows the cell
+(precision 6 is roughly 1.2 km x 0.6 km, 7 is about 150 m, 9 about 5 m), so a
+cell's points share a string prefix and a plain B-tree index serves
+bounding-box and per-cell aggregate queries.
+"""
+from typing import Optional, Tuple
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+STORED_PRECISION = 9
+
+
+def encode(latitude: float, longitude: float, precision: int = STORED_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+    while len(chars) < precision:
+        # Bits alternate longitude / latitude, starting with longitude
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits <<= 1
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def bounds(cell: str) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in cell:
+        index = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            target = lon_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if (index >> shift) & 1:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def safe_encode(latitude: Optional[float], longitude: Optional[float],
+                precision: int = STORED_PRECISION) -> Optional[str]:
+    """Geohash for stored rows; None when either coordinate is missing or out of range"""
+    if latitude is None or longitude is None:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return encode(latitude, longitude, precision)
+
+
+def common_prefix(south: float, west: float, north: float, east: float,
+                  precision: int = STORED_PRECISION) -> str:
+    """Longest geohash prefix shared by a bounding box's corners (may be empty)"""
+    corners = [encode(lat, lon, precision) for lat in (south, north) for lon in (west, east)]
+    prefix = []
+    for chars in zip(*corners):
+        if len(set(chars)) != 1:
+            break
+        prefix.append(chars[0])
+    return "".join(prefix)
@@ -0,0 +1,120 @@
+"""
+Conditional GET support for polled read endpoints
+
+The guard, admin, student and parent pages poll /scans, /scans/stats,
+/passes, /api/location and the parent history on timers, and most polls
+return the same JSON. Each endpoint computes a cheap version token first
+(max ids / timestamps of the rows it would return, read from indexes) and
+answers a matching `If-None-Match` with 304 before loading and serializing
+any rows.
+
+Tokens are derived from the database rather than an in-process change
+counter, so every worker agrees on them. Scans are append-only, so their
+newest id is a complete version; pass rows change in place, so their token
+folds in per-status counts and the newest approval/use/expiry times.
+`Last-Modified` is sent for information only: late offline uploads can
+carry older scan times, so only the ETag is used for validation.
+"""
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from models import PassRequest, ScanLog, ScanLogArchiveSegment
+
+# IST timezone (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    """Weak ETag over the repr of the version parts"""
+    digest = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match header (list or `*`)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def http_date(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    # Stored times are naive IST; live rows may carry an offset
+    aware = value if value.tzinfo else value.replace(tzinfo=IST)
+    return format_datetime(aware.astimezone(timezone.utc), usegmt=True)
+
+
+def conditional(request: Request, response: Response, *parts,
+                last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """
+    Validators for a GET: returns a 304 Response when the client's copy is
+    current, otherwise sets ETag/Last-Modified on `response` and returns None
+    so the endpoint goes on to build the body.
+    """
+    etag = make_etag(request.url.path, *parts)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    modified = http_date(last_modified)
+    if modified:
+        headers["Last-Modified"] = modified
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def ist_today() -> date:
+    return datetime.now(IST).date()
+
+
+def passes_version(db: Session, student_id: Optional[int] = None, status: Optional[str] = None) -> tuple:
+    """Fingerprint of the pass rows /passes would return"""
+    query = select(
+        func.count(PassRequest.id),
+        func.max(PassRequest.id),
+        func.sum(case((PassRequest.status == "approved", 1), else_=0)),
+        func.sum(case((PassRequest.status == "rejected", 1), else_=0)),
+        func.sum(case((PassRequest.status == "used", 1), else_=0)),
+        func.max(PassRequest.approved_time),
+        func.max(PassRequest.used_time),
+        func.max(PassRequest.expiry_time),
+        func.max(PassRequest.request_time),
+    )
+    if student_id is not None:
+        query = query.where(PassRequest.student_id == student_id)
+    if status:
+        query = query.where(PassRequest.status == status)
+    return tuple(db.execute(query).one())
+
+
+def scans_version(db: Session) -> tuple:
+    """(newest scan id, newest scan time, newest archive segment id)"""
+    return tuple(db.execute(select(
+        select(func.max(ScanLog.id)).scalar_subquery(),
+        select(func.max(ScanLog.scan_time)).scalar_subquery(),
+        select(func.max(ScanLogArchiveSegment.id)).scalar_subquery(),
+    )).one())
+
+
+def student_scans_version(db: Session, student_id: int) -> tuple:
+    """(newest scan id, newest scan time) for one student, from the (student_id, scan_time) index"""
+    return tuple(db.execute(
+        select(func.max(ScanLog.id), func.max(ScanLog.scan_time)).where(ScanLog.student_id == student_id)
+    ).one())
@@ -0,0 +1,178 @@
+"""
+Batch GPS location validation
+
+Re-checks many coordinates at once against the current geofence (campus
+circle/polygon plus zones) with the vectorized Geofence.validate_many, e.g. to
+audit historical pass requests after the campus radius changes.
+
+Usage (from backend/):
+    python location_audit.py csv points.csv [--buffer-meters 50]
+    python location_audit.py passes [--write-back] [--chunk-size 1000]
+"""
+import argparse
+import csv
+import json
+import math
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+import geofence
+from models import PassRequest
+
+LATITUDE_COLUMNS = ("latitude", "lat")
+LONGITUDE_COLUMNS = ("longitude", "lon", "lng")
+
+
+def parse_coordinate(value) -> float:
+    """Float from a CSV cell or stored coordinate; NaN when missing or unparseable"""
+    if value is None:
+        return math.nan
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return math.nan
+
+
+def evaluate_points(latitudes: Iterable, longitudes: Iterable, ids: Optional[List] = None,
+                    buffer_meters: int = geofence.DEFAULT_BUFFER_METERS) -> Dict:
+    """Validate all points in one vectorized pass -> {"summary": {...}, "results": [...]}"""
+    latitudes = np.asarray(latitudes, dtype=float)
+    longitudes = np.asarray(longitudes, dtype=float)
+    evaluated = geofence.campus_geofence.validate_many(latitudes, longitudes, buffer_meters)
+
+    results = []
+    for i in range(len(latitudes)):
+        distance = evaluated["distance_km"][i]
+        results.append({
+            "id": ids[i] if ids is not None else i,
+            "latitude": None if math.isnan(latitudes[i]) else float(latitudes[i]),
+            "longitude": None if math.isnan(longitudes[i]) else float(longitudes[i]),
+            "valid": bool(evaluated["valid"][i]),
+            "inside": bool(evaluated["inside"][i]),
+            "distance_km": None if math.isnan(distance) else round(float(distance), 3),
+            "zone": evaluated["zone"][i],
+        })
+
+    valid = int(evaluated["valid"].sum())
+    return {
+        "summary": {
+            "total": len(results),
+            "valid": valid,
+            "invalid": len(results) - valid,
+            "unparseable": int(np.count_nonzero(np.isnan(latitudes) | np.isnan(longitudes))),
+            "buffer_meters": buffer_meters,
+        },
+        "results": results,
+    }
+
+
+def read_points_csv(stream) -> Dict[str, list]:
+    """Read id/latitude/longitude rows from a text stream without loading the file twice"""
+    reader = csv.DictReader(stream)
+    fields = {name.strip().lower(): name for name in (reader.fieldnames or [])}
+    lat_field = next((fields[c] for c in LATITUDE_COLUMNS if c in fields), None)
+    lon_field = next((fields[c] for c in LONGITUDE_COLUMNS if c in fields), None)
+    if lat_field is None or lon_field is None:
+        raise ValueError("CSV needs latitude/lat and longitude/lon/lng columns")
+    id_field = fields.get("id")
+
+    ids, latitudes, longitudes = [], [], []
+    for row_number, row in enumerate(reader, start=1):
+        ids.append(row.get(id_field) if id_field else row_number)
+        latitudes.append(parse_coordinate(row.get(lat_field)))
+        longitudes.append(parse_coordinate(row.get(lon_field)))
+    return {"ids": ids, "latitudes": latitudes, "longitudes": longitudes}
+
+
+def revalidate_passes(db: Session, write_back: bool = False, chunk_size: int = 1000,
+                      buffer_meters: int = geofence.DEFAULT_BUFFER_METERS) -> Dict:
+    """
+    Re-check every pass request that carries GPS coordinates.
+
+    Walks `passes` in primary-key order chunk by chunk. Each chunk is evaluated
+    in one vectorized call and, with write_back, updated with one bulk UPDATE
+    by primary key and committed, so memory stays flat on large tables.
+    """
+    stats = {"checked": 0, "verified": 0, "changed": 0, "unparseable": 0, "written": 0}
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(PassRequest.id, PassRequest.request_latitude, PassRequest.request_longitude,
+                   PassRequest.location_verified)
+            .where(PassRequest.id > last_id, PassRequest.request_latitude.isnot(None),
+                   PassRequest.request_longitude.isnot(None))
+            .order_by(PassRequest.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        latitudes = np.array([parse_coordinate(row.request_latitude) for row in rows])
+        longitudes = np.array([parse_coordinate(row.request_longitude) for row in rows])
+        evaluated = geofence.campus_geofence.validate_many(latitudes, longitudes, buffer_meters)
+
+        updates = []
+        for i, row in enumerate(rows):
+            if math.isnan(latitudes[i]) or math.isnan(longitudes[i]):
+                stats["unparseable"] += 1
+                continue
+            verified = bool(evaluated["valid"][i])
+            stats["checked"] += 1
+            stats["verified"] += verified
+            stats["changed"] += verified != bool(row.location_verified)
+            updates.append({
+                "id": row.id,
+                "location_verified": verified,
+                "location_distance_km": round(float(evaluated["distance_km"][i]), 3),
+                "location_zone": evaluated["zone"][i],
+            })
+
+        if write_back and updates:
+            db.execute(update(PassRequest), updates)
+            db.commit()
+            stats["written"] += len(updates)
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-validate GPS locations against the campus geofence")
+    parser.add_argument("--buffer-meters", type=int, default=geofence.DEFAULT_BUFFER_METERS)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    csv_command = commands.add_parser("csv", help="validate id/latitude/longitude rows from a CSV file")
+    csv_command.add_argument("path")
+    csv_command.add_argument("--summary-only", action="store_true")
+
+    passes_command = commands.add_parser("passes", help="re-check stored pass request locations")
+    passes_command.add_argument("--write-back", action="store_true",
+                                help="update location_verified / location_distance_km / location_zone")
+    passes_command.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.command == "csv":
+        with open(args.path, newline="", encoding="utf-8") as f:
+            points = read_points_csv(f)
+        report = evaluate_points(points["latitudes"], points["longitudes"], points["ids"], args.buffer_meters)
+        print(json.dumps(report["summary"] if args.summary_only else report, indent=2))
+        return
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        stats = revalidate_passes(db, write_back=args.write_back, chunk_size=args.chunk_size,
+                                  buffer_meters=args.buffer_meters)
+    finally:
+        db.close()
+    print(json.dumps(stats, indent=2))
+    if not args.write_back:
+        print("ℹ️  Dry run - pass --write-back to store the results")
+
+
+if __name__ == "__main__":
+    main()
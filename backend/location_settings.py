@@ -3,49 +3,132 @@ Location Settings Management
 Allows admin to configure campus location for GPS geofencing
 """
 import json
+import logging
 import os
-from typing import Dict, Optional
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
 
 # Get the directory where this file is located (backend directory)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 SETTINGS_FILE = os.path.join(BASE_DIR, "location_settings.json")
+ZONES_FILE = os.path.join(BASE_DIR, "geofence_zones.json")
 
 DEFAULT_LOCATION = {
     "campus_name": "Campus",
     "latitude": 31.7768,
     "longitude": 77.0144,
     "radius_km": 2.0,
-    "enabled": True
+    "enabled": True,
+    "version": 0
 }
 
-def get_location_settings() -> Dict:
-    """Get current location settings"""
-    if os.path.exists(SETTINGS_FILE):
+# Extra named zones (annexes, hostels, gates) accepted in addition to the campus circle
+DEFAULT_ZONES = {
+    "zones": [],
+    "version": 0
+}
+
+class LocationSettingsStore:
+    """
+    In-memory copy of a settings JSON file (location_settings.json, geofence_zones.json).
+
+    Geofence checks hit this on every request, so the file is only re-read when
+    its (mtime, inode, size) changes - e.g. another worker saved new settings -
+    or after save() here. Writes go to a temp file that is renamed over the
+    original, so readers never see a half-written file. Every save bumps the
+    persisted `version` counter, which all workers agree on and clients can
+    cache against.
+    """
+
+    def __init__(self, path: str, defaults: Dict = DEFAULT_LOCATION):
+        self.path = path
+        self.defaults = defaults
+        self._settings: Optional[Dict] = None
+        self._stat_key = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _file_key(path: str):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+    def _load(self, key) -> Dict:
+        if key is None:
+            return dict(self.defaults)
         try:
-            with open(SETTINGS_FILE, 'r') as f:
-                return json.load(f)
+            with open(self.path, 'r') as f:
+                loaded = json.load(f)
         except Exception as e:
-            print(f"Error reading location settings: {e}")
-            return DEFAULT_LOCATION
-    return DEFAULT_LOCATION
+            logger.error("Error reading location settings: %s", e)
+            # Keep serving the last good copy rather than silently resetting the campus
+            return self._settings if self._settings is not None else dict(self.defaults)
+        loaded.setdefault("version", 0)
+        return loaded
+
+    def get(self) -> Dict:
+        key = self._file_key(self.path)
+        if self._settings is None or key != self._stat_key:
+            with self._lock:
+                if self._settings is None or key != self._stat_key:
+                    self._settings = self._load(key)
+                    self._stat_key = key
+        return dict(self._settings)
+
+    @property
+    def version(self) -> int:
+        return self.get().get("version", 0)
+
+    def save(self, settings: Dict) -> Dict:
+        """Atomically persist settings with the next version number; returns what was written."""
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            # Re-read the on-disk version so a save in another worker is not reused
+            current = self._load(self._file_key(self.path))
+            data = dict(settings)
+            data["version"] = int(current.get("version", 0)) + 1
+
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".location_settings.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(data, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+
+            self._settings = data
+            self._stat_key = self._file_key(self.path)
+        return dict(data)
+
+settings_store = LocationSettingsStore(SETTINGS_FILE)
+zones_store = LocationSettingsStore(ZONES_FILE, defaults=DEFAULT_ZONES)
+
+def get_location_settings() -> Dict:
+    """Get current location settings"""
+    return settings_store.get()
+
+def get_settings_version() -> int:
+    """Version counter of the saved settings (0 until the first save)"""
+    return settings_store.version
 
 def save_location_settings(settings: Dict) -> bool:
     """Save location settings"""
     try:
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(SETTINGS_FILE), exist_ok=True)
-        
-        # Write the settings
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f, indent=2)
-        
-        print(f"✅ Location settings saved successfully to {SETTINGS_FILE}")
+        settings_store.save(settings)
+        logger.info("Location settings saved to %s", SETTINGS_FILE)
         return True
-    except Exception as e:
-        print(f"❌ Error saving location settings: {e}")
-        print(f"   Attempted to save to: {SETTINGS_FILE}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Error saving location settings to %s", SETTINGS_FILE)
         return False
 
 def update_location(latitude: float, longitude: float, radius_km: float = 2.0, 
@@ -59,18 +142,15 @@ def update_location(latitude: float, longitude: float, radius_km: float = 2.0,
         "enabled": enabled
     }
     
-    print(f"📝 Attempting to save location settings:")
-    print(f"   Campus: {campus_name}")
-    print(f"   Lat/Lon: {latitude}, {longitude}")
-    print(f"   Radius: {radius_km} km")
-    print(f"   Enabled: {enabled}")
+    logger.debug(
+        "Saving location settings: campus=%s lat/lon=%s,%s radius=%s km enabled=%s",
+        campus_name, latitude, longitude, radius_km, enabled,
+    )
     
     if save_location_settings(settings):
-        print("✅ Location settings updated successfully!")
-        return settings
+        return get_location_settings()
     else:
         error_msg = f"Failed to save location settings to {SETTINGS_FILE}"
-        print(f"❌ {error_msg}")
         raise Exception(error_msg)
 
 def is_geofencing_enabled() -> bool:
@@ -87,3 +167,39 @@ def get_campus_radius() -> float:
     """Get campus radius in kilometers"""
     settings = get_location_settings()
     return settings.get("radius_km", 2.0)
+
+def get_zones_document() -> Dict:
+    """Zone registry document: {"zones": [...], "version": n}"""
+    return zones_store.get()
+
+def get_zones() -> List[Dict]:
+    """All configured geofence zones"""
+    return list(zones_store.get().get("zones", []))
+
+def validate_zones(zones: List[Dict]) -> None:
+    """Raise ValueError if the zones cannot be saved as a registry"""
+    names = [zone["name"] for zone in zones]
+    if len(names) != len(set(names)):
+        raise ValueError("Zone names must be unique")
+
+def save_zones(zones: List[Dict]) -> Dict:
+    """Replace the whole zone registry"""
+    validate_zones(zones)
+    saved = zones_store.save({"zones": zones})
+    logger.info("Saved %d geofence zone(s) to %s", len(zones), zones_store.path)
+    return saved
+
+def upsert_zone(zone: Dict) -> Dict:
+    """Add a zone or replace the one with the same name"""
+    zones = [existing for existing in get_zones() if existing["name"] != zone["name"]]
+    zones.append(zone)
+    return save_zones(zones)
+
+def delete_zone(name: str) -> bool:
+    """Remove a zone by name; returns False if it did not exist"""
+    zones = get_zones()
+    remaining = [zone for zone in zones if zone["name"] != name]
+    if len(remaining) == len(zones):
+        return False
+    save_zones(remaining)
+    return True
@@ -0,0 +1,131 @@
+"""
+Scan log archival (hot/cold split)
+
+Rows older than SCAN_LOG_RETENTION_DAYS move from scan_logs into
+scan_logs_archive in id-ordered batches, so the table every guard poll and
+analytics query scans stays small. Each batch is recorded as a segment with its
+min/max scan_time; search and export only read the archive when the requested
+range overlaps a segment.
+
+Usage (from backend/):
+    python log_archive.py [--days 365] [--batch-size 5000] [--dry-run]
+"""
+import argparse
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from models import ScanLog, ScanLogArchive, ScanLogArchiveSegment
+from settings import settings
+
+# IST timezone (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Parent history and the guard dashboards read the last 30 days from scan_logs only
+MIN_RETENTION_DAYS = 31
+ARCHIVE_COLUMNS = ("id", "pass_id", "student_id", "scanner_id", "scan_time", "result", "pass_type",
+                   "emergency", "details")
+
+
+def archive_cutoff(retention_days: int) -> datetime:
+    # scan_time is stored as naive IST
+    return datetime.now(IST).replace(tzinfo=None) - timedelta(days=max(retention_days, MIN_RETENTION_DAYS))
+
+
+def archive_old_logs(db: Session, retention_days: Optional[int] = None,
+                     batch_size: Optional[int] = None, dry_run: bool = False) -> Dict:
+    """Move scan_logs rows older than the retention horizon into scan_logs_archive (retention 0 disables)"""
+    retention_days = settings.SCAN_LOG_RETENTION_DAYS if retention_days is None else retention_days
+    batch_size = batch_size or settings.SCAN_LOG_ARCHIVE_BATCH_SIZE
+    if retention_days <= 0:
+        return {"cutoff": None, "archived": 0, "segments": 0, "dry_run": dry_run}
+    cutoff = archive_cutoff(retention_days)
+    stats = {"cutoff": cutoff.isoformat(), "archived": 0, "segments": 0, "dry_run": dry_run}
+
+    if dry_run:
+        stats["archived"] = db.scalar(select(func.count(ScanLog.id)).where(ScanLog.scan_time < cutoff)) or 0
+        return stats
+
+    while True:
+        rows = db.execute(
+            select(ScanLog.id, ScanLog.scan_time)
+            .where(ScanLog.scan_time < cutoff)
+            .order_by(ScanLog.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        ids = [row.id for row in rows]
+        times = [row.scan_time for row in rows]
+        columns = [getattr(ScanLog, name) for name in ARCHIVE_COLUMNS]
+        # Copy, delete and record the segment in one transaction so a crash never loses or duplicates rows
+        db.execute(insert(ScanLogArchive).from_select(list(ARCHIVE_COLUMNS), select(*columns).where(ScanLog.id.in_(ids))))
+        db.execute(delete(ScanLog).where(ScanLog.id.in_(ids)))
+        db.add(ScanLogArchiveSegment(
+            min_time=min(times), max_time=max(times),
+            min_log_id=ids[0], max_log_id=ids[-1], row_count=len(ids),
+        ))
+        db.commit()
+        stats["archived"] += len(ids)
+        stats["segments"] += 1
+
+    return stats
+
+
+def archive_bounds(db: Session) -> Optional[tuple]:
+    """(oldest, newest) scan_time held in the archive, or None when it is empty"""
+    oldest, newest = db.execute(
+        select(func.min(ScanLogArchiveSegment.min_time), func.max(ScanLogArchiveSegment.max_time))
+    ).one()
+    if oldest is None:
+        return None
+    return oldest, newest
+
+
+def range_needs_archive(db: Session, date_from: Optional[datetime] = None,
+                        date_to: Optional[datetime] = None) -> bool:
+    bounds = archive_bounds(db)
+    if bounds is None:
+        return False
+    oldest, newest = bounds
+    return (date_from is None or date_from <= newest) and (date_to is None or date_to >= oldest)
+
+
+def archive_status(db: Session) -> Dict:
+    bounds = archive_bounds(db)
+    return {
+        "retention_days": max(settings.SCAN_LOG_RETENTION_DAYS, MIN_RETENTION_DAYS)
+        if settings.SCAN_LOG_RETENTION_DAYS > 0 else 0,
+        "segments": db.scalar(select(func.count(ScanLogArchiveSegment.id))) or 0,
+        "archived_rows": db.scalar(select(func.sum(ScanLogArchiveSegment.row_count))) or 0,
+        "oldest": bounds[0].isoformat() if bounds else None,
+        "newest": bounds[1].isoformat() if bounds else None,
+        "hot_rows": db.scalar(select(func.count(ScanLog.id))) or 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old scan logs into scan_logs_archive")
+    parser.add_argument("--days", type=int, default=settings.SCAN_LOG_RETENTION_DAYS,
+                        help=f"keep this many days in scan_logs (minimum {MIN_RETENTION_DAYS})")
+    parser.add_argument("--batch-size", type=int, default=settings.SCAN_LOG_ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="only count the rows that would move")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        stats = archive_old_logs(db, args.days, args.batch_size, args.dry_run)
+        stats["status"] = archive_status(db)
+    finally:
+        db.close()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
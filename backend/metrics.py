@@ -0,0 +1,332 @@
+"""
+Prometheus metrics for the gate hot paths
+
+Enabled with METRICS_ENABLED; `GET /metrics` then serves the Prometheus text
+format (protect it with METRICS_TOKEN when the app is public). Collected:
+- smartgate_http_request_duration_seconds{method,route,status}
+- smartgate_db_queries_per_request{route}
+- smartgate_verify_stage_seconds{stage} for /verify
+- smartgate_face_seconds{operation,backend}
+- smartgate_ws_connections and smartgate_ws_broadcast_lag_seconds
+
+When disabled no middleware or SQLAlchemy listener is installed and the
+timing helpers hand back a shared no-op context manager, so instrumented code
+pays one attribute check. Values are per worker process.
+"""
+import bisect
+import contextlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from settings import settings
+
+enabled = settings.METRICS_ENABLED
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+_NOOP = contextlib.nullcontext()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every series of this metric"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _LabeledMetric(_Metric):
+    """Metric with one child value per label combination"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation)
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """Fresh value holder for a new label combination"""
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_LabeledMetric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def _samples(self):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in sorted(self._children.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class CallbackMetric(_Metric):
+    """Counter or gauge read from `callback()` at scrape time"""
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float], kind: str = "gauge"):
+        super().__init__(name, documentation)
+        self.callback = callback
+        self.kind = kind
+
+    def _samples(self):
+        try:
+            return [f"{self.name} {_format_value(self.callback())}"]
+        except Exception:
+            return []
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class Histogram(_LabeledMetric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def _samples(self):
+        lines = []
+        for key, child in sorted(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: _HistogramValue):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "smartgate_http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status"),
+))
+REQUEST_QUERIES = registry.register(Histogram(
+    "smartgate_db_queries_per_request", "SQL statements executed while serving a request",
+    ("route",), buckets=QUERY_COUNT_BUCKETS,
+))
+VERIFY_STAGE_SECONDS = registry.register(Histogram(
+    "smartgate_verify_stage_seconds", "Time spent in each /verify stage", ("stage",),
+))
+FACE_SECONDS = registry.register(Histogram(
+    "smartgate_face_seconds", "Face backend call latency", ("operation", "backend"),
+))
+WS_CONNECTIONS = registry.register(Gauge(
+    "smartgate_ws_connections", "Open admin real-time log WebSocket connections",
+))
+WS_BROADCAST_LAG = registry.register(Histogram(
+    "smartgate_ws_broadcast_lag_seconds", "Delay from scan commit to delivery on a log WebSocket",
+))
+WS_SEND_ERRORS = registry.register(Counter(
+    "smartgate_ws_send_errors_total", "Failed WebSocket broadcast sends",
+))
+
+# Statement counter of the request being served; None outside the middleware
+_request_queries: ContextVar[Optional[List[int]]] = ContextVar("smartgate_request_queries", default=None)
+
+
+def _count_query(*_):
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: route latency and SQL statement count per HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        queries = [0]
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_queries.reset(token)
+            # Route templates keep label cardinality bounded; unrouted paths (static files, 404s) share one label
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_SECONDS.labels(scope["method"], route, status[0]).observe(elapsed)
+            REQUEST_QUERIES.labels(route).observe(queries[0])
+
+
+def install(app):
+    """Attach the middleware and SQL statement counter when METRICS_ENABLED"""
+    if not enabled:
+        return
+    app.add_middleware(MetricsMiddleware)
+    if not event.contains(Engine, "before_cursor_execute", _count_query):
+        event.listen(Engine, "before_cursor_execute", _count_query)
+
+
+def verify_stage(stage: str):
+    """Context manager timing one /verify stage"""
+    if not enabled:
+        return _NOOP
+    return VERIFY_STAGE_SECONDS.labels(stage).time()
+
+
+def face_timer(face_auth_module, operation: str):
+    """Context manager timing one face backend call"""
+    if not enabled:
+        return _NOOP
+    backend = getattr(face_auth_module, "get_backend_name", lambda: None)() or "unknown"
+    return FACE_SECONDS.labels(operation, backend).time()
+
+
+def ws_connected(delta: int):
+    if enabled:
+        WS_CONNECTIONS.labels().inc(delta)
+
+
+def ws_delivered(queued_at: Optional[float]):
+    """Record broadcast lag for one delivered message; `queued_at` is a perf_counter() reading"""
+    if enabled and queued_at is not None:
+        WS_BROADCAST_LAG.labels().observe(time.perf_counter() - queued_at)
+
+
+def ws_send_failed():
+    if enabled:
+        WS_SEND_ERRORS.labels().inc()
+
+
+def register_callback(name: str, documentation: str, callback: Callable[[], float], kind: str = "gauge"):
+    """Expose a value another module already tracks, read at scrape time"""
+    return registry.register(CallbackMetric(name, documentation, callback, kind))
+
+
+def render() -> str:
+    return registry.render()
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, Boolean
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, Text, Enum, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone, timedelta
 from database import Base
+from runtime_schema import CompatFloat
 
 # IST timezone (UTC+5:30)
 IST = timezone(timedelta(hours=5, minutes=30))
@@ -75,10 +76,13 @@ class PassRequest(Base):
     used_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     
     # GPS Geofencing fields
-    request_latitude = Column(Text, nullable=True)  # GPS lat when requested
-    request_longitude = Column(Text, nullable=True)  # GPS lon when requested
+    request_latitude = Column(CompatFloat, nullable=True)  # GPS lat when requested
+    request_longitude = Column(CompatFloat, nullable=True)  # GPS lon when requested
     location_verified = Column(Boolean, default=False)  # If location was inside campus
-    location_distance_km = Column(Text, nullable=True)  # Distance from campus center
+    location_distance_km = Column(CompatFloat, nullable=True)  # Distance from campus center
+    location_zone = Column(String(100), nullable=True)  # Geofence zone the request matched
+    location_cell = Column(String(12), nullable=True, index=True)  # geohash of the request location
+    daily_key = Column(String(40), nullable=True, unique=True, index=True)  # "student:type:ist-date" of an active daily pass
 
 class ScanLog(Base):
     __tablename__ = "scan_logs"
@@ -86,8 +90,59 @@ class ScanLog(Base):
     pass_id = Column(Integer, ForeignKey("passes.id"), index=True)
     student_id = Column(Integer, ForeignKey("users.id"))
     scanner_id = Column(Integer, ForeignKey("users.id"))
-    scan_time = Column(DateTime, default=now_ist)
+    scan_time = Column(DateTime, default=now_ist, index=True)
     result = Column(String(32))   # success | expired | invalid | replay | not-approved
     pass_type = Column(String(10), default="entry")  # entry|exit
     emergency = Column(Boolean, default=False)
     details = Column(Text, nullable=True)
+    client_event_id = Column(String(64), nullable=True)  # offline /verify/batch event id
+
+    # Per-student history pages walk this index by (student_id, scan_time) keyset;
+    # a resent offline event maps back to its row by (scanner_id, client_event_id)
+    __table_args__ = (
+        Index("ix_scan_logs_student_time", "student_id", "scan_time"),
+        Index("ix_scan_logs_scanner_event", "scanner_id", "client_event_id", unique=True),
+    )
+
+class StudentDailyActivity(Base):
+    """Per-student, per-IST-day scan counters maintained on every scan"""
+    __tablename__ = "student_daily_activity"
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    entries = Column(Integer, default=0, nullable=False)
+    exits = Column(Integer, default=0, nullable=False)
+    failures = Column(Integer, default=0, nullable=False)
+    last_seen = Column(DateTime, nullable=True)  # latest successful scan that day
+
+class Presence(Base):
+    """Last successful scan per user; direction "entry" means on campus"""
+    __tablename__ = "presence"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    direction = Column(String(10), index=True)  # entry|exit
+    last_scan_time = Column(DateTime)
+    last_pass_id = Column(Integer, nullable=True)
+    emergency = Column(Boolean, default=False)
+
+class ScanLogArchive(Base):
+    """Cold copy of scan_logs rows older than SCAN_LOG_RETENTION_DAYS (ids are kept)"""
+    __tablename__ = "scan_logs_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    pass_id = Column(Integer, index=True)
+    student_id = Column(Integer)
+    scanner_id = Column(Integer)
+    scan_time = Column(DateTime, index=True)
+    result = Column(String(32))
+    pass_type = Column(String(10))
+    emergency = Column(Boolean, default=False)
+    details = Column(Text, nullable=True)
+
+class ScanLogArchiveSegment(Base):
+    """One archival batch: which time/id range moved to scan_logs_archive"""
+    __tablename__ = "scan_log_archive_segments"
+    id = Column(Integer, primary_key=True)
+    min_time = Column(DateTime, index=True)
+    max_time = Column(DateTime, index=True)
+    min_log_id = Column(Integer)
+    max_log_id = Column(Integer)
+    row_count = Column(Integer)
+    archived_at = Column(DateTime, default=now_ist)
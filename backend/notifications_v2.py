@@ -3,10 +3,13 @@ Updated Notification Service with Firebase Admin SDK (V1 API)
 Supports: Firebase Cloud Messaging + Twilio SMS
 """
 
+import logging
 import os
 from typing import Optional, List
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 # =====================
 # Firebase Admin SDK (V1 API)
 # =====================
@@ -27,25 +30,22 @@ try:
         cred = credentials.Certificate(cred_dict)
         firebase_admin.initialize_app(cred)
         FIREBASE_ENABLED = True
-        print("✅ Firebase Admin SDK initialized successfully from environment variable")
-        print(f"   Project: {cred.project_id}")
+        logger.info("Firebase Admin SDK initialized from environment variable (project %s)", cred.project_id)
     elif os.path.exists(cred_path):
         cred = credentials.Certificate(cred_path)
         firebase_admin.initialize_app(cred)
         FIREBASE_ENABLED = True
-        print("✅ Firebase Admin SDK initialized successfully from file")
-        print(f"   Project: {cred.project_id}")
+        logger.info("Firebase Admin SDK initialized from file (project %s)", cred.project_id)
     else:
         FIREBASE_ENABLED = False
-        print("⚠️  firebase-credentials.json and FIREBASE_CREDENTIALS_JSON not found")
+        logger.warning("firebase-credentials.json and FIREBASE_CREDENTIALS_JSON not found")
         
 except ImportError:
     FIREBASE_ENABLED = False
-    print("⚠️  firebase-admin not installed")
-    print("   Run: pip install firebase-admin")
+    logger.warning("firebase-admin not installed (pip install firebase-admin)")
 except Exception as e:
     FIREBASE_ENABLED = False
-    print(f"⚠️  Firebase initialization error: {e}")
+    logger.warning("Firebase initialization error: %s", e)
 
 
 # =====================
@@ -57,7 +57,7 @@ try:
     TWILIO_AVAILABLE = True
 except ImportError:
     TWILIO_AVAILABLE = False
-    print("⚠️  Twilio not installed. Run: pip install twilio")
+    logger.warning("Twilio not installed (pip install twilio)")
 
 TWILIO_SID = os.getenv("TWILIO_ACCOUNT_SID", "")
 TWILIO_TOKEN = os.getenv("TWILIO_AUTH_TOKEN", "")
@@ -67,10 +67,9 @@ twilio_client = None
 if TWILIO_AVAILABLE and TWILIO_SID and TWILIO_TOKEN:
     try:
         twilio_client = Client(TWILIO_SID, TWILIO_TOKEN)
-        print("✅ Twilio SMS initialized successfully")
-        print(f"   From: {TWILIO_NUMBER}")
+        logger.info("Twilio SMS initialized (from %s)", TWILIO_NUMBER)
     except Exception as e:
-        print(f"⚠️  Twilio initialization error: {e}")
+        logger.warning("Twilio initialization error: %s", e)
 
 
 # =====================
@@ -91,11 +90,11 @@ def send_push_notification(token: str, title: str, body: str, data: dict = None)
         True if successful, False otherwise
     """
     if not FIREBASE_ENABLED:
-        print("⚠️  Firebase not configured, skipping push notification")
+        logger.debug("Firebase not configured, skipping push notification")
         return False
     
     if not token:
-        print("⚠️  No FCM token provided")
+        logger.debug("No FCM token provided")
         return False
     
     try:
@@ -132,14 +131,14 @@ def send_push_notification(token: str, title: str, body: str, data: dict = None)
         
         # Send message
         response = messaging.send(message)
-        print(f"✅ Push notification sent successfully: {response}")
+        logger.debug("Push notification sent: %s", response)
         return True
         
     except messaging.UnregisteredError:
-        print(f"⚠️  FCM token is invalid or unregistered: {token[:20]}...")
+        logger.info("FCM token is invalid or unregistered: %s...", token[:20])
         return False
     except Exception as e:
-        print(f"❌ Push notification error: {e}")
+        logger.warning("Push notification error: %s", e)
         return False
 
 
@@ -182,17 +181,18 @@ def send_push_to_multiple(tokens: List[str], title: str, body: str, data: dict =
         response = messaging.send_multicast(message)
         
         # Log results
-        print(f"✅ Multicast: {response.success_count}/{len(tokens)} sent successfully")
+        logger.debug("Multicast: %d/%d sent", response.success_count, len(tokens))
         if response.failure_count > 0:
-            print(f"⚠️  {response.failure_count} failed")
-            for idx, resp in enumerate(response.responses):
-                if not resp.success:
-                    print(f"   Token {idx}: {resp.exception}")
+            logger.warning(
+                "Multicast: %d of %d failed",
+                response.failure_count, len(tokens),
+                extra={"failures": {idx: str(resp.exception) for idx, resp in enumerate(response.responses) if not resp.success}},
+            )
         
         return response.success_count
         
     except Exception as e:
-        print(f"❌ Batch push error: {e}")
+        logger.warning("Batch push error: %s", e)
         return 0
 
 
@@ -212,11 +212,11 @@ def send_sms(to_number: str, message: str) -> bool:
         True if successful, False otherwise
     """
     if not twilio_client:
-        print("⚠️  Twilio not configured, skipping SMS")
+        logger.debug("Twilio not configured, skipping SMS")
         return False
     
     if not to_number:
-        print("⚠️  No phone number provided")
+        logger.debug("No phone number provided")
         return False
     
     try:
@@ -226,11 +226,11 @@ def send_sms(to_number: str, message: str) -> bool:
             to=to_number
         )
         
-        print(f"✅ SMS sent to {to_number}: {msg.sid}")
+        logger.debug("SMS sent to ...%s: %s", to_number[-4:], msg.sid)
         return True
         
     except Exception as e:
-        print(f"❌ SMS error to {to_number}: {e}")
+        logger.warning("SMS error to ...%s: %s", to_number[-4:], e)
         return False
 
 
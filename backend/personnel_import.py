@@ -0,0 +1,291 @@
+"""
+Bulk personnel import
+
+Loads a roster (CSV, or .xlsx when openpyxl is installed) into `users` with
+chunked INSERT ... ON CONFLICT (email) DO UPDATE statements instead of one
+query + one bcrypt hash per row. Existing accounts are matched by email in a
+single prefetch query, passwords are hashed in a thread pool (bcrypt releases
+the GIL), and every row gets a line in the report.
+
+Columns: name, email, password, role (student|personnel|guard), student_id,
+student_class, phone, parent_name, parent_phone, guardian_name,
+valid_until (YYYY-MM-DD), active. Blank optional cells keep the stored value
+on updates. Existing accounts keep their role and password unless
+--update-credentials is given, and accounts outside the import roles (admins)
+are never touched.
+
+Usage (from backend/):
+    python personnel_import.py roster.csv [--dry-run] [--update-credentials] [--chunk-size 500] [--workers 8]
+"""
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from email_validator import EmailNotValidError, validate_email
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from auth import hash_pwd
+from models import User
+
+# IST timezone (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+IMPORT_ROLES = {"student": "student", "personnel": "student", "guard": "guard"}
+IMPORTABLE_ROLES = set(IMPORT_ROLES.values())
+OPTIONAL_COLUMNS = ("student_id", "student_class", "phone", "parent_name", "parent_phone", "guardian_name")
+TRUE_VALUES = {"1", "true", "yes", "y", "active"}
+FALSE_VALUES = {"0", "false", "no", "n", "inactive"}
+DEFAULT_CHUNK_SIZE = 500
+
+
+def _default_valid_until(role: str) -> Optional[datetime]:
+    # Same academic-year default as accounts approved through registration requests
+    if role != "student":
+        return None
+    return datetime(datetime.now(IST).year + 1, 6, 30, tzinfo=IST)
+
+
+def _clean(value) -> Optional[str]:
+    if value is None:
+        return None
+    cleaned = str(value).strip()
+    return cleaned or None
+
+
+def read_csv_rows(stream) -> Iterator[Dict[str, Optional[str]]]:
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield {(key or "").strip().lower(): _clean(value) for key, value in row.items()}
+
+
+def read_xlsx_rows(path_or_file) -> Iterator[Dict[str, Optional[str]]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Excel import needs openpyxl - install it or upload the roster as CSV")
+
+    workbook = load_workbook(path_or_file, read_only=True, data_only=True)
+    rows = workbook.active.iter_rows(values_only=True)
+    header = [(_clean(cell) or "").lower() for cell in next(rows, [])]
+    for values in rows:
+        if not any(value is not None for value in values):
+            continue
+        yield {key: _clean(value) for key, value in zip(header, values) if key}
+
+
+def validate_row(row: Dict[str, Optional[str]]) -> (Optional[Dict], List[str]):
+    """Normalized user fields for one roster row, or the list of problems"""
+    errors = []
+    name = row.get("name")
+    if not name:
+        errors.append("name is required")
+
+    email = None
+    try:
+        email = validate_email(row.get("email") or "", check_deliverability=False).normalized.lower()
+    except EmailNotValidError as e:
+        errors.append(f"invalid email: {e}")
+
+    role = IMPORT_ROLES.get((row.get("role") or "student").lower())
+    if role is None:
+        errors.append(f"role must be one of {', '.join(sorted(IMPORT_ROLES))}")
+
+    password = row.get("password")
+    if password is not None and not 8 <= len(password) <= 128:
+        errors.append("password must be 8-128 characters")
+
+    valid_until = None
+    if row.get("valid_until"):
+        try:
+            valid_until = datetime.combine(date.fromisoformat(row["valid_until"][:10]),
+                                           datetime.min.time()).replace(tzinfo=IST)
+        except ValueError:
+            errors.append("valid_until must be YYYY-MM-DD")
+
+    active = None
+    if row.get("active"):
+        flag = row["active"].lower()
+        if flag in TRUE_VALUES:
+            active = True
+        elif flag in FALSE_VALUES:
+            active = False
+        else:
+            errors.append("active must be true/false")
+
+    if errors:
+        return None, errors
+
+    record = {"name": name, "email": email, "role": role, "password": password,
+              "valid_until": valid_until, "active": active}
+    for column in OPTIONAL_COLUMNS:
+        record[column] = row.get(column)
+    if record["student_id"]:
+        record["student_id"] = record["student_id"].upper()
+    return record, []
+
+
+def _prefetch_existing(db: Session, emails: List[str], student_ids: List[str]) -> Dict:
+    """One round trip for every account the roster could collide with"""
+    existing = {"by_email": {}, "by_student_id": {}}
+    if not emails and not student_ids:
+        return existing
+    rows = db.execute(
+        select(User.id, User.email, User.role, User.student_id, User.pwd_hash)
+        .where(or_(func.lower(User.email).in_(emails), User.student_id.in_(student_ids)))
+    ).all()
+    for row in rows:
+        if row.email:
+            existing["by_email"][row.email.lower()] = row
+        if row.student_id:
+            existing["by_student_id"][row.student_id] = row
+    return existing
+
+
+def _upsert_statement(db: Session, rows: List[Dict], update_credentials: bool = False):
+    dialect_insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    statement = dialect_insert(User).values(rows)
+    excluded = statement.excluded
+    # Blank optional cells come through as NULL and keep what is stored
+    updates = {
+        column: func.coalesce(getattr(excluded, column), getattr(User, column))
+        for column in OPTIONAL_COLUMNS + ("valid_until", "active")
+    }
+    updates["name"] = excluded.name
+    if update_credentials:
+        updates["role"] = excluded.role
+        updates["pwd_hash"] = excluded.pwd_hash
+    # Rows that conflict with an account created since the prefetch never touch admins
+    return statement.on_conflict_do_update(
+        index_elements=["email"], set_=updates, where=User.role.in_(IMPORTABLE_ROLES),
+    )
+
+
+def import_personnel(db: Session, rows: Iterable[Dict[str, Optional[str]]], dry_run: bool = False,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, workers: Optional[int] = None,
+                     update_credentials: bool = False) -> Dict:
+    """
+    Validate, hash and upsert roster rows; returns {"summary": {...}, "rows": [...]} with one entry per row.
+
+    Existing accounts keep their role and password hash unless `update_credentials` is set.
+    """
+    report: List[Dict] = []
+    pending: List[Dict] = []
+    seen_emails, seen_student_ids = {}, {}
+
+    for row_number, row in enumerate(rows, start=2):  # row 1 is the header
+        record, errors = validate_row(row)
+        entry = {"row": row_number, "email": (record or row).get("email"), "status": "error", "errors": errors}
+        report.append(entry)
+        if record is None:
+            continue
+        if record["email"] in seen_emails:
+            entry["errors"] = [f"duplicate email (row {seen_emails[record['email']]})"]
+            continue
+        if record["student_id"] and record["student_id"] in seen_student_ids:
+            entry["errors"] = [f"duplicate student_id (row {seen_student_ids[record['student_id']]})"]
+            continue
+        seen_emails[record["email"]] = row_number
+        if record["student_id"]:
+            seen_student_ids[record["student_id"]] = row_number
+        pending.append({"entry": entry, "record": record})
+
+    existing = _prefetch_existing(db, list(seen_emails), list(seen_student_ids))
+    to_hash = []
+    for item in pending:
+        record, entry = item["record"], item["entry"]
+        current = existing["by_email"].get(record["email"])
+        owner = existing["by_student_id"].get(record["student_id"]) if record["student_id"] else None
+        if current is not None and current.role not in IMPORTABLE_ROLES:
+            entry["errors"] = [f"existing {current.role} account cannot be changed by an import"]
+            continue
+        if owner is not None and (current is None or owner.id != current.id):
+            entry["errors"] = ["student_id is already assigned to another user"]
+            continue
+        if current is None and not record["password"]:
+            entry["errors"] = ["password is required for new accounts"]
+            continue
+        item["current"] = current
+        entry["status"] = "updated" if current is not None else "created"
+        if record["password"] and (current is None or update_credentials):
+            to_hash.append(item)
+
+    accepted = [item for item in pending if item["entry"]["status"] != "error"]
+    if not dry_run and accepted:
+        with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 2)) as pool:
+            for item, pwd_hash in zip(to_hash, pool.map(hash_pwd, [item["record"]["password"] for item in to_hash])):
+                item["pwd_hash"] = pwd_hash
+
+        for start in range(0, len(accepted), chunk_size):
+            chunk = accepted[start:start + chunk_size]
+            values = []
+            for item in chunk:
+                record, current = item["record"], item["current"]
+                values.append({
+                    "name": record["name"],
+                    # ON CONFLICT (email) is case-sensitive: target the stored spelling
+                    "email": current.email if current else record["email"],
+                    "role": record["role"],
+                    "pwd_hash": item.get("pwd_hash") or current.pwd_hash,
+                    "valid_until": record["valid_until"] or (None if current else _default_valid_until(record["role"])),
+                    "active": record["active"] if record["active"] is not None else (None if current else True),
+                    **{column: record[column] for column in OPTIONAL_COLUMNS},
+                })
+            try:
+                db.execute(_upsert_statement(db, values, update_credentials))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                for item in chunk:
+                    item["entry"]["status"] = "error"
+                    item["entry"]["errors"] = [f"chunk failed: {e.__class__.__name__}: {e}"]
+
+    summary = {"total": len(report), "dry_run": dry_run}
+    for status in ("created", "updated", "error"):
+        summary[status] = sum(1 for entry in report if entry["status"] == status)
+    return {"summary": summary, "rows": report}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import personnel from a CSV or .xlsx roster")
+    parser.add_argument("path")
+    parser.add_argument("--dry-run", action="store_true", help="validate and report without writing")
+    parser.add_argument("--update-credentials", action="store_true",
+                        help="also overwrite role and password of existing accounts")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="password hashing threads")
+    parser.add_argument("--report", help="write the per-row report as JSON to this file")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.path.lower().endswith(".xlsx"):
+            result = import_personnel(db, read_xlsx_rows(args.path), args.dry_run, args.chunk_size, args.workers,
+                                      args.update_credentials)
+        else:
+            with open(args.path, newline="", encoding="utf-8-sig") as f:
+                result = import_personnel(db, read_csv_rows(f), args.dry_run, args.chunk_size, args.workers,
+                                          args.update_credentials)
+    finally:
+        db.close()
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(result, f, indent=2)
+    for entry in result["rows"]:
+        if entry["status"] == "error":
+            print(f"❌ Row {entry['row']} ({entry['email'] or '-'}): {'; '.join(entry['errors'])}")
+    summary = result["summary"]
+    print(f"{'🔎 Dry run' if summary['dry_run'] else '✅ Import complete'}: created={summary['created']}, "
+          f"updated={summary['updated']}, errors={summary['error']}, total={summary['total']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Campus presence index
+
+One `presence` row per user holding the direction and time of their last
+successful scan, written in the same transaction as the scan_logs row
+(consume_pass, log_scan, /verify/batch and emergency exits). Headcounts and the
+on-campus list then read this small table instead of counting today's scans,
+which also stays right across midnight and after emergency exits.
+
+Usage (from backend/):
+    python presence.py rebuild    # replay scan_logs (and the archive) into presence
+"""
+import argparse
+import json
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import Presence, ScanLog, ScanLogArchive, User
+
+REBUILD_CHUNK_SIZE = 1000
+
+
+def presence_upsert(dialect_name: str, events: Iterable[Dict]):
+    """
+    INSERT ... ON CONFLICT (user_id) DO UPDATE for successful scans.
+
+    `events` are dicts with user_id, direction, last_scan_time and optionally
+    last_pass_id/emergency. Only the newest event per user is kept, and the
+    update is skipped when the stored scan is newer (late offline uploads).
+    Returns None when there is nothing to write.
+    """
+    latest: Dict[int, Dict] = {}
+    for event in events:
+        if not event.get("user_id"):
+            continue
+        current = latest.get(event["user_id"])
+        if current is None or event["last_scan_time"] >= current["last_scan_time"]:
+            latest[event["user_id"]] = {"last_pass_id": None, "emergency": False, **event}
+    if not latest:
+        return None
+
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = dialect_insert(Presence).values(list(latest.values()))
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={
+            "direction": excluded.direction,
+            "last_scan_time": excluded.last_scan_time,
+            "last_pass_id": excluded.last_pass_id,
+            "emergency": excluded.emergency,
+        },
+        where=Presence.last_scan_time.is_(None) | (Presence.last_scan_time <= excluded.last_scan_time),
+    )
+
+
+def scan_event(scan_log) -> Dict:
+    """Presence event for a successful ScanLog (or scan_logs insert dict)"""
+    get = scan_log.get if isinstance(scan_log, dict) else lambda key: getattr(scan_log, key)
+    return {
+        "user_id": get("student_id"),
+        "direction": get("pass_type") or "entry",
+        "last_scan_time": get("scan_time"),
+        "last_pass_id": get("pass_id") or None,
+        "emergency": bool(get("emergency")),
+    }
+
+
+def headcount(db: Session) -> int:
+    return db.scalar(select(func.count()).select_from(Presence).where(Presence.direction == "entry")) or 0
+
+
+def headcount_by_class(db: Session) -> List[Dict]:
+    rows = db.execute(
+        select(User.student_class, func.count(Presence.user_id).label("on_campus"))
+        .join(User, User.id == Presence.user_id)
+        .where(Presence.direction == "entry")
+        .group_by(User.student_class)
+        .order_by(func.count(Presence.user_id).desc())
+    ).all()
+    return [{"student_class": row.student_class or "Unassigned", "on_campus": row.on_campus} for row in rows]
+
+
+def on_campus(db: Session, student_class: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[Dict]:
+    query = (
+        select(User.id, User.student_id, User.name, User.student_class, Presence.last_scan_time)
+        .join(User, User.id == Presence.user_id)
+        .where(Presence.direction == "entry")
+    )
+    if student_class:
+        query = query.where(User.student_class == student_class)
+    rows = db.execute(query.order_by(Presence.last_scan_time.desc()).limit(limit).offset(offset)).all()
+    return [
+        {
+            "id": row.id,
+            "student_id": row.student_id,
+            "name": row.name,
+            "student_class": row.student_class,
+            "since": row.last_scan_time.isoformat() if row.last_scan_time else None,
+        }
+        for row in rows
+    ]
+
+
+def _latest_scans(db: Session, model) -> Iterable[Dict]:
+    ranked = (
+        select(
+            model.student_id, model.pass_type, model.scan_time, model.pass_id, model.emergency,
+            func.row_number().over(
+                partition_by=model.student_id, order_by=(model.scan_time.desc(), model.id.desc())
+            ).label("rank"),
+        )
+        .join(User, User.id == model.student_id)
+        .where(model.result == "success")
+        .subquery()
+    )
+    rows = db.execute(select(ranked).where(ranked.c.rank == 1)).all()
+    for row in rows:
+        yield scan_event(row._mapping)
+
+
+def rebuild_presence(db: Session) -> Dict:
+    """Recompute presence from scan_logs, then let archived scans fill users with no recent scan"""
+    dialect_name = db.bind.dialect.name
+    db.execute(delete(Presence))
+    written = 0
+    for model in (ScanLog, ScanLogArchive):
+        events = list(_latest_scans(db, model))
+        for start in range(0, len(events), REBUILD_CHUNK_SIZE):
+            statement = presence_upsert(dialect_name, events[start:start + REBUILD_CHUNK_SIZE])
+            if statement is not None:
+                db.execute(statement)
+        written += len(events)
+    db.commit()
+    return {"replayed": written, "on_campus": headcount(db)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the campus presence index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="replay scan_logs into the presence table")
+    commands.add_parser("headcount", help="print the current headcount per class")
+    args = parser.parse_args()
+
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            print(json.dumps(rebuild_presence(db), indent=2))
+        else:
+            print(json.dumps({"on_campus": headcount(db), "by_class": headcount_by_class(db)}, indent=2))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
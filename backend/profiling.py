@@ -0,0 +1,423 @@
+"""
+Opt-in wall-clock sampling profiler for slow requests
+
+With PROFILING_ENABLED a middleware picks requests to profile:
+- a share of /verify and face requests (PROFILING_GATE_SAMPLE_RATE) and of
+  everything else (PROFILING_SAMPLE_RATE);
+- any request carrying `X-Profile: <PROFILING_TOKEN>`;
+- the next N requests (optionally under one path) armed by an admin through
+  POST /api/admin/profiling.
+
+While a profiled request runs, a background thread records the Python stack of
+every busy thread every PROFILING_INTERVAL_MS. Sync endpoints and aiosqlite
+queries run outside the event loop thread, so sampling every thread is what
+makes bcrypt, DB, PIL and OpenCV time show up. Samples are grouped into
+categories (password_hash, database, image_decode, face_detection, ...) and
+kept as collapsed stacks that speedscope or flamegraph.pl can load.
+
+Only one request per worker is profiled at a time. Work of requests running
+next to it can still land in its samples; `concurrent_requests` on each
+profile says when that was possible. The N slowest profiles are kept per group
+("gate" for the scan and face paths, "other" for the rest) in this worker's
+memory, so a slow CSV export never pushes out a slow scan.
+"""
+import heapq
+import itertools
+import linecache
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from logging_setup import request_id_var
+from settings import settings
+
+# IST timezone (UTC+5:30)
+IST = timezone(timedelta(hours=5, minutes=30))
+
+enabled = settings.PROFILING_ENABLED
+
+GATE_PATHS = frozenset({"/verify", "/verify/batch", "/api/register_face", "/api/verify_face"})
+# Reading or toggling profiles should not evict the profiles being investigated
+_EXCLUDED_PREFIXES = ("/api/admin/profil", "/metrics")
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_MAX_STACK_DEPTH = 96
+
+# A thread with no backend code on its stack that is blocked in one of these
+# (or on a line waiting for its next work item) is an idle event loop or pool
+# worker rather than work for the request
+_IDLE_LEAVES = frozenset({
+    ("selectors", "select"),
+    ("threading", "wait"),
+    ("queue", "get"),
+    ("logging.handlers", "dequeue"),
+})
+_IDLE_LINE_HINTS = (".get(", ".wait(", ".select(")
+
+# Checked from the innermost frame outwards; the first frame that matches decides the category
+_FUNCTION_CATEGORIES = {
+    "auth:verify_pwd": "password_hash",
+    "auth:hash_pwd": "password_hash",
+    "face_auth:validate_image": "image_decode",
+    "face_auth:_load_normalized_image": "image_decode",
+    "face_auth:_resize_for_face_processing": "image_decode",
+    "face_auth:_get_haar_classifier": "face_detection",
+    "face_auth:_detect_largest_face": "face_detection",
+    "face_auth:_rotated_gray_candidates": "face_detection",
+    "face_auth:_crop_face": "face_detection",
+    "face_auth:extract_face_encoding": "face_encoding",
+    "face_auth:_extract_opencv_encoding": "face_encoding",
+    "face_auth:_extract_face_recognition_encoding": "face_encoding",
+    "face_auth:compare_faces": "face_compare",
+    "face_auth:_compare_opencv_strict_encodings": "face_compare",
+    "face_auth:_compare_face_recognition_encodings": "face_compare",
+}
+_MODULE_CATEGORIES = (
+    (("passlib", "bcrypt"), "password_hash"),
+    (("jose", "jwt"), "token_auth"),
+    (("PIL",), "image_decode"),
+    (("cv2", "face_recognition", "dlib"), "face_detection"),
+    (("twilio", "firebase_admin", "google", "notifications_v2"), "notifications"),
+    (("sqlalchemy", "sqlite3", "aiosqlite", "psycopg2", "psycopg", "asyncpg"), "database"),
+)
+
+Frame = Tuple[str, str, bool]  # (module, function, is backend code)
+
+
+def _frame_key(frame) -> Frame:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    filename = code.co_filename
+    own = filename.startswith(_BACKEND_DIR) and "site-packages" not in filename
+    return module, code.co_name, own
+
+
+def _is_waiting(frame, key: Frame) -> bool:
+    if key[:2] in _IDLE_LEAVES:
+        return True
+    # Pool loops (aiosqlite's connection thread, executor workers) block in C calls, leaving their own frame as the leaf
+    line = linecache.getline(frame.f_code.co_filename, frame.f_lineno)
+    return any(hint in line for hint in _IDLE_LINE_HINTS)
+
+
+def _walk(frame) -> Optional[Tuple[Frame, ...]]:
+    """Stack root-first, or None when the thread is idle"""
+    leaf_frame = frame
+    frames = []
+    while frame is not None and len(frames) < _MAX_STACK_DEPTH:
+        frames.append(_frame_key(frame))
+        frame = frame.f_back
+    if not frames:
+        return None
+    if not any(own for _, _, own in frames) and _is_waiting(leaf_frame, frames[0]):
+        return None
+    frames.reverse()
+    return tuple(frames)
+
+
+def categorize(stack: Tuple[Frame, ...]) -> str:
+    for module, function, own in reversed(stack):
+        category = _FUNCTION_CATEGORIES.get(f"{module}:{function}")
+        if category:
+            return category
+        root = module.split(".", 1)[0]
+        for prefixes, category in _MODULE_CATEGORIES:
+            if root in prefixes:
+                return category
+    return "app" if any(own for _, _, own in stack) else "framework"
+
+
+class _Sampler(threading.Thread):
+    def __init__(self, profiler: "Profiler", interval: float, max_seconds: float):
+        super().__init__(name="smartgate-profiler", daemon=True)
+        self.profiler = profiler
+        self.interval = interval
+        self.max_ticks = max(1, int(max_seconds / interval))
+        self.stop_event = threading.Event()
+        self.stacks: Counter = Counter()
+        self.ticks = 0
+        self.max_concurrency = 0
+
+    def run(self):
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while self.ticks < self.max_ticks and not self.stop_event.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _walk(frame)
+                if stack is None:
+                    continue
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self.stacks[(names.get(ident, str(ident)), stack)] += 1
+            self.ticks += 1
+            self.max_concurrency = max(self.max_concurrency, self.profiler.in_flight)
+
+
+class Profile:
+    def __init__(self, *, method: str, path: str, route: str, status: int, trigger: str,
+                 group: str, started_at: datetime, duration: float, sampler: _Sampler,
+                 request_id: Optional[str], content_length: Optional[int]):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.route = route
+        self.status = status
+        self.trigger = trigger
+        self.group = group
+        self.started_at = started_at
+        self.duration = duration
+        self.request_id = request_id
+        self.content_length = content_length
+        self.samples = sampler.ticks
+        self.interval_ms = round(sampler.interval * 1000, 3)
+        self.concurrent_requests = max(sampler.max_concurrency - 1, 0)
+        self.stacks = sampler.stacks
+        # Wall time one sample stands for; ticks drift from the nominal interval under load
+        self._ms_per_sample = self.duration * 1000 / self.samples if self.samples else 0.0
+
+    def _ms(self, count: int) -> float:
+        return round(count * self._ms_per_sample, 2)
+
+    def categories(self) -> Dict[str, float]:
+        totals: Counter = Counter()
+        for (_, stack), count in self.stacks.items():
+            totals[categorize(stack)] += count
+        return {category: self._ms(count) for category, count in totals.most_common()}
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "group": self.group,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 2),
+            "samples": self.samples,
+            "concurrent_requests": self.concurrent_requests,
+            "request_id": self.request_id,
+            "categories": self.categories(),
+        }
+
+    def detail(self, limit: int = 30) -> Dict:
+        own: Counter = Counter()
+        total: Counter = Counter()
+        threads: Counter = Counter()
+        for (thread, stack), count in self.stacks.items():
+            threads[thread] += count
+            own[stack[-1][:2]] += count
+            for frame in set(frame[:2] for frame in stack):
+                total[frame] += count
+        return {
+            **self.summary(),
+            "interval_ms": self.interval_ms,
+            "content_length": self.content_length,
+            "threads": {thread: self._ms(count) for thread, count in threads.most_common()},
+            "top_functions": [
+                {"function": f"{module}:{function}", "self_ms": self._ms(count),
+                 "total_ms": self._ms(total[(module, function)])}
+                for (module, function), count in own.most_common(limit)
+            ],
+        }
+
+    def collapsed(self) -> str:
+        """Collapsed stacks ("thread;module:function;... samples"), one per line"""
+        lines = []
+        for (thread, stack), count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+            frames = ";".join(f"{module}:{function}" for module, function, _ in stack)
+            lines.append(f"{thread};{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+
+class ProfileStore:
+    """The `keep` slowest profiles per group"""
+
+    def __init__(self, keep: int):
+        self.keep = keep
+        self._heaps: Dict[str, List[Tuple[float, int, Profile]]] = {}
+        self._by_id: Dict[str, Profile] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, profile: Profile) -> bool:
+        """Keep `profile` if it is among the slowest of its group; returns whether it was kept"""
+        with self._lock:
+            heap = self._heaps.setdefault(profile.group, [])
+            entry = (profile.duration, next(self._seq), profile)
+            if len(heap) < self.keep:
+                heapq.heappush(heap, entry)
+            elif heap and profile.duration > heap[0][0]:
+                evicted = heapq.heapreplace(heap, entry)[2]
+                self._by_id.pop(evicted.id, None)
+            else:
+                return False
+            self._by_id[profile.id] = profile
+            return True
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._by_id.get(profile_id)
+
+    def list(self, group: Optional[str] = None) -> List[Profile]:
+        with self._lock:
+            profiles = [entry[2] for name, heap in self._heaps.items() if group in (None, name) for entry in heap]
+        return sorted(profiles, key=lambda profile: -profile.duration)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._by_id)
+            self._heaps.clear()
+            self._by_id.clear()
+            return count
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {name: len(heap) for name, heap in self._heaps.items()}
+
+
+class Profiler:
+    """Sampling decisions and runtime toggles for this worker"""
+
+    def __init__(self):
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.gate_sample_rate = settings.PROFILING_GATE_SAMPLE_RATE
+        self.capture_next = 0
+        self.capture_path: Optional[str] = None
+        self.store = ProfileStore(settings.PROFILING_KEEP)
+        self.in_flight = 0
+        self._busy = False
+        self._stats = {"profiled": 0, "kept": 0, "skipped_busy": 0}
+
+    def configure(self, sample_rate: Optional[float] = None, gate_sample_rate: Optional[float] = None,
+                  capture_next: Optional[int] = None, capture_path: Optional[str] = None) -> Dict:
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if gate_sample_rate is not None:
+            self.gate_sample_rate = gate_sample_rate
+        if capture_next is not None:
+            self.capture_next = capture_next
+            self.capture_path = capture_path or None
+        return self.state()
+
+    def state(self) -> Dict:
+        return {
+            "enabled": enabled,
+            "sample_rate": self.sample_rate,
+            "gate_sample_rate": self.gate_sample_rate,
+            "capture_next": self.capture_next,
+            "capture_path": self.capture_path,
+            "header_trigger": bool(settings.PROFILING_TOKEN),
+            "interval_ms": settings.PROFILING_INTERVAL_MS,
+            "keep": self.store.keep,
+            "stored": self.store.counts(),
+            **self._stats,
+        }
+
+    def _trigger(self, path: str, headers) -> Optional[str]:
+        if path.startswith(_EXCLUDED_PREFIXES):
+            return None
+        token = settings.PROFILING_TOKEN
+        if token:
+            requested = dict(headers).get(b"x-profile")
+            if requested and secrets.compare_digest(requested, token.encode("utf-8")):
+                return "header"
+        if self.capture_next > 0 and (not self.capture_path or path.startswith(self.capture_path)):
+            return "armed"
+        rate = self.gate_sample_rate if path in GATE_PATHS else self.sample_rate
+        if rate > 0 and random.random() < rate:
+            return "sampled"
+        return None
+
+    def begin(self, scope) -> Optional[str]:
+        """Trigger name when this request should be profiled, claiming the worker's single slot"""
+        trigger = self._trigger(scope["path"], scope.get("headers") or [])
+        if trigger is None:
+            return None
+        if self._busy:
+            self._stats["skipped_busy"] += 1
+            return None
+        self._busy = True
+        if trigger == "armed":
+            self.capture_next -= 1
+        return trigger
+
+    def finish(self, profile: Profile):
+        self._busy = False
+        self._stats["profiled"] += 1
+        if self.store.add(profile):
+            self._stats["kept"] += 1
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware: samples stacks while a selected request runs"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profiler.in_flight += 1
+        try:
+            trigger = profiler.begin(scope)
+            if trigger is None:
+                await self.app(scope, receive, send)
+                return
+            await self._profile(scope, receive, send, trigger)
+        finally:
+            profiler.in_flight -= 1
+
+    async def _profile(self, scope, receive, send, trigger: str):
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        sampler = _Sampler(profiler, settings.PROFILING_INTERVAL_MS / 1000, settings.PROFILING_MAX_SECONDS)
+        started_at = datetime.now(IST)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            sampler.stop_event.set()
+            sampler.join(timeout=1)
+            content_length = dict(scope.get("headers") or []).get(b"content-length")
+            profiler.finish(Profile(
+                method=scope["method"],
+                path=scope["path"],
+                route=getattr(scope.get("route"), "path", None) or "unmatched",
+                status=status[0],
+                trigger=trigger,
+                group="gate" if scope["path"] in GATE_PATHS else "other",
+                started_at=started_at,
+                duration=duration,
+                sampler=sampler,
+                request_id=request_id_var.get(),
+                content_length=int(content_length) if content_length and content_length.isdigit() else None,
+            ))
+
+
+def install(app):
+    """Attach the middleware when PROFILING_ENABLED"""
+    if enabled:
+        app.add_middleware(ProfilingMiddleware)
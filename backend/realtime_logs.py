@@ -7,9 +7,20 @@ from fastapi import WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-from models import ScanLog, User, PassRequest
+from typing import Dict, Iterator, List, Optional, Tuple
+from models import ScanLog, ScanLogArchive, User, PassRequest
+import activity
+import log_archive
+import metrics
+import presence
+from user_search import user_search
+import csv
+import io
 import json
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
 
 class ConnectionManager:
     """Manage WebSocket connections for real-time updates"""
@@ -20,21 +31,25 @@ class ConnectionManager:
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
         self.active_connections.append(websocket)
-        print(f"✅ Admin connected to real-time logs. Total connections: {len(self.active_connections)}")
+        metrics.ws_connected(1)
+        logger.info("Admin connected to real-time logs (%d connection(s))", len(self.active_connections))
     
     def disconnect(self, websocket: WebSocket):
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
-            print(f"❌ Admin disconnected. Remaining connections: {len(self.active_connections)}")
+            metrics.ws_connected(-1)
+            logger.info("Admin disconnected from real-time logs (%d remaining)", len(self.active_connections))
     
-    async def broadcast(self, message: dict):
-        """Broadcast message to all connected admins"""
+    async def broadcast(self, message: dict, queued_at: Optional[float] = None):
+        """Broadcast message to all connected admins; `queued_at` (perf_counter) feeds the lag metric"""
         disconnected = []
         for connection in self.active_connections:
             try:
                 await connection.send_json(message)
+                metrics.ws_delivered(queued_at)
             except Exception as e:
-                print(f"Error broadcasting to connection: {e}")
+                logger.debug("Error broadcasting to connection: %s", e)
+                metrics.ws_send_failed()
                 disconnected.append(connection)
         
         # Remove disconnected clients
@@ -45,7 +60,7 @@ class ConnectionManager:
         try:
             await websocket.send_json(message)
         except Exception as e:
-            print(f"Error sending personal message: {e}")
+            logger.debug("Error sending personal message: %s", e)
 
 # Global connection manager
 manager = ConnectionManager()
@@ -141,7 +156,8 @@ def get_log_statistics(db: Session, days: int = 7) -> Dict:
         )
     ).count()
     
-    students_in_campus = max(0, today_entries - today_exits)
+    # Maintained on every successful scan, so it holds across midnight and emergency exits
+    students_in_campus = presence.headcount(db)
     
     return {
         "total_scans": total_scans,
@@ -247,78 +263,81 @@ def get_daily_stats(db: Session, days: int = 7) -> Dict:
     }
 
 def get_top_active_students(db: Session, days: int = 7, limit: int = 10) -> List[Dict]:
-    """Get most active students (by scan count)"""
-    
-    start_date = datetime.now() - timedelta(days=days)
-    
-    # Query to count scans per student
-    student_counts = db.query(
-        User.student_id,
-        User.name,
-        func.count(ScanLog.id).label('scan_count')
-    ).join(
-        ScanLog, ScanLog.student_id == User.id
-    ).filter(
-        ScanLog.scan_time >= start_date
-    ).group_by(
-        User.id, User.student_id, User.name
-    ).order_by(
-        func.count(ScanLog.id).desc()
-    ).limit(limit).all()
-    
-    return [
-        {
-            "student_id": sc.student_id,
-            "name": sc.name,
-            "scan_count": sc.scan_count
-        }
-        for sc in student_counts
-    ]
+    """Get most active students (by scan count) from the per-day activity counters"""
+    return activity.top_students(db, days=days, limit=limit)
 
-async def broadcast_new_scan(scan_data: Dict):
+async def broadcast_new_scan(scan_data: Dict, queued_at: Optional[float] = None):
     """Broadcast new scan to all connected admins"""
     await manager.broadcast({
         "type": "new_scan",
         "data": scan_data
-    })
-
-def search_logs(db: Session, 
-                student_id: Optional[str] = None,
-                date_from: Optional[datetime] = None,
-                date_to: Optional[datetime] = None,
-                scan_type: Optional[str] = None,
-                result: Optional[str] = None,
-                limit: int = 100) -> List[Dict]:
-    """Search logs with filters"""
-    
-    query = db.query(ScanLog).join(User, ScanLog.student_id == User.id)
-
-    if student_id:
-        search_term = f"%{student_id}%"
-        query = query.filter(
-            or_(
-                User.student_id.ilike(search_term),
-                User.name.ilike(search_term),
-            )
-        )
+    }, queued_at=queued_at)
+
+def _apply_log_filters(query,
+                       student_clause=None,
+                       date_from: Optional[datetime] = None,
+                       date_to: Optional[datetime] = None,
+                       scan_type: Optional[str] = None,
+                       result: Optional[str] = None,
+                       model=ScanLog):
+    """Shared search/export filters for scan_logs or scan_logs_archive; `query` must already join User"""
+    if student_clause is not None:
+        query = query.filter(student_clause)
 
     if date_from:
-        query = query.filter(ScanLog.scan_time >= date_from)
+        query = query.filter(model.scan_time >= date_from)
 
     if date_to:
-        query = query.filter(ScanLog.scan_time <= date_to)
+        query = query.filter(model.scan_time <= date_to)
 
     if scan_type:
-        query = query.filter(ScanLog.pass_type == scan_type)
+        query = query.filter(model.pass_type == scan_type)
 
     if result:
-        query = query.filter(ScanLog.result == result)
+        query = query.filter(model.result == result)
 
-    logs = query.order_by(ScanLog.scan_time.desc()).limit(limit).all()
+    return query
+
+def _log_sources(db: Session, date_from: Optional[datetime], date_to: Optional[datetime]) -> List:
+    """scan_logs, plus scan_logs_archive when the range reaches archived segments (newest first)"""
+    if log_archive.range_needs_archive(db, date_from, date_to):
+        return [ScanLog, ScanLogArchive]
+    return [ScanLog]
+
+def _student_clause(db: Session, student_id: Optional[str]):
+    # Name / ID search goes through the user search index instead of a leading-wildcard ILIKE
+    if not student_id:
+        return None
+    return user_search.student_clause(db, student_id)
+
+def search_logs(db: Session, 
+                student_id: Optional[str] = None,
+                date_from: Optional[datetime] = None,
+                date_to: Optional[datetime] = None,
+                scan_type: Optional[str] = None,
+                result: Optional[str] = None,
+                limit: int = 100,
+                before: Optional[Tuple[datetime, int]] = None) -> List[Dict]:
+    """Search logs with filters, newest first; `before` is a decoded cursor for the next page"""
+    
+    student_clause = _student_clause(db, student_id)
+    # Archived rows are all older than live ones, so the archive only fills what the hot table could not
+    logs = []
+    for model in _log_sources(db, date_from, date_to):
+        if len(logs) >= limit:
+            break
+        query = db.query(model, User).join(User, model.student_id == User.id)
+        query = _apply_log_filters(query, student_clause, date_from, date_to, scan_type, result, model=model)
+        if before is not None:
+            before_time, before_id = before
+            query = query.filter(or_(
+                model.scan_time < before_time,
+                and_(model.scan_time == before_time, model.id < before_id),
+            ))
+        logs += query.order_by(model.scan_time.desc(), model.id.desc()).limit(limit - len(logs)).all()
 
     result = []
-    for log in logs:
-        student = db.query(User).filter(User.id == log.student_id).first()
+    for log, student in logs:
         is_emergency = False
         try:
             is_emergency = getattr(log, 'emergency', False) or False
@@ -340,3 +359,62 @@ def search_logs(db: Session,
         })
 
     return result
+
+EXPORT_COLUMNS = ["id", "timestamp", "student_id", "student_name", "scan_type", "result", "gate", "emergency", "details"]
+EXPORT_BATCH_SIZE = 1000
+
+def iter_log_export(db: Session,
+                    export_format: str = "csv",
+                    compress: bool = False,
+                    batch_size: int = EXPORT_BATCH_SIZE,
+                    **filters) -> Iterator[bytes]:
+    """
+    Stream matching logs as CSV or NDJSON chunks, oldest first.
+
+    Only plain columns are selected (User joined in the same statement) and
+    each table is read through a server-side cursor in `batch_size` partitions,
+    so memory stays flat however large the range is. With `compress`, the
+    chunks form one gzip stream.
+    """
+    filters["student_clause"] = _student_clause(db, filters.pop("student_id", None))
+
+    def rows():
+        # Oldest first: archived segments (when the range reaches them) before live rows
+        for model in reversed(_log_sources(db, filters.get("date_from"), filters.get("date_to"))):
+            query = db.query(
+                model.id, model.scan_time, model.pass_type, model.result, model.emergency,
+                model.details, User.student_id, User.name,
+            ).join(User, model.student_id == User.id)
+            query = _apply_log_filters(query, model=model, **filters).order_by(model.scan_time, model.id)
+            yield from query.execution_options(stream_results=True, yield_per=batch_size)
+
+    gzip_stream = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_COLUMNS)
+
+    def drain() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return gzip_stream.compress(data) if gzip_stream else data
+
+    for count, row in enumerate(rows(), start=1):
+        record = [
+            row.id, row.scan_time.isoformat() if row.scan_time else None, row.student_id, row.name,
+            row.pass_type, row.result, "Emergency Exit" if row.emergency else "Main Gate",
+            bool(row.emergency), row.details,
+        ]
+        if writer:
+            writer.writerow(record)
+        else:
+            buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, record))) + "\n")
+        if count % batch_size == 0:
+            yield drain()
+
+    tail = drain()
+    if gzip_stream:
+        tail += gzip_stream.flush()
+    if tail:
+        yield tail
@@ -1,7 +1,26 @@
+"""
+Startup schema upkeep for databases created before alembic was in use.
+
+At import the app only adds missing columns and indexes. Rewriting legacy TEXT
+coordinate columns as numbers drops and renames columns, so it runs once per
+deploy from bootstrap.py, through alembic (revision d7f4b2c8a915) or by hand.
+Until then CompatFloat reads either layout through the ORM and numeric_sql()
+does the same inside SQL expressions.
+
+Usage (from backend/):
+    python runtime_schema.py convert-numeric
+"""
 from __future__ import annotations
 
-from sqlalchemy import inspect, text
+import argparse
+import logging
+
+from sqlalchemy import Float, String, cast, func, inspect, text
+from sqlalchemy.types import TypeDecorator
 
+import geohash
+
+logger = logging.getLogger(__name__)
 
 ADDITIVE_COLUMNS = {
     "users": {
@@ -23,18 +42,144 @@ ADDITIVE_COLUMNS = {
         "pass_type": "VARCHAR(10) DEFAULT 'entry'",
         "approved_time": "TIMESTAMP",
         "used_by": "INTEGER",
-        "request_latitude": "TEXT",
-        "request_longitude": "TEXT",
+        "request_latitude": "DOUBLE PRECISION",
+        "request_longitude": "DOUBLE PRECISION",
         "location_verified": "BOOLEAN DEFAULT FALSE",
-        "location_distance_km": "TEXT",
+        "location_distance_km": "DOUBLE PRECISION",
+        "location_zone": "VARCHAR(100)",
+        "location_cell": "VARCHAR(12)",
+        "daily_key": "VARCHAR(40)",
     },
     "scan_logs": {
         "pass_type": "VARCHAR(10) DEFAULT 'entry'",
         "emergency": "BOOLEAN DEFAULT FALSE",
         "details": "TEXT",
+        "client_event_id": "VARCHAR(64)",
     },
 }
 
+# Columns that older databases created as TEXT (values written with str(float))
+NUMERIC_COLUMNS = {
+    "passes": ("request_latitude", "request_longitude", "location_distance_km"),
+}
+
+# index name -> (table, column(s), unique)
+RUNTIME_INDEXES = {
+    "ix_passes_location_cell": ("passes", "location_cell", False),
+    "ix_passes_daily_key": ("passes", "daily_key", True),
+    "ix_scan_logs_scan_time": ("scan_logs", "scan_time", False),
+    "ix_scan_logs_student_time": ("scan_logs", "student_id, scan_time", False),
+    "ix_scan_logs_scanner_event": ("scan_logs", "scanner_id, client_event_id", True),
+}
+
+CONVERSION_CHUNK_SIZE = 5000
+
+
+class CompatFloat(TypeDecorator):
+    """
+    Float column that still reads legacy text values.
+
+    Until convert_numeric_columns has run (or where the database cannot drop
+    columns), rows may hold strings such as "31.7768" or "". They are parsed on
+    read instead of leaking str values into the app; unparseable values read as None.
+    """
+
+    impl = Float
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        return _to_float(value)
+
+
+def numeric_sql(column):
+    """
+    SQL float expression for a CompatFloat column, for aggregates and comparisons.
+
+    Goes through text so it also works while the column is still legacy TEXT;
+    empty strings become NULL instead of failing the cast.
+    """
+    return cast(func.nullif(func.trim(cast(column, String)), ""), Float)
+
+
+def _to_float(value):
+    if value is None or isinstance(value, float):
+        return value
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+def convert_numeric_columns(connection) -> list:
+    """
+    Rewrite legacy TEXT coordinate columns as DOUBLE PRECISION in place.
+
+    Adds a numeric shadow column, copies parsed values in id-ordered chunks (so
+    junk strings become NULL instead of failing a CAST), then drops the text
+    column and renames the shadow over it. Returns the converted column names.
+    """
+    inspector = inspect(connection)
+    table_names = set(inspector.get_table_names())
+    converted = []
+
+    for table_name, column_names in NUMERIC_COLUMNS.items():
+        if table_name not in table_names:
+            continue
+        columns = {column["name"]: column["type"] for column in inspector.get_columns(table_name)}
+        for column_name in column_names:
+            if not isinstance(columns.get(column_name), String):
+                continue
+
+            shadow = f"{column_name}__num"
+            if shadow not in columns:
+                connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {shadow} DOUBLE PRECISION"))
+
+            last_id = 0
+            while True:
+                rows = connection.execute(
+                    text(
+                        f"SELECT id, {column_name} FROM {table_name} "
+                        f"WHERE id > :last_id AND {column_name} IS NOT NULL ORDER BY id LIMIT :limit"
+                    ),
+                    {"last_id": last_id, "limit": CONVERSION_CHUNK_SIZE},
+                ).all()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                connection.execute(
+                    text(f"UPDATE {table_name} SET {shadow} = :value WHERE id = :id"),
+                    [{"id": row[0], "value": _to_float(row[1])} for row in rows],
+                )
+
+            connection.execute(text(f"ALTER TABLE {table_name} DROP COLUMN {column_name}"))
+            connection.execute(text(f"ALTER TABLE {table_name} RENAME COLUMN {shadow} TO {column_name}"))
+            converted.append(f"{table_name}.{column_name}")
+
+    return converted
+
+
+def backfill_location_cells(connection) -> int:
+    """Fill passes.location_cell for rows stored before the column existed"""
+    filled = 0
+    while True:
+        rows = connection.execute(
+            text(
+                "SELECT id, request_latitude, request_longitude FROM passes "
+                "WHERE location_cell IS NULL AND request_latitude IS NOT NULL "
+                "AND request_longitude IS NOT NULL ORDER BY id LIMIT :limit"
+            ),
+            {"limit": CONVERSION_CHUNK_SIZE},
+        ).all()
+        updates = []
+        for row in rows:
+            cell = geohash.safe_encode(_to_float(row[1]), _to_float(row[2]))
+            # Unusable coordinates get an empty cell so they are not picked up again
+            updates.append({"id": row[0], "cell": cell or ""})
+        if not updates:
+            return filled
+        connection.execute(text("UPDATE passes SET location_cell = :cell WHERE id = :id"), updates)
+        filled += len(updates)
+
 
 def ensure_runtime_schema(engine) -> None:
     inspector = inspect(engine)
@@ -52,11 +197,37 @@ def ensure_runtime_schema(engine) -> None:
                     text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition}")
                 )
 
-    if not statements:
+    if statements:
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(statement)
+        logger.info("Runtime schema updated: added %d missing column(s)", len(statements))
+
+    if "passes" not in table_names:
         return
 
     with engine.begin() as connection:
-        for statement in statements:
-            connection.execute(statement)
+        for index_name, (table_name, column_name, unique) in RUNTIME_INDEXES.items():
+            connection.execute(text(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {index_name} ON {table_name} ({column_name})"
+            ))
+        filled = backfill_location_cells(connection)
+    if filled:
+        logger.info("Runtime schema updated: indexed %d pass location(s) by grid cell", filled)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="One-off schema conversions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("convert-numeric", help="rewrite legacy TEXT pass coordinates as DOUBLE PRECISION")
+    parser.parse_args()
+
+    from database import engine
+
+    with engine.begin() as connection:
+        converted = convert_numeric_columns(connection)
+    print(f"Converted: {', '.join(converted)}" if converted else "Nothing to convert")
+
 
-    print(f"✅ Runtime schema updated: added {len(statements)} missing column(s)")
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import Literal, Optional, List
 from datetime import datetime
 
 class Token(BaseModel):
@@ -125,12 +125,21 @@ class PassOut(BaseModel):
     student_name: Optional[str] = None
     student_code: Optional[str] = None  # like U22CN361
     student_class: Optional[str] = None
+    location_zone: Optional[str] = None
     class Config:
         from_attributes = True
 
 class VerifyIn(BaseModel):
     token: str
 
+class OfflineScanEvent(BaseModel):
+    token: str = Field(min_length=1, max_length=200)
+    scanned_at: datetime
+    client_event_id: Optional[str] = Field(default=None, max_length=64)
+
+class OfflineScanBatch(BaseModel):
+    events: List[OfflineScanEvent] = Field(max_length=500)
+
 class ScanLogOut(BaseModel):
     id: int
     pass_id: Optional[int] = None
@@ -162,3 +171,42 @@ class FaceVerificationResponse(BaseModel):
     confidence_percent: int
     distance: float
     message: str
+
+class GeofenceZone(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    kind: Literal["circle", "polygon"] = "circle"
+    category: str = Field(default="annex", max_length=30)  # campus | annex | hostel | gate
+    latitude: Optional[float] = Field(default=None, ge=-90, le=90)
+    longitude: Optional[float] = Field(default=None, ge=-180, le=180)
+    radius_km: Optional[float] = Field(default=None, gt=0, le=50)
+    polygon: Optional[List[List[float]]] = None  # [[lat, lon], ...]
+    enabled: bool = True
+
+    @model_validator(mode="after")
+    def check_shape(self):
+        if self.kind == "circle":
+            if self.latitude is None or self.longitude is None or self.radius_km is None:
+                raise ValueError("circle zones need latitude, longitude and radius_km")
+        elif not self.polygon or len(self.polygon) < 3 or any(len(point) != 2 for point in self.polygon):
+            raise ValueError("polygon zones need at least 3 [lat, lon] points")
+        return self
+
+class LocationBatchIn(BaseModel):
+    latitudes: List[float] = Field(max_length=100_000)
+    longitudes: List[float] = Field(max_length=100_000)
+    ids: Optional[List[str]] = None
+    buffer_meters: int = Field(default=50, ge=0, le=1000)
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        if len(self.latitudes) != len(self.longitudes):
+            raise ValueError("latitudes and longitudes must have the same length")
+        if self.ids is not None and len(self.ids) != len(self.latitudes):
+            raise ValueError("ids must match the number of points")
+        return self
+
+class ProfilingToggle(BaseModel):
+    sample_rate: Optional[float] = Field(default=None, ge=0, le=1)
+    gate_sample_rate: Optional[float] = Field(default=None, ge=0, le=1)
+    capture_next: Optional[int] = Field(default=None, ge=0, le=100)  # profile the next N requests
+    capture_path: Optional[str] = Field(default=None, max_length=200)  # path prefix for capture_next
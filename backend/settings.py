@@ -17,12 +17,36 @@ class Settings(BaseSettings):
         validation_alias=AliasChoices("DB_URL", "DATABASE_URL", "POSTGRES_URL"),
     )
     QR_TTL_MINUTES: int = 15
+    QR_TOKEN_FORMAT: str = "compact"  # compact | legacy
+    QR_KEY_ID: int = 1  # key id under which SECRET_KEY signs compact tokens
+    QR_RETIRED_KEYS: str = ""  # "id:secret,id:secret" still accepted after rotating SECRET_KEY
+    SCAN_FAILURE_WINDOW_SECONDS: int = 60
+    DAILY_PASS_CACHE_SECONDS: int = 60  # how long a worker serves today's daily pass from memory
+    SCAN_LOG_RETENTION_DAYS: int = 365  # older scan_logs rows move to scan_logs_archive; 0 disables
+    SCAN_LOG_ARCHIVE_INTERVAL_HOURS: int = 24
+    SCAN_LOG_ARCHIVE_BATCH_SIZE: int = 5000
+    ANALYTICS_CACHE_SECONDS: int = 30  # admin analytics results kept per worker; 0 disables
+    METRICS_ENABLED: bool = False  # Prometheus /metrics and hot-path timers
+    METRICS_TOKEN: str = ""  # bearer token required by /metrics when set
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""  # per-module overrides, e.g. "face_auth=DEBUG,notifications_v2=WARNING"
+    LOG_FORMAT: str = "json"  # json | text
+    LOG_DEBUG_SAMPLE_RATE: float = 0.1  # share of requests whose DEBUG events are kept
+    PROFILING_ENABLED: bool = False  # installs the sampling profiler middleware
+    PROFILING_SAMPLE_RATE: float = 0.0  # share of ordinary requests profiled
+    PROFILING_GATE_SAMPLE_RATE: float = 0.01  # share of /verify and face requests profiled
+    PROFILING_TOKEN: str = ""  # an "X-Profile: <token>" request header forces a profile when set
+    PROFILING_INTERVAL_MS: int = 5
+    PROFILING_KEEP: int = 20  # slowest profiles kept per group (gate / other)
+    PROFILING_MAX_SECONDS: int = 30  # sampling stops after this long; the request carries on
+    OFFLINE_SCAN_MAX_AGE_MINUTES: int = 12 * 60  # oldest offline guard scan /verify/batch accepts
     SELF_REGISTRATION_ENABLED: bool = False
     ACCOUNT_REQUESTS_ENABLED: bool = True
     FACE_AUTH_ENABLED: bool = True
     FACE_AUTH_BACKEND: str = "opencv"
     NOTIFICATIONS_ENABLED: bool = False
     GEOFENCE_ENABLED: bool = True
+    GEOFENCE_FAST_MODE: bool = True  # local projection + geodesic only near the boundary
 
     @field_validator("DB_URL")
     @classmethod
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the admin heatmap works before bootstrap.py converts
+legacy TEXT pass coordinates to numbers (uses a throwaway SQLite database)
+"""
+import os
+import sys
+import tempfile
+
+workdir = tempfile.mkdtemp()
+os.environ["DB_URL"] = f"sqlite:///{workdir}/legacy.db"
+os.environ.setdefault("FACE_AUTH_ENABLED", "false")
+
+from sqlalchemy import text
+
+from database import Base, SessionLocal, engine
+import geohash
+import models  # noqa: F401  (registers the tables)
+
+print("=" * 60)
+print("Testing heatmap on legacy TEXT coordinate columns")
+print("=" * 60)
+
+# Test 1: Build the pre-conversion layout
+print("\n1. Creating passes with TEXT request_latitude/request_longitude...")
+Base.metadata.create_all(bind=engine)
+with engine.begin() as connection:
+    for column in ("request_latitude", "request_longitude", "location_distance_km"):
+        connection.execute(text(f"ALTER TABLE passes DROP COLUMN {column}"))
+        connection.execute(text(f"ALTER TABLE passes ADD COLUMN {column} TEXT"))
+    connection.execute(
+        text("INSERT INTO passes (student_id, reason, status, request_time, request_latitude, request_longitude, "
+             "location_distance_km, location_cell) VALUES "
+             "(1, 'legacy', 'approved', CURRENT_TIMESTAMP, '31.7768', '77.0144', '', :cell), "
+             "(1, 'legacy', 'approved', CURRENT_TIMESTAMP, ' 31.7770 ', '77.0146', '0.1', :cell)"),
+        {"cell": geohash.encode(31.7768, 77.0144)},
+    )
+print("   ✓ Legacy rows stored as text")
+
+# Test 2: Call the endpoint as an admin
+print("\n2. Testing GET /api/admin/location/heatmap...")
+from fastapi.testclient import TestClient
+
+import app as app_module
+from seed import seed_demo_users
+
+db = SessionLocal()
+seed_demo_users(db)
+db.close()
+
+client = TestClient(app_module.app)
+login = client.post("/auth/login", data={"username": "admin@uni.edu", "password": "admin123"})
+headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+failures = 0
+for query in ("", "&min_lat=31.7&min_lon=77.0&max_lat=31.8&max_lon=77.1"):
+    response = client.get(f"/api/admin/location/heatmap?days=1{query}", headers=headers)
+    body = response.json() if response.status_code == 200 else {}
+    if response.status_code == 200 and body.get("total") == 2:
+        cell = body["cells"][0]
+        print(f"   ✓ {query or 'no bbox'}: {body['total']} passes, centre {cell['latitude']:.4f},{cell['longitude']:.4f}")
+    else:
+        failures += 1
+        print(f"   ✗ {query or 'no bbox'}: HTTP {response.status_code} {response.text[:200]}")
+
+print("\n" + "=" * 60)
+print("Test Complete!" if not failures else f"Test Failed ({failures} check(s))")
+print("=" * 60)
+sys.exit(1 if failures else 0)
@@ -0,0 +1,226 @@
+"""
+User search index for the admin log search and typeahead
+
+`%term%` ILIKE over users.name / users.student_id cannot use a B-tree index,
+so each keystroke in the admin search box scanned users. The search service
+picks the best index the database offers:
+- Postgres: pg_trgm GIN indexes, which serve the same ILIKE directly;
+- SQLite: an FTS5 table over name/student_id kept in sync by triggers, with
+  the trigram tokenizer (any 3+ character substring, e.g. "361" in "U22CN361")
+  on SQLite 3.34+, word prefixes ("mad", "u22cn3") on older builds;
+- otherwise: an in-memory sorted prefix index reloaded every PREFIX_INDEX_TTL_SECONDS.
+
+Terms an index cannot answer (shorter than a trigram, or mid-word for a prefix
+index) fall back to the plain ILIKE. Matches come back as user ids, which drive
+the scan_logs query.
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, or_, select, text
+
+from models import User
+
+logger = logging.getLogger(__name__)
+
+MAX_MATCHES = 1000  # beyond this the caller filters with the plain join instead of a huge IN list
+PREFIX_INDEX_TTL_SECONDS = 30
+
+SQLITE_FTS_TABLE = (
+    "CREATE VIRTUAL TABLE users_fts USING fts5("
+    "name, student_id, content='users', content_rowid='id', {options})"
+)
+SQLITE_FTS_OPTIONS = {
+    "trigram": "tokenize='trigram'",  # substring matching, SQLite 3.34+
+    "unicode61": "prefix='2 3'",      # word-prefix matching
+}
+SQLITE_TRIGRAM_VERSION = (3, 34, 0)
+SQLITE_FTS_STATEMENTS = [
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, name, student_id) VALUES (new.id, new.name, new.student_id); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, name, student_id) VALUES ('delete', old.id, old.name, old.student_id); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF name, student_id ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, name, student_id) VALUES ('delete', old.id, old.name, old.student_id); "
+    "INSERT INTO users_fts(rowid, name, student_id) VALUES (new.id, new.name, new.student_id); END",
+    "INSERT INTO users_fts(users_fts) VALUES ('rebuild')",
+]
+
+POSTGRES_TRGM_STATEMENTS = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_users_student_id_trgm ON users USING gin (student_id gin_trgm_ops)",
+]
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _words(value: Optional[str]) -> List[str]:
+    return [word.lower() for word in _WORD.findall(value or "")]
+
+
+class PrefixIndex:
+    """Sorted (token, user_id) pairs; a prefix lookup is two bisects"""
+
+    def __init__(self, ttl_seconds: int = PREFIX_INDEX_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries: List[tuple] = []
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._loaded_at = 0.0
+
+    def _refresh(self, db):
+        if time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        with self._lock:
+            if time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return
+            entries = []
+            for user_id, name, student_id in db.execute(select(User.id, User.name, User.student_id)):
+                for token in set(_words(name) + _words(student_id)):
+                    entries.append((token, user_id))
+            entries.sort()
+            self._entries = entries
+            self._loaded_at = time.monotonic()
+
+    def _prefix_ids(self, prefix: str) -> set:
+        entries = self._entries
+        start = bisect.bisect_left(entries, (prefix,))
+        end = bisect.bisect_left(entries, (prefix + "\uffff",))
+        return {user_id for _, user_id in entries[start:end]}
+
+    def match(self, db, term: str) -> List[int]:
+        self._refresh(db)
+        words = _words(term)
+        if not words:
+            return []
+        matched = self._prefix_ids(words[0])
+        for word in words[1:]:
+            matched &= self._prefix_ids(word)
+        return sorted(matched)
+
+
+class UserSearch:
+    """Dialect-aware user search; call setup(engine) once at startup"""
+
+    def __init__(self):
+        self.backend = "memory"
+        self.fts_tokenizer = "trigram"
+        self.prefix_index = PrefixIndex()
+
+    def setup(self, engine) -> str:
+        dialect = engine.dialect.name
+        try:
+            if dialect == "postgresql":
+                with engine.begin() as connection:
+                    for statement in POSTGRES_TRGM_STATEMENTS:
+                        connection.execute(text(statement))
+                self.backend = "trigram"
+            elif dialect == "sqlite":
+                with engine.begin() as connection:
+                    version = connection.execute(text("SELECT sqlite_version()")).scalar()
+                    tokenizer = ("trigram" if tuple(int(part) for part in version.split(".")) >= SQLITE_TRIGRAM_VERSION
+                                 else "unicode61")
+                    existing = connection.execute(
+                        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'users_fts'")
+                    ).first()
+                    current = None if existing is None else ("trigram" if "trigram" in existing[0] else "unicode61")
+                    if current != tokenizer:
+                        if current is not None:
+                            # Built by an older release with the word tokenizer
+                            connection.execute(text("DROP TABLE users_fts"))
+                        connection.execute(text(SQLITE_FTS_TABLE.format(options=SQLITE_FTS_OPTIONS[tokenizer])))
+                        for statement in SQLITE_FTS_STATEMENTS:
+                            connection.execute(text(statement))
+                self.backend = "fts5"
+                self.fts_tokenizer = tokenizer
+        except Exception as e:
+            # e.g. no CREATE EXTENSION privilege, or SQLite built without FTS5
+            logger.warning("User search index unavailable, using in-memory prefix index: %s", e)
+            self.backend = "memory"
+        return self.backend
+
+    def _search(self, db, term: str, limit: int) -> List[int]:
+        """Up to `limit` matching user ids, best first where the backend can rank"""
+        term = (term or "").strip()
+        if not term:
+            return []
+        if self.backend == "trigram":
+            pattern = f"%{term}%"
+            return list(db.scalars(
+                select(User.id)
+                .where(or_(User.name.ilike(pattern), User.student_id.ilike(pattern)))
+                .order_by(func.greatest(func.similarity(User.name, term),
+                                        func.similarity(func.coalesce(User.student_id, ""), term)).desc())
+                .limit(limit)
+            ))
+
+        if self.backend == "fts5":
+            query = _fts_query(term, self.fts_tokenizer)
+            ids = [row[0] for row in db.execute(
+                text("SELECT rowid FROM users_fts WHERE users_fts MATCH :query ORDER BY rank LIMIT :limit"),
+                {"query": query, "limit": limit},
+            )] if query else []
+        else:
+            ids = self.prefix_index.match(db, term)[:limit]
+        if not ids:
+            # Too short for trigrams, or a mid-word fragment a prefix index cannot see
+            pattern = f"%{term}%"
+            ids = list(db.scalars(
+                select(User.id)
+                .where(or_(User.name.ilike(pattern), User.student_id.ilike(pattern)))
+                .order_by(User.id)
+                .limit(limit)
+            ))
+        return ids
+
+    def match_ids(self, db, term: str, limit: int = MAX_MATCHES) -> Optional[List[int]]:
+        """Ids of users whose name or student_id matches `term`; None when more than `limit` match"""
+        ids = self._search(db, term, limit + 1)
+        return None if len(ids) > limit else ids
+
+    def typeahead(self, db, term: str, limit: int = 10) -> List[Dict]:
+        ids = self._search(db, term, limit)
+        if not ids:
+            return []
+        users = {user.id: user for user in db.execute(
+            select(User.id, User.name, User.student_id, User.student_class, User.role).where(User.id.in_(ids))
+        )}
+        return [
+            {
+                "id": user_id,
+                "name": users[user_id].name,
+                "student_id": users[user_id].student_id,
+                "student_class": users[user_id].student_class,
+                "role": users[user_id].role,
+            }
+            for user_id in ids
+            if user_id in users
+        ]
+
+    def student_clause(self, db, term: str):
+        """WHERE clause on User for a search term: an indexed id list, or the plain ILIKE when too broad"""
+        ids = self.match_ids(db, term)
+        if ids is None:
+            pattern = f"%{term}%"
+            return or_(User.student_id.ilike(pattern), User.name.ilike(pattern))
+        return User.id.in_(ids)
+
+
+def _fts_query(term: str, tokenizer: str = "trigram") -> str:
+    # Every word must match; quoting keeps FTS5 operators in user input literal
+    words = _words(term)
+    if tokenizer != "trigram":
+        return " ".join(f'"{word}"*' for word in words)
+    if any(len(word) < 3 for word in words):
+        return ""  # a trigram index cannot match shorter fragments
+    return " ".join(f'"{word}"' for word in words)
+
+
+user_search = UserSearch()
@@ -12,6 +12,8 @@ let allLogs = [];
 let wsPingInterval = null;
 const apiClient = CONFIG.createApiClient();
 let chartRefreshTimeout = null;
+let searchCursor = null;
+let suggestTimeout = null;
 
 async function apiFetch(path, options = {}) {
     return apiClient.fetch(path, options);
@@ -112,6 +114,8 @@ document.addEventListener('DOMContentLoaded', async function () {
         // Auto-refresh statistics every 30 seconds
         setInterval(loadStatistics, 30000);
 
+        document.getElementById('searchStudent').addEventListener('input', scheduleStudentSuggestions);
+
         console.log('✅ All components initialized');
     } catch (error) {
         console.error('❌ Error initializing dashboard:', error);
@@ -477,21 +481,26 @@ function refreshChartsSoon() {
 // FILTERS & SEARCH
 // ============================================================================
 
-async function applyFilters() {
+function buildFilterParams() {
     const studentId = document.getElementById('searchStudent').value.trim();
     const scanType = document.getElementById('filterType').value;
     const result = document.getElementById('filterResult').value;
     const dateFrom = document.getElementById('filterDateFrom').value;
     const dateTo = document.getElementById('filterDateTo').value;
 
+    const params = new URLSearchParams();
+    if (studentId) params.append('student_id', studentId);
+    if (scanType) params.append('scan_type', scanType);
+    if (result) params.append('result', result);
+    if (dateFrom) params.append('date_from', `${dateFrom}T00:00:00`);
+    if (dateTo) params.append('date_to', `${dateTo}T23:59:59`);
+    return params;
+}
+
+async function applyFilters() {
     try {
         const token = localStorage.getItem('adminToken');
-        const params = new URLSearchParams();
-        if (studentId) params.append('student_id', studentId);
-        if (scanType) params.append('scan_type', scanType);
-        if (result) params.append('result', result);
-        if (dateFrom) params.append('date_from', `${dateFrom}T00:00:00`);
-        if (dateTo) params.append('date_to', `${dateTo}T23:59:59`);
+        const params = buildFilterParams();
 
         const response = await apiFetch(`/api/logs/search?${params}`, {
             headers: {
@@ -503,6 +512,7 @@ async function applyFilters() {
 
         const data = await response.json();
         allLogs = (data.logs || []).map(normalizeLog);
+        setSearchCursor(data.next_cursor);
 
         renderLogs(allLogs);
 
@@ -513,12 +523,76 @@ async function applyFilters() {
     }
 }
 
+function setSearchCursor(cursor) {
+    searchCursor = cursor || null;
+    document.getElementById('loadMoreLogs').style.display = searchCursor ? 'inline-block' : 'none';
+}
+
+async function loadMoreLogs() {
+    if (!searchCursor) return;
+
+    try {
+        const token = localStorage.getItem('adminToken');
+        const params = buildFilterParams();
+        params.append('cursor', searchCursor);
+
+        const response = await apiFetch(`/api/logs/search?${params}`, {
+            headers: {
+                'Authorization': `Bearer ${token}`
+            }
+        });
+
+        if (!response.ok) throw new Error('Search failed');
+
+        const data = await response.json();
+        allLogs = allLogs.concat((data.logs || []).map(normalizeLog));
+        setSearchCursor(data.next_cursor);
+
+        renderLogs(allLogs);
+    } catch (error) {
+        console.error('❌ Error loading more logs:', error);
+    }
+}
+
+function scheduleStudentSuggestions() {
+    clearTimeout(suggestTimeout);
+    suggestTimeout = setTimeout(loadStudentSuggestions, 200);
+}
+
+async function loadStudentSuggestions() {
+    const term = document.getElementById('searchStudent').value.trim();
+    const datalist = document.getElementById('studentSuggestions');
+    if (term.length < 2) {
+        datalist.innerHTML = '';
+        return;
+    }
+
+    try {
+        const token = localStorage.getItem('adminToken');
+        const response = await apiFetch(`/api/users/search?q=${encodeURIComponent(term)}&limit=8`, {
+            headers: {
+                'Authorization': `Bearer ${token}`
+            }
+        });
+        if (!response.ok) return;
+
+        const data = await response.json();
+        datalist.innerHTML = (data.users || [])
+            .filter(user => user.student_id)
+            .map(user => `<option value="${escapeHtml(user.student_id)}">${escapeHtml(user.name)}</option>`)
+            .join('');
+    } catch (error) {
+        console.error('❌ Error loading suggestions:', error);
+    }
+}
+
 function clearFilters() {
     document.getElementById('searchStudent').value = '';
     document.getElementById('filterType').value = '';
     document.getElementById('filterResult').value = '';
     document.getElementById('filterDateFrom').value = '';
     document.getElementById('filterDateTo').value = '';
+    setSearchCursor(null);
 
     loadRecentLogs();
 }
@@ -527,42 +601,34 @@ function clearFilters() {
 // EXPORT
 // ============================================================================
 
-function exportLogs() {
-    if (!allLogs || allLogs.length === 0) {
-        alert('No logs to export');
-        return;
-    }
+async function exportLogs() {
+    // The server streams every log matching the current filters, not just the rows on screen
+    try {
+        const token = localStorage.getItem('adminToken');
+        const params = buildFilterParams();
+        params.append('format', 'csv');
 
-    // Create CSV content
-    const headers = ['Timestamp', 'Student ID', 'Student Name', 'Type', 'Result', 'Gate', 'Details'];
-    const rows = allLogs.map(rawLog => {
-        const log = normalizeLog(rawLog);
-        return [
-            log.timestamp,
-            log.student_id,
-            log.student_name,
-            log.scan_type,
-            log.result,
-            log.gate,
-            log.details || ''
-        ];
-    });
+        const response = await apiFetch(`/api/logs/export?${params}`, {
+            headers: {
+                'Authorization': `Bearer ${token}`
+            }
+        });
+
+        if (!response.ok) throw new Error('Export failed');
 
-    const csvContent = [
-        headers.join(','),
-        ...rows.map(row => row.map(cell => `"${cell}"`).join(','))
-    ].join('\n');
-
-    // Download file
-    const blob = new Blob([csvContent], { type: 'text/csv' });
-    const url = window.URL.createObjectURL(blob);
-    const a = document.createElement('a');
-    a.href = url;
-    a.download = `entry-exit-logs-${new Date().toISOString().split('T')[0]}.csv`;
-    document.body.appendChild(a);
-    a.click();
-    document.body.removeChild(a);
-    window.URL.revokeObjectURL(url);
-
-    console.log('📥 Exported', allLogs.length, 'logs to CSV');
+        const blob = await response.blob();
+        const url = window.URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = `entry-exit-logs-${new Date().toISOString().split('T')[0]}.csv`;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        window.URL.revokeObjectURL(url);
+
+        console.log('📥 Exported logs to CSV');
+    } catch (error) {
+        console.error('❌ Error exporting logs:', error);
+        alert('Failed to export logs');
+    }
 }
@@ -41,6 +41,8 @@ const API = {
     // Remove token (logout)
     removeToken: () => {
         localStorage.removeItem('token');
+        // Drop cached ETags/bodies kept for conditional GETs
+        runtimeApi.clearValidators?.();
     },
 
     fetchWithFallback: async (endpoint, options = {}) => {
@@ -94,7 +96,7 @@ const API = {
         }
     },
 
-    // GET request
+    // GET request; the runtime client sends If-None-Match and turns a 304 back into the cached 200
     get: async (endpoint) => {
         return API.request(endpoint, { method: 'GET' });
     },
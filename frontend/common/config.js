@@ -32,8 +32,79 @@ function resolveLocalApiBase() {
     return getApiCandidates()[0] || window.location.origin;
 }
 
+const VALIDATOR_CACHE_LIMIT = 50;
+
+// Remembers ETag + body of GET responses so polls can send If-None-Match and
+// reuse the body when the server answers 304 Not Modified.
+function createValidatorCache(limit = VALIDATOR_CACHE_LIMIT) {
+    const entries = new Map();
+
+    const keyFor = (path, headers = {}) => {
+        const auth = headers.Authorization || headers.authorization || '';
+        return `${auth}|${path}`;
+    };
+
+    return {
+        prepare(path, options) {
+            const method = (options.method || 'GET').toUpperCase();
+            const headers = options.headers || {};
+            if (method !== 'GET' || options.body || headers['If-None-Match']) {
+                return null;
+            }
+            const key = keyFor(path, headers);
+            const entry = entries.get(key);
+            return {
+                key,
+                entry,
+                options: entry
+                    ? { ...options, headers: { ...headers, 'If-None-Match': entry.etag } }
+                    : options
+            };
+        },
+
+        async settle(prepared, response) {
+            if (!prepared) {
+                return response;
+            }
+            if (response.status === 304 && prepared.entry) {
+                // Refresh recency and hand callers an ordinary 200 with the cached body
+                entries.delete(prepared.key);
+                entries.set(prepared.key, prepared.entry);
+                return new Response(prepared.entry.body, {
+                    status: 200,
+                    headers: prepared.entry.headers
+                });
+            }
+            const etag = response.headers.get('ETag');
+            if (response.status === 200 && etag) {
+                const body = await response.clone().text();
+                entries.delete(prepared.key);
+                entries.set(prepared.key, {
+                    etag,
+                    body,
+                    headers: {
+                        'Content-Type': response.headers.get('Content-Type') || 'application/json',
+                        'ETag': etag
+                    }
+                });
+                while (entries.size > limit) {
+                    entries.delete(entries.keys().next().value);
+                }
+            } else if (response.status !== 304) {
+                entries.delete(prepared.key);
+            }
+            return response;
+        },
+
+        clear() {
+            entries.clear();
+        }
+    };
+}
+
 function createApiClient() {
     let activeBase = resolveLocalApiBase();
+    const validators = createValidatorCache();
 
     return {
         getBase() {
@@ -44,7 +115,17 @@ function createApiClient() {
             return activeBase.replace(/^http/, 'ws');
         },
 
+        clearValidators() {
+            validators.clear();
+        },
+
         async fetch(path, options = {}) {
+            const prepared = validators.prepare(path, options);
+            const response = await this.fetchUncached(path, prepared ? prepared.options : options);
+            return validators.settle(prepared, response);
+        },
+
+        async fetchUncached(path, options = {}) {
             const { timeoutMs = DEFAULT_API_TIMEOUT_MS, ...fetchOptions } = options;
             const candidates = [activeBase, ...getApiCandidates()].filter(Boolean);
             const uniqueCandidates = [...new Set(candidates)];
@@ -97,6 +178,7 @@ const CONFIG = {
     API_BASE: resolveLocalApiBase(),
     getApiCandidates,
     createApiClient,
+    createValidatorCache,
 
     // Feature flags
     FEATURES: {
@@ -19,6 +19,14 @@ function showPage(pageId) {
 
 function clearGuardSession(showLoginPage = true) {
     stopCamera();
+    stopOfflineSync();
+    // The bundle lists every active pass holder; never leave it for the next user
+    if (currentUser) {
+        localStorage.removeItem(offlineKey(OFFLINE_BUNDLE_KEY));
+    }
+    // Unkeyed stores left by older builds
+    localStorage.removeItem(OFFLINE_BUNDLE_KEY);
+    localStorage.removeItem(OFFLINE_QUEUE_KEY);
     localStorage.removeItem('scannerToken');
     token = null;
     currentUser = null;
@@ -75,6 +83,7 @@ document.getElementById('loginForm')?.addEventListener('submit', async (e) => {
         initializeScanner();
         loadStats();
         loadRecentScans();
+        startOfflineSync();
     } catch (err) {
         errorDiv.textContent = err.message || 'Login failed';
     }
@@ -131,7 +140,21 @@ async function loadStats() {
 }
 
 // Logout
-function logout() {
+async function logout() {
+    // Upload offline scans while this guard's token is still valid
+    let unsent = loadOfflineQueue().length;
+    while (unsent > 0) {
+        await flushOfflineScans();
+        const remaining = loadOfflineQueue().length;
+        if (remaining >= unsent) break;
+        unsent = remaining;
+    }
+    if (unsent > 0 && !confirm(`${unsent} offline scan(s) could not be uploaded and will be discarded. Log out anyway?`)) {
+        return;
+    }
+    if (currentUser) {
+        localStorage.removeItem(offlineKey(OFFLINE_QUEUE_KEY));
+    }
     clearGuardSession();
 }
 
@@ -240,13 +263,25 @@ async function verifyToken(token_str) {
         const formData = new FormData();
         formData.append('token', token_str);
 
-        const res = await apiFetch('/verify', {
-            method: 'POST',
-            headers: {
-                'Authorization': `Bearer ${token}`
-            },
-            body: formData
-        });
+        if (!navigator.onLine) {
+            await handleOfflineScan(token_str);
+            return;
+        }
+
+        let res;
+        try {
+            res = await apiFetch('/verify', {
+                method: 'POST',
+                headers: {
+                    'Authorization': `Bearer ${token}`
+                },
+                body: formData
+            });
+        } catch (networkError) {
+            // Server unreachable: fall back to the synced pass bundle
+            await handleOfflineScan(token_str);
+            return;
+        }
 
         const data = await res.json();
 
@@ -288,6 +323,173 @@ async function verifyManual() {
     document.getElementById('manualToken').value = '';
 }
 
+// ===== Offline verification =====
+// The guard keeps a delta-synced bundle of approved, unused passes (keyed by the
+// SHA-256 of each issued token) so scans keep working when the server is slow or
+// unreachable. Accepted offline scans are queued and reconciled via /verify/batch,
+// where double use across gates is detected server-side. Both stores are keyed by
+// guard id so a scan is only ever uploaded under the guard who accepted it.
+const OFFLINE_BUNDLE_KEY = 'guardPassBundle';
+const OFFLINE_QUEUE_KEY = 'guardOfflineScans';
+const OFFLINE_SYNC_INTERVAL_MS = 60000;
+const OFFLINE_BATCH_SIZE = 500;
+let offlineSyncTimer = null;
+
+function readStoredJson(key, fallback) {
+    try {
+        return JSON.parse(localStorage.getItem(key)) || fallback;
+    } catch (err) {
+        return fallback;
+    }
+}
+
+function offlineKey(baseKey) {
+    return `${baseKey}:${currentUser.id}`;
+}
+
+function loadOfflineBundle() {
+    if (!currentUser) return { cursor: null, passes: {} };
+    return readStoredJson(offlineKey(OFFLINE_BUNDLE_KEY), { cursor: null, passes: {} });
+}
+
+function loadOfflineQueue() {
+    if (!currentUser) return [];
+    return readStoredJson(offlineKey(OFFLINE_QUEUE_KEY), []);
+}
+
+async function sha256Hex(text) {
+    const digest = await window.crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+}
+
+async function syncPassBundle() {
+    if (!token || !currentUser || !navigator.onLine) return;
+
+    const bundle = loadOfflineBundle();
+    try {
+        const query = bundle.cursor ? `?since=${bundle.cursor}` : '';
+        const res = await apiFetch(`/verify/bundle${query}`, {
+            headers: { 'Authorization': `Bearer ${token}` }
+        });
+        if (!res.ok) return;
+
+        const delta = await res.json();
+        const passes = delta.full ? {} : bundle.passes;
+        const removed = new Set(delta.removed);
+        const nowSeconds = Date.now() / 1000;
+        for (const [digest, entry] of Object.entries(passes)) {
+            if (removed.has(entry.pass_id) || entry.expires_at < nowSeconds) {
+                delete passes[digest];
+            }
+        }
+        delta.passes.forEach(entry => { passes[entry.token_digest] = entry; });
+
+        localStorage.setItem(offlineKey(OFFLINE_BUNDLE_KEY), JSON.stringify({ cursor: delta.cursor, passes }));
+    } catch (err) {
+        console.warn('Pass bundle sync failed:', err);
+    }
+}
+
+async function flushOfflineScans() {
+    const queue = loadOfflineQueue();
+    if (!token || !navigator.onLine || queue.length === 0) return;
+
+    try {
+        const res = await apiFetch('/verify/batch', {
+            method: 'POST',
+            headers: {
+                'Authorization': `Bearer ${token}`,
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ events: queue.slice(0, OFFLINE_BATCH_SIZE) })
+        });
+        if (!res.ok) return;
+
+        const data = await res.json();
+        const settled = new Set(data.results.map(item => item.client_event_id));
+        localStorage.setItem(
+            offlineKey(OFFLINE_QUEUE_KEY),
+            JSON.stringify(loadOfflineQueue().filter(event => !settled.has(event.client_event_id)))
+        );
+
+        const conflicts = data.results.filter(item => item.result !== 'success');
+        if (conflicts.length > 0) {
+            showResult('error', '⚠️ OFFLINE SCANS REJECTED',
+                conflicts.map(item => `Pass #${item.pass_id ?? '?'}: ${item.result} (${item.details})`).join('<br>'));
+        }
+        loadRecentScans();
+        loadStats();
+    } catch (err) {
+        console.warn('Offline scan upload failed:', err);
+    }
+}
+
+async function verifyOffline(tokenStr) {
+    if (!window.crypto?.subtle) {
+        return { ok: false, message: 'Offline verification needs a secure (HTTPS) connection' };
+    }
+    if (!currentUser) {
+        return { ok: false, message: 'Guard profile not loaded' };
+    }
+
+    const bundle = loadOfflineBundle();
+    const digest = await sha256Hex(tokenStr);
+    const entry = bundle.passes[digest];
+    if (!entry) {
+        return { ok: false, message: 'Pass not found in offline bundle (unknown, used or not yet synced)' };
+    }
+    if (entry.expires_at < Date.now() / 1000) {
+        return { ok: false, message: 'expired: past-expiry' };
+    }
+
+    // Single use on this device; the server re-checks across gates on upload
+    delete bundle.passes[digest];
+    localStorage.setItem(offlineKey(OFFLINE_BUNDLE_KEY), JSON.stringify(bundle));
+
+    const queue = loadOfflineQueue();
+    queue.push({
+        token: tokenStr,
+        scanned_at: new Date().toISOString(),
+        client_event_id: `${Date.now()}-${Math.random().toString(36).slice(2, 10)}`
+    });
+    localStorage.setItem(offlineKey(OFFLINE_QUEUE_KEY), JSON.stringify(queue));
+    return { ok: true, entry };
+}
+
+async function handleOfflineScan(tokenStr, note = '') {
+    const outcome = await verifyOffline(tokenStr);
+    if (outcome.ok) {
+        const entry = outcome.entry;
+        showResult('success', '✅ GRANTED (OFFLINE)',
+            `Pass #${entry.pass_id}<br>${entry.student_name} (${entry.student_code || entry.student_id})` +
+            `<br><br>Queued for sync${note}`);
+        playSound('success');
+    } else {
+        showResult('error', '❌ DENIED (OFFLINE)', outcome.message);
+        playSound('error');
+    }
+    return outcome.ok;
+}
+
+function startOfflineSync() {
+    if (offlineSyncTimer) return;
+    flushOfflineScans().then(syncPassBundle);
+    offlineSyncTimer = setInterval(() => {
+        flushOfflineScans().then(syncPassBundle);
+    }, OFFLINE_SYNC_INTERVAL_MS);
+}
+
+function stopOfflineSync() {
+    if (offlineSyncTimer) {
+        clearInterval(offlineSyncTimer);
+        offlineSyncTimer = null;
+    }
+}
+
+window.addEventListener('online', () => {
+    flushOfflineScans().then(syncPassBundle);
+});
+
 // Show result
 function showResult(type, title, message) {
     const resultDiv = document.getElementById('resultDisplay');
@@ -386,5 +588,6 @@ if (token) {
         initializeScanner();
         loadStats();
         loadRecentScans();
+        startOfflineSync();
     });
 }
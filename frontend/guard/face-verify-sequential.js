@@ -430,14 +430,20 @@ async function verifyQRAndFace(qrToken, faceBlob) {
         
         console.log('Sending verification: QR + Face');
         
-        const res = await guardApiFetch('/verify', {
-            method: 'POST',
-            timeoutMs: 120000,
-            headers: {
-                'Authorization': `Bearer ${token}`
-            },
-            body: formData
-        });
+        let res;
+        try {
+            res = await guardApiFetch('/verify', {
+                method: 'POST',
+                timeoutMs: 120000,
+                headers: {
+                    'Authorization': `Bearer ${token}`
+                },
+                body: formData
+            });
+        } catch (networkError) {
+            if (await verifyOfflineFallback(qrToken, '<br>⚠️ Face NOT verified offline - check ID card')) return;
+            throw networkError;
+        }
 
         const data = await parseApiResponse(res);
         console.log('Verification response:', data);
@@ -506,14 +512,20 @@ async function verifyQROnly(qrToken) {
         const formData = new FormData();
         formData.append('token', qrToken);
         
-        const res = await guardApiFetch('/verify', {
-            method: 'POST',
-            timeoutMs: 120000,
-            headers: {
-                'Authorization': `Bearer ${token}`
-            },
-            body: formData
-        });
+        let res;
+        try {
+            res = await guardApiFetch('/verify', {
+                method: 'POST',
+                timeoutMs: 120000,
+                headers: {
+                    'Authorization': `Bearer ${token}`
+                },
+                body: formData
+            });
+        } catch (networkError) {
+            if (await verifyOfflineFallback(qrToken)) return;
+            throw networkError;
+        }
 
         const data = await parseApiResponse(res);
         
@@ -543,6 +555,16 @@ async function verifyQROnly(qrToken) {
     }
 }
 
+// Server unreachable: validate against the synced offline pass bundle (guard/app.js)
+async function verifyOfflineFallback(qrToken, note = '') {
+    if (typeof handleOfflineScan !== 'function') {
+        return false;
+    }
+    await handleOfflineScan(qrToken, note);
+    setTimeout(() => resetToQRMode(), 5000);
+    return true;
+}
+
 // Reset to QR scanning mode
 function resetToQRMode() {
     currentMode = 'qr';
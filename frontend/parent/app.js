@@ -232,7 +232,7 @@ async function loadLastStatus() {
         document.getElementById('lastStatusDisplay').style.display = 'none';
         document.getElementById('lastStatusEmpty').style.display = 'none';
 
-        const response = await apiFetch(`/api/parent/student_history/${currentStudent.id}?access_token=${encodeURIComponent(currentStudent.accessToken)}`);
+        const response = await apiFetch(`/api/parent/student_history/${currentStudent.id}?access_token=${encodeURIComponent(currentStudent.accessToken)}&limit=1`);
 
         if (!response.ok) {
             throw new Error('Failed to load status');